@@ -0,0 +1,179 @@
+"""
+Benchmark suite for the dict builders, helpers and CSV export in project.py.
+Payloads come from the seeded generator in mock_payloads.py, so every run measures the same data: 20k coins with platforms, and 10k-100k tickers with stale and DEX entries by default.
+Use --cassette to also benchmark real payloads recorded with `python project.py --record <file> <command>`.
+Each case is timed (best of --repeat runs) and measured for peak memory with tracemalloc in a separate run. Use --output to write the results as JSON and --compare to compare against an earlier results file.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+from time import perf_counter
+
+import project
+from mock_payloads import PayloadGenerator
+
+
+def build_cases(gen: PayloadGenerator, coins: int, ticker_sizes: list[int], workers: int = 1) -> list[tuple]:
+    """
+    Build the benchmark cases: (name, size, function, row count) tuples. Payloads are generated up front so generation isn't timed.
+
+    :param gen: Payload generator.
+    :type gen: PayloadGenerator
+    :param coins: Number of assets for the coin payloads.
+    :type coins: int
+    :param ticker_sizes: Numbers of tickers for the pair payloads.
+    :type ticker_sizes: list[int]
+    :param workers: If more than 1, the pair builders are also timed spread across this many processes.
+    :type workers: int
+    :rtype: list[tuple]
+    """
+    coins_list = gen.coins_list(coins)
+    coins_markets = gen.coins_markets(coins)
+    exchanges = gen.exchanges(1000)
+    top100 = [gen.exchange_detail(exch_id) for exch_id in gen.exchange_ids(30)]
+    _, mkt_rows = project.a_mkt_dict_build(coins_markets)
+
+    cases = [
+        ("a_list_dict_build", coins, lambda: project.a_list_dict_build(coins_list), coins),
+        ("a_mkt_dict_build", coins, lambda: project.a_mkt_dict_build(coins_markets), coins),
+        ("e_list_dict_build", len(exchanges), lambda: project.e_list_dict_build(exchanges), len(exchanges)),
+        ("e_top100_dict_build", 30 * 100, lambda: project.e_top100_dict_build(top100), 30 * 100),
+    ]
+    for size in ticker_sizes:
+        asset_pages = gen.ticker_pages(size)
+        exch_pages = gen.ticker_pages(size, exchange="binance")
+        _, _, pair_rows, _ = project.e_pair_dict_build(exch_pages)
+        cases += [
+            ("a_pair_dict_build", size, lambda pages=asset_pages: project.a_pair_dict_build(pages), size),
+            ("e_pair_dict_build", size, lambda pages=exch_pages: project.e_pair_dict_build(pages), size),
+            ("csv_export", len(pair_rows), lambda rows=pair_rows: project.csv_export(rows, "bench_pairs"), len(pair_rows)),
+        ]
+        if workers > 1:
+            cases += [
+                (f"a_pair_dict_build x{workers}", size, lambda pages=asset_pages: project.pair_dict_build_pages(project.a_pair_dict_build, pages, workers), size),
+                (f"e_pair_dict_build x{workers}", size, lambda pages=exch_pages: project.pair_dict_build_pages(project.e_pair_dict_build, pages, workers), size),
+            ]
+
+    values = [10 ** (i % 12 - 6) * 1.2345 for i in range(100000)]
+    cases += [
+        ("helper_rfmt_usd", len(values), lambda: [project.helper_rfmt_usd(v) for v in values], len(values)),
+        ("helper_rfmt_1000", len(values), lambda: [project.helper_rfmt_1000(v) for v in values], len(values)),
+        ("helper_rfmt_pct", len(values), lambda: [project.helper_rfmt_pct(v) for v in values], len(values)),
+        ("helper_sort_key", len(mkt_rows), lambda: [project.helper_sort_key(row["Price (USD)"]) for row in mkt_rows], len(mkt_rows)),
+        ("csv_export", len(mkt_rows), lambda: project.csv_export(mkt_rows, "bench_mkts"), len(mkt_rows)),
+    ]
+    return cases
+
+
+def cassette_cases(path: str) -> list[tuple]:
+    """
+    Build benchmark cases from the responses recorded in a cassette: coins/list, coins/markets pages, and the ticker pages of each recorded coin or exchange.
+
+    :param path: Cassette file.
+    :type path: str
+    :rtype: list[tuple]
+    """
+    cassette = project.Cassette(path, "replay")
+    payloads = {}
+    for key, entry in sorted(cassette.entries.items()):
+        if entry["status"] >= 400:
+            continue
+        endpoint = key.split("?")[0]
+        payloads.setdefault(endpoint, []).append(json.loads(project.Cassette.content(entry)))
+
+    cases = []
+    for endpoint, pages in payloads.items():
+        pattern = project.helper_endpoint_pattern(endpoint)
+        if pattern == "coins/list":
+            data = pages[0]
+            cases.append(("a_list_dict_build", len(data), lambda data=data: project.a_list_dict_build(data), len(data)))
+        elif pattern == "coins/markets":
+            data = [asset for page in pages for asset in page]
+            cases.append(("a_mkt_dict_build", len(data), lambda data=data: project.a_mkt_dict_build(data), len(data)))
+        elif pattern in ("coins/{id}/tickers", "exchanges/{id}/tickers"):
+            builder = project.a_pair_dict_build if pattern.startswith("coins") else project.e_pair_dict_build
+            size = sum(len(page["tickers"]) for page in pages)
+            cases.append((f"{builder.__name__}[{endpoint.split('/')[1]}]", size, lambda pages=pages, builder=builder: builder(pages), size))
+    return cases
+
+
+def measure(func, repeat: int) -> tuple[float, float]:
+    """
+    Time a function (best of repeat runs) and measure its peak memory allocation in one extra run.
+
+    :param func: Function to benchmark.
+    :param repeat: Number of timed runs.
+    :type repeat: int
+    :rtype: tuple(float,float)
+    :return: Best time in seconds, peak memory in KiB.
+    """
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+
+    # tracemalloc slows everything down, so memory is measured on its own run
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the project.py dict builders, helpers and CSV export.")
+    parser.add_argument("--seed", type=int, default=50, help="Payload generator seed. Default = 50.")
+    parser.add_argument("--coins", type=int, default=20000, help="Number of assets in coin payloads. Default = 20000.")
+    parser.add_argument("--tickers", default="10000,50000,100000", help="Comma-separated ticker counts. Default = 10000,50000,100000.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case. Default = 3.")
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    parser.add_argument("--workers", type=int, default=1, help="Also time the pair builders spread across this many processes. Default = 1 (off).")
+    parser.add_argument("--cassette", help="Also benchmark the payloads recorded in this cassette file.")
+    parser.add_argument("--compare", help="Earlier results JSON file to compare against.")
+    args = parser.parse_args()
+
+    gen = PayloadGenerator(args.seed)
+    cases = build_cases(gen, args.coins, [int(size) for size in args.tickers.split(",")], args.workers)
+    if args.cassette:
+        cases += cassette_cases(args.cassette)
+
+    results = []
+    cwd = os.getcwd()
+    # csv_export writes to the working directory
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for name, size, func, rows in cases:
+                seconds, peak_kib = measure(func, args.repeat)
+                results.append({"name": name, "size": size, "seconds": round(seconds, 6), "rows_per_sec": round(rows / seconds) if seconds else None, "peak_kib": round(peak_kib, 1)})
+                print(f"{name:<28}{size:>8}  {seconds * 1000:>10.2f} ms  {peak_kib / 1024:>9.2f} MiB")
+        finally:
+            os.chdir(cwd)
+
+    if args.compare:
+        with open(args.compare) as file:
+            before = {(r["name"], r["size"]): r for r in json.load(file)["results"]}
+        print("\nCompared to", args.compare)
+        for result in results:
+            old = before.get((result["name"], result["size"]))
+            if old:
+                print(f"{result['name']:<28}{result['size']:>8}  time x{result['seconds'] / old['seconds']:.2f}  memory x{result['peak_kib'] / old['peak_kib']:.2f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "seed": args.seed,
+                "results": results,
+            }, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
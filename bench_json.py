@@ -0,0 +1,93 @@
+"""
+JSON decoding micro-benchmark for the API response shapes used by project.py.
+Each installed decoder in project.JSON_DECODERS is timed on encoded payloads from mock_payloads.py: coins/list, a coins/markets page, a 100-ticker page, an exchanges page and an exchange with its top 100 tickers.
+"json (text)" is what response.json() does: decode the bytes to text, then parse with the stdlib. Speed-ups are relative to it. Use --output to write the results as JSON.
+"""
+import argparse
+import json
+import sys
+from time import perf_counter
+
+from project import JSON_DECODERS
+from mock_payloads import PayloadGenerator
+
+
+def build_payloads(gen: PayloadGenerator, coins: int) -> dict[str, bytes]:
+    """
+    Encode one payload of each response shape, the way the API sends them.
+
+    :param gen: Payload generator.
+    :type gen: PayloadGenerator
+    :param coins: Number of assets in the coins/list payload.
+    :type coins: int
+    :rtype: dict[str,bytes]
+    """
+    payloads = {
+        "coins/list": gen.coins_list(coins),
+        "coins/markets": gen.coins_markets(250),
+        "coins/{id}/tickers": gen.ticker_pages(100)[0],
+        "exchanges": gen.exchanges(250),
+        "exchanges/{id}": gen.exchange_detail("binance"),
+    }
+    return {name: json.dumps(payload).encode() for name, payload in payloads.items()}
+
+
+def installed_decoders() -> dict:
+    """ loads() of every installed decoder in JSON_DECODERS, after the response.json() equivalent that speed-ups are compared to. """
+    decoders = {"json (text)": lambda content: json.loads(content.decode("utf-8"))}
+    for name in JSON_DECODERS:
+        try:
+            decoders[name] = __import__(name).loads
+        except ImportError:
+            print(f"{name} is not installed. Skipping.")
+    return decoders
+
+
+def measure(loads, content: bytes, repeat: int) -> float:
+    """
+    Best time in seconds of repeat decodes.
+
+    :param loads: Decoder function.
+    :param content: Encoded payload.
+    :type content: bytes
+    :param repeat: Number of timed runs.
+    :type repeat: int
+    :rtype: float
+    """
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        loads(content)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON decoders on CoinGecko API payload shapes.")
+    parser.add_argument("--seed", type=int, default=50, help="Payload generator seed. Default = 50.")
+    parser.add_argument("--coins", type=int, default=20000, help="Number of assets in the coins/list payload. Default = 20000.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per case. Default = 20.")
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    args = parser.parse_args()
+
+    payloads = build_payloads(PayloadGenerator(args.seed), args.coins)
+    decoders = installed_decoders()
+
+    results = []
+    for payload, content in payloads.items():
+        print(f"\n{payload} ({len(content) / 1024:.1f} KiB)")
+        baseline = None
+        for name, loads in decoders.items():
+            seconds = measure(loads, content, args.repeat)
+            baseline = baseline or seconds
+            results.append({"payload": payload, "bytes": len(content), "decoder": name, "seconds": round(seconds, 6), "mib_per_sec": round(len(content) / 1048576 / seconds, 1)})
+            print(f"  {name:<14}{seconds * 1000:>10.3f} ms  {len(content) / 1048576 / seconds:>8.1f} MiB/s  x{baseline / seconds:.2f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"python": sys.version.split()[0], "seed": args.seed, "results": results}, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
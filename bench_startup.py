@@ -0,0 +1,86 @@
+"""
+Start-up benchmark for project.py.
+Measures how long a fresh interpreter takes to import project.py and reach main(), using python -X importtime for the per-module breakdown.
+Run with `python bench_startup.py`. Use --output to save results as JSON so that runs can be compared across releases.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Stops right before main() would run
+REACH_MAIN = "import project; project.main"
+
+
+def run_once() -> tuple[float, dict]:
+    """
+    Start one interpreter with -X importtime and import project.py.
+    Returns the wall-clock time to reach main() in ms, and the cumulative import time in ms of each module imported.
+
+    :rtype: tuple(float,dict)
+    """
+    start = perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", REACH_MAIN],
+        cwd=HERE, capture_output=True, text=True, check=True,
+    )
+    wall_ms = (perf_counter() - start) * 1000
+
+    # Each line looks like "import time:  self [us] | cumulative | imported package"
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = int(cumulative) / 1000
+    return wall_ms, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark project.py start-up time.")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Number of interpreter starts to measure. Default = 10.")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest top-level imports to report. Default = 10.")
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    parser.add_argument("--max-ms", type=float, help="Exit with status 1 if the median time to reach main() exceeds this many ms.")
+    args = parser.parse_args()
+
+    walls = []
+    project_ms = []
+    top_level = {}
+    for _ in range(args.runs):
+        wall_ms, imports = run_once()
+        walls.append(wall_ms)
+        project_ms.append(imports.get("project", 0.0))
+        for name, ms in imports.items():
+            top_level.setdefault(name, []).append(ms)
+
+    slowest = sorted(((median(times), name) for name, times in top_level.items() if name != "project"), reverse=True)[:args.top]
+    results = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "reach_main_ms": round(median(walls), 2),
+        "import_project_ms": round(median(project_ms), 2),
+        "slowest_imports_ms": {name: round(ms, 2) for ms, name in slowest},
+    }
+
+    print(f"Time to reach main(): {results['reach_main_ms']} ms (median of {args.runs} runs)")
+    print(f"import project (cumulative): {results['import_project_ms']} ms")
+    print("Slowest imports:")
+    for name, ms in results["slowest_imports_ms"].items():
+        print(f"  {ms:>8.2f} ms  {name}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.max_ms is not None and results["reach_main_ms"] > args.max_ms:
+        sys.exit(f"Start-up regression: {results['reach_main_ms']} ms > {args.max_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Local stand-in for the CoinGecko API, for offline load testing.
+Serves the 7 endpoints hit by the Assets and Exchanges classes in project.py from data generated by mock_payloads.py, with the API's pagination behavior (ticker pages of 100 that end in an empty page, 404s for unknown IDs, etc).
+Latency, 429 rate limiting, 5xx error injection and payload sizes are configurable so fetch throughput and retry behavior can be measured without a network.
+
+Run with `python mock_gecko.py --port 8000` and point the client at it with `Assets(base_url="http://127.0.0.1:8000/api/v3")`.
+"""
+import argparse
+import json
+import random
+import threading
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from math import ceil
+from time import monotonic, sleep
+from urllib.parse import parse_qs, urlparse
+
+from mock_payloads import PayloadGenerator
+
+API_PREFIX = "/api/v3"
+TICKERS_PER_PAGE = 100
+
+
+class MockGecko:
+    """ Generated data and fault-injection settings behind the mock server """
+    def __init__(
+            self,
+            coins: int = 5000,
+            exchanges: int = 500,
+            tickers: int = 1000,
+            latency_ms: float = 0,
+            jitter_ms: float = 0,
+            rate_limit: int = 0,
+            error_rate: float = 0,
+            seed: int = 50
+            ):
+        """
+        Initialization of Mock CoinGecko
+        :param coins: Number of assets served by coins/list and coins/markets.
+        :type coins: int
+        :param exchanges: Number of exchanges served by exchanges/list and exchanges.
+        :type exchanges: int
+        :param tickers: Number of tickers for each coin or exchange on the ticker endpoints.
+        :type tickers: int
+        :param latency_ms: Added latency per request in ms.
+        :type latency_ms: float
+        :param jitter_ms: Random extra latency per request, up to this many ms.
+        :type jitter_ms: float
+        :param rate_limit: Max requests per rolling minute per API key before responding 429 with a Retry-After header. 0 = unlimited.
+        :type rate_limit: int
+        :param error_rate: Share of requests answered with a random 500/502/503.
+        :type error_rate: float
+        :param seed: Seed for generated data and fault injection.
+        :type seed: int
+        """
+        self.tickers = tickers
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        # Request times in the last minute, per API key
+        self.recent = {}
+        self.requests = 0
+        # Requests being handled right now, and the most handled at once
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+        gen = PayloadGenerator(seed)
+        self.coins_list = gen.coins_list(coins)
+        self.coin_ids = [coin["id"] for coin in self.coins_list]
+        self.markets = gen.coins_markets(ids=self.coin_ids)
+        self.exchanges_list = gen.exchanges_list(exchanges)
+        self.exchanges = [gen.exchange(exch["id"], rank) for rank, exch in enumerate(self.exchanges_list, 1)]
+        self.exchange_ids = {exch["id"] for exch in self.exchanges_list}
+        self._ticker_cache = {}
+
+
+    def fault(self, key: str | None = None) -> tuple[int, dict] | None:
+        """
+        Decide whether the current request is rate limited or fails. Also applies latency.
+        :param key: API key sent with the request. Rate limits are counted per key, like the real API's.
+        :type key: str | None
+        :rtype: tuple(int,dict) | None
+        :return: (status, headers) of the fault, or None if the request should succeed.
+        """
+        with self.lock:
+            self.requests += 1
+            delay = (self.latency_ms + self.rng.uniform(0, self.jitter_ms)) / 1000
+            fail = self.rng.random() < self.error_rate
+            now = monotonic()
+            recent = self.recent.setdefault(key, deque())
+            while recent and now - recent[0] >= 60:
+                recent.popleft()
+            limited = self.rate_limit and len(recent) >= self.rate_limit
+            if limited:
+                retry_after = ceil(60 - (now - recent[0]))
+            else:
+                recent.append(now)
+            status = self.rng.choice([500, 502, 503])
+        if delay:
+            sleep(delay)
+        if limited:
+            return 429, {"Retry-After": str(retry_after)}
+        if fail:
+            return status, {}
+        return None
+
+    def ticker_universe(self, kind: str, id: str) -> list[dict]:
+        """
+        All tickers for a coin or exchange, generated on first request. The same ID always gets the same tickers.
+        :param kind: "coins" or "exchanges".
+        :type kind: str
+        :param id: Gecko Asset or Exchange ID.
+        :type id: str
+        :rtype: list[dict]
+        """
+        key = (kind, id)
+        with self.lock:
+            if key not in self._ticker_cache:
+                gen = PayloadGenerator(self.seed + zlib.crc32(f"{kind}/{id}".encode()))
+                pages = gen.ticker_pages(self.tickers, exchange=id if kind == "exchanges" else None)
+                tickers = [ticker for page in pages for ticker in page["tickers"]]
+                for ticker in tickers:
+                    # Point tickers at real coins so the coin_ids filter behaves like the API's
+                    coin_id = id if kind == "coins" else gen.rng.choice(self.coin_ids)
+                    ticker["coin_id"] = coin_id
+                    if not ticker["base"].startswith("0x"):
+                        ticker["base"] = coin_id.split("-")[0].upper()[:5]
+                self._ticker_cache[key] = tickers
+            return self._ticker_cache[key]
+
+
+    def route(self, path: str, query: dict) -> tuple[int, object]:
+        """
+        Build the response for an API path.
+        :param path: Request path with API_PREFIX removed, i.e. "coins/bitcoin/tickers".
+        :type path: str
+        :param query: Query parameters, one value per name.
+        :type query: dict
+        :rtype: tuple(int,object)
+        :return: HTTP status and JSON body.
+        """
+        parts = path.strip("/").split("/")
+        page = max(1, int(query.get("page") or 1))
+
+        if parts == ["coins", "list"]:
+            return 200, self.coins_list
+        if parts == ["coins", "markets"]:
+            per_page = min(250, int(query.get("per_page") or 100))
+            data = self.markets
+            if query.get("ids"):
+                wanted = set(query["ids"].split(","))
+                data = [asset for asset in data if asset["id"] in wanted]
+            return 200, data[(page - 1) * per_page:page * per_page]
+        if len(parts) == 3 and parts[0] == "coins" and parts[2] == "tickers":
+            if parts[1] not in self.coin_ids:
+                return 404, {"error": "coin not found"}
+            tickers = self.ticker_universe("coins", parts[1])
+            if query.get("exchange_ids"):
+                wanted = set(query["exchange_ids"].split(","))
+                tickers = [ticker for ticker in tickers if ticker["market"]["identifier"] in wanted]
+            if query.get("order") in ("volume_desc", "volume_asc"):
+                tickers = sorted(tickers, key=lambda ticker: ticker["converted_volume"]["usd"], reverse=query["order"] == "volume_desc")
+            return 200, {"name": parts[1].replace("-", " ").title(), "tickers": tickers[(page - 1) * TICKERS_PER_PAGE:page * TICKERS_PER_PAGE]}
+        if parts == ["exchanges", "list"]:
+            return 200, self.exchanges_list
+        if parts == ["exchanges"]:
+            per_page = min(250, int(query.get("per_page") or 100))
+            return 200, self.exchanges[(page - 1) * per_page:page * per_page]
+        if len(parts) in (2, 3) and parts[0] == "exchanges":
+            if parts[1] not in self.exchange_ids:
+                return 404, {"error": "exchange not found"}
+            tickers = self.ticker_universe("exchanges", parts[1])
+            if len(parts) == 2:
+                detail = dict(next(exch for exch in self.exchanges if exch["id"] == parts[1]))
+                gen = PayloadGenerator(self.seed + zlib.crc32(parts[1].encode()))
+                detail.update({key: value for key, value in gen.exchange_detail(parts[1], tickers=0).items() if key not in detail})
+                detail["tickers"] = tickers[:TICKERS_PER_PAGE]
+                return 200, detail
+            if parts[2] == "tickers":
+                if query.get("coin_ids"):
+                    wanted = set(query["coin_ids"].split(","))
+                    tickers = [ticker for ticker in tickers if ticker["coin_id"] in wanted or ticker["target_coin_id"] in wanted]
+                return 200, {"name": parts[1].replace("_", " ").title(), "tickers": tickers[(page - 1) * TICKERS_PER_PAGE:page * TICKERS_PER_PAGE]}
+        return 404, {"error": "Not found"}
+
+
+def make_handler(mock: MockGecko) -> type:
+    """
+    Build a request handler class bound to a MockGecko.
+
+    :param mock: Data and settings to serve.
+    :type mock: MockGecko
+    :rtype: type
+    """
+    class Handler(BaseHTTPRequestHandler):
+        """ GET handler for the mock API """
+        def do_GET(self):
+            with mock.lock:
+                mock.in_flight += 1
+                mock.peak_in_flight = max(mock.peak_in_flight, mock.in_flight)
+            try:
+                self.respond()
+            finally:
+                with mock.lock:
+                    mock.in_flight -= 1
+
+        def respond(self):
+            url = urlparse(self.path)
+            fault = mock.fault(self.headers.get("x-cg-demo-api-key"))
+            if fault:
+                status, headers = fault
+                body = {"status": {"error_code": status, "error_message": "Mock fault"}}
+            elif not url.path.startswith(API_PREFIX):
+                status, headers, body = 404, {}, {"error": "Not found"}
+            else:
+                query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                status, body = mock.route(url.path[len(API_PREFIX):], query)
+                headers = {}
+
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            """ Silence per-request logging """
+
+    return Handler
+
+
+def start(host: str = "127.0.0.1", port: int = 0, **settings) -> tuple[ThreadingHTTPServer, str]:
+    """
+    Start the mock server on a background thread.
+
+    :param host: Interface to listen on.
+    :type host: str
+    :param port: Port to listen on. 0 = any free port.
+    :type port: int
+    :param settings: MockGecko settings (coins, exchanges, tickers, latency_ms, jitter_ms, rate_limit, error_rate, seed).
+    :rtype: tuple(ThreadingHTTPServer,str)
+    :return: The server (call .shutdown() to stop it, and read its MockGecko from .mock) and the base URL to pass to the API classes.
+    """
+    mock = MockGecko(**settings)
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    server.mock = mock
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}{API_PREFIX}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local mock of the CoinGecko API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--coins", type=int, default=5000, help="Number of assets. Default = 5000.")
+    parser.add_argument("--exchanges", type=int, default=500, help="Number of exchanges. Default = 500.")
+    parser.add_argument("--tickers", type=int, default=1000, help="Tickers per coin/exchange. Default = 1000.")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added latency per request.")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Random extra latency per request, up to this many ms.")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Max requests per minute per API key before 429s. 0 = unlimited.")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of requests answered with a 5xx.")
+    parser.add_argument("--seed", type=int, default=50)
+    args = parser.parse_args()
+
+    settings = {name: value for name, value in vars(args).items() if name not in ("host", "port")}
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(MockGecko(**settings)))
+    print(f"Mock CoinGecko API serving at http://{args.host}:{args.port}{API_PREFIX}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Seeded generator of synthetic CoinGecko API payloads.
+Payloads have the same shape as the responses of the 7 endpoints hit by the Assets and Exchanges classes in project.py, at any size, so the dict builders and exporters can be benchmarked and load-tested without calling the API.
+The same seed always produces the same payloads.
+"""
+import random
+import string
+from datetime import datetime, timedelta, timezone
+
+CHAINS = ["ethereum", "solana", "binance-smart-chain", "polygon-pos", "arbitrum-one", "base", "avalanche", "optimistic-ethereum", "tron", "aptos"]
+QUOTES = [("USDT", "tether"), ("USDC", "usd-coin"), ("BTC", "bitcoin"), ("ETH", "ethereum"), ("FDUSD", "first-digital-usd"), ("EUR", None), ("USD", None)]
+TRUST_SCORES = ["green", "green", "green", "yellow", "red", None]
+NOW = datetime(2025, 11, 21, 20, 0, tzinfo=timezone.utc)
+
+
+class PayloadGenerator:
+    """ Seeded generator of CoinGecko-shaped payloads """
+    def __init__(self, seed: int = 50):
+        """
+        Initialization of Payload Generator
+        :param seed: Random seed. The same seed always produces the same payloads.
+        :type seed: int
+        """
+        self.rng = random.Random(seed)
+
+
+    def _word(self, low: int = 3, high: int = 10) -> str:
+        """ Random lowercase word """
+        return "".join(self.rng.choices(string.ascii_lowercase, k=self.rng.randint(low, high)))
+
+    def _address(self) -> str:
+        """ Random EVM-style contract address """
+        return "0x" + "".join(self.rng.choices("0123456789abcdef", k=40))
+
+    def _timestamp(self, max_age_hours: float = 48) -> str:
+        """ Random ISO timestamp up to max_age_hours before NOW """
+        return (NOW - timedelta(hours=self.rng.uniform(0, max_age_hours))).isoformat()
+
+    def _maybe(self, value, null_rate: float = 0.1):
+        """ Return value, or None null_rate of the time, like the API's sparsely populated fields """
+        return None if self.rng.random() < null_rate else value
+
+
+    def coin_ids(self, count: int) -> list[str]:
+        """
+        Unique Gecko Asset IDs. Coin i always has the same ID for a given seed, so IDs line up across payload types.
+        :param count: Number of IDs.
+        :type count: int
+        :rtype: list[str]
+        """
+        return ["bitcoin", "ethereum"][:count] + [f"{self._word()}-{i}" for i in range(2, count)]
+
+    def coins_list(self, count: int = 20000) -> list[dict]:
+        """
+        Payload of coins/list with include_platform=true. About a third of assets have no platforms, the rest have 1-8.
+        :param count: Number of assets.
+        :type count: int
+        :rtype: list[dict]
+        """
+        return [
+            {
+                "id": coin_id,
+                "symbol": coin_id.split("-")[0][:5],
+                "name": coin_id.replace("-", " ").title(),
+                "platforms": {} if self.rng.random() < 0.35 else {chain: self._address() for chain in self.rng.sample(CHAINS, self.rng.randint(1, 8))},
+            }
+            for coin_id in self.coin_ids(count)
+        ]
+
+    def coins_markets(self, count: int = 250, start_rank: int = 1, ids: list[str] | None = None) -> list[dict]:
+        """
+        Payload of coins/markets. Assets are in order of market cap descending.
+        :param count: Number of assets.
+        :type count: int
+        :param start_rank: Market cap rank of the first asset, i.e. 251 for page 2 at 250/page.
+        :type start_rank: int
+        :param ids: Optional parameter. Use these Asset IDs instead of generated ones.
+        :type ids: list[str] | None
+        :rtype: list[dict]
+        """
+        ids = ids or [f"{self._word()}-{start_rank + i}" for i in range(count)]
+        data = []
+        market_cap = 2e12 / start_rank
+        for rank, coin_id in enumerate(ids, start_rank):
+            market_cap *= self.rng.uniform(0.95, 0.999)
+            price = 10 ** self.rng.uniform(-8, 5)
+            supply = market_cap / price
+            data.append({
+                "id": coin_id,
+                "symbol": coin_id.split("-")[0][:5],
+                "name": coin_id.replace("-", " ").title(),
+                "image": f"https://coin-images.coingecko.com/coins/images/{rank}/large/{coin_id}.png",
+                "current_price": price,
+                "market_cap": self._maybe(round(market_cap), 0.02),
+                "market_cap_rank": rank,
+                "fully_diluted_valuation": self._maybe(round(market_cap * self.rng.uniform(1, 3))),
+                "total_volume": market_cap * self.rng.uniform(0, 0.2),
+                "high_24h": self._maybe(price * self.rng.uniform(1, 1.1)),
+                "low_24h": self._maybe(price * self.rng.uniform(0.9, 1)),
+                "price_change_24h": self._maybe(price * self.rng.uniform(-0.1, 0.1)),
+                "price_change_percentage_24h": self._maybe(self.rng.uniform(-10, 10)),
+                "market_cap_change_24h": self._maybe(market_cap * self.rng.uniform(-0.1, 0.1)),
+                "market_cap_change_percentage_24h": self._maybe(self.rng.uniform(-10, 10)),
+                "circulating_supply": supply,
+                "total_supply": self._maybe(supply * self.rng.uniform(1, 2)),
+                "max_supply": self._maybe(supply * 2, 0.6),
+                "ath": price * self.rng.uniform(1, 20),
+                "ath_change_percentage": self.rng.uniform(-99, 0),
+                "ath_date": self._timestamp(24 * 365 * 4),
+                "atl": price * self.rng.uniform(0.0001, 1),
+                "atl_change_percentage": self.rng.uniform(0, 1e6),
+                "atl_date": self._timestamp(24 * 365 * 8),
+                "roi": None,
+                "last_updated": self._timestamp(1),
+            })
+        return data
+
+    def ticker(self, exchange: str, stale_rate: float = 0.1, dex: bool = False) -> dict:
+        """
+        A single ticker (market pair) as returned by the coins/{id}/tickers and exchanges/{id}/tickers endpoints.
+        DEX tickers use contract addresses as base/target codes, like dex_pair_format=contract_address.
+        :param exchange: Gecko Exchange ID of the exchange the ticker is on.
+        :type exchange: str
+        :param stale_rate: Share of tickers flagged is_stale.
+        :type stale_rate: float
+        :param dex: Generate a DEX ticker.
+        :type dex: bool
+        :rtype: dict
+        """
+        base_id = f"{self._word()}-{self.rng.randint(0, 20000)}"
+        quote, quote_id = self.rng.choice(QUOTES)
+        base = self._address() if dex else base_id.split("-")[0].upper()[:5]
+        target = self._address() if dex else quote
+        usd = 10 ** self.rng.uniform(-6, 5)
+        volume = 10 ** self.rng.uniform(0, 9)
+        traded_at = self._timestamp()
+        ticker = {
+            "base": base,
+            "target": target,
+            "market": {"name": exchange.replace("_", " ").title(), "identifier": exchange, "has_trading_incentive": False, "logo": f"https://coin-images.coingecko.com/markets/images/{exchange}.png"},
+            "last": usd * self.rng.uniform(0.99, 1.01),
+            "volume": volume,
+            "cost_to_move_up_usd": self._maybe(self.rng.uniform(0, 1e6), 0.3),
+            "cost_to_move_down_usd": self._maybe(self.rng.uniform(0, 1e6), 0.3),
+            "converted_last": {"btc": usd / 84000, "eth": usd / 2750, "usd": usd},
+            "converted_volume": {"btc": volume * usd / 84000, "eth": volume * usd / 2750, "usd": volume * usd},
+            "trust_score": self.rng.choice(TRUST_SCORES),
+            "bid_ask_spread_percentage": self._maybe(self.rng.uniform(0.01, 2)),
+            "timestamp": traded_at,
+            "last_traded_at": traded_at,
+            "last_fetch_at": traded_at,
+            "is_anomaly": self.rng.random() < 0.01,
+            "is_stale": self.rng.random() < stale_rate,
+            "trade_url": self._maybe(f"https://{exchange}.example/trade/{base}_{target}", 0.2),
+            "coin_id": base_id,
+            "target_coin_id": quote_id,
+            "coin_mcap_usd": self._maybe(self.rng.uniform(1e5, 1e12), 0.2),
+        }
+        if dex:
+            ticker["token_info_url"] = f"https://{exchange}.example/token/{base}"
+        elif self.rng.random() < 0.5:
+            # Field is missing entirely from some CEX tickers
+            ticker["token_info_url"] = None
+        return ticker
+
+    def ticker_pages(self, count: int = 10000, exchange: str | None = None, stale_rate: float = 0.1, dex_rate: float = 0.2, per_page: int = 100) -> list[dict]:
+        """
+        Pages of tickers as collected by the asset_pairs() and exchange_pairs() loops. Each page is a {"name": ..., "tickers": [...]} dict.
+        :param count: Total number of tickers.
+        :type count: int
+        :param exchange: Optional parameter. Put every ticker on this exchange, like exchanges/{id}/tickers. Default = random exchanges, like coins/{id}/tickers.
+        :type exchange: str | None
+        :param stale_rate: Share of tickers flagged is_stale.
+        :type stale_rate: float
+        :param dex_rate: Share of tickers on DEXes. Ignored if exchange is given.
+        :type dex_rate: float
+        :param per_page: Tickers per page.
+        :type per_page: int
+        :rtype: list[dict]
+        """
+        pages = []
+        for start in range(0, count, per_page):
+            tickers = []
+            for _ in range(min(per_page, count - start)):
+                dex = self.rng.random() < dex_rate if exchange is None else exchange.startswith("uniswap")
+                venue = exchange or (self.rng.choice(["uniswap_v3", "raydium", "pancakeswap_v3"]) if dex else self.rng.choice(["binance", "coinbase", "kraken", "okx", "bybit_spot", "gdax"]))
+                tickers.append(self.ticker(venue, stale_rate, dex))
+            pages.append({"name": (exchange or "Bitcoin").replace("_", " ").title(), "tickers": tickers})
+        return pages
+
+    def exchanges_list(self, count: int = 1000) -> list[dict]:
+        """
+        Payload of exchanges/list.
+        :param count: Number of exchanges.
+        :type count: int
+        :rtype: list[dict]
+        """
+        return [{"id": exch_id, "name": exch_id.replace("_", " ").title()} for exch_id in self.exchange_ids(count)]
+
+    def exchange_ids(self, count: int) -> list[str]:
+        """
+        Unique Gecko Exchange IDs.
+        :param count: Number of IDs.
+        :type count: int
+        :rtype: list[str]
+        """
+        return ["binance", "coinbase", "kraken"][:count] + [f"{self._word()}_{i}" for i in range(3, count)]
+
+    def exchange(self, exch_id: str, rank: int = 1) -> dict:
+        """
+        A single exchange as returned by the exchanges endpoint.
+        :param exch_id: Gecko Exchange ID.
+        :type exch_id: str
+        :param rank: Trust score rank.
+        :type rank: int
+        :rtype: dict
+        """
+        return {
+            "id": exch_id,
+            "name": exch_id.replace("_", " ").title(),
+            "year_established": self._maybe(self.rng.randint(2011, 2024), 0.3),
+            "country": self._maybe(self.rng.choice(["United States", "Cayman Islands", "Seychelles", "Japan"]), 0.3),
+            "description": self._maybe(" ".join(self._word() for _ in range(self.rng.randint(5, 80))), 0.3),
+            "url": f"https://{exch_id}.example",
+            "image": f"https://coin-images.coingecko.com/markets/images/{rank}/small/{exch_id}.png",
+            "has_trading_incentive": self._maybe(False, 0.3),
+            "trust_score": self._maybe(max(1, 10 - rank // 50), 0.1),
+            "trust_score_rank": rank,
+            "trade_volume_24h_btc": self.rng.uniform(0, 500000) / rank,
+        }
+
+    def exchanges(self, count: int = 250, start_rank: int = 1) -> list[dict]:
+        """
+        Payload of exchanges, in order of trust score rank.
+        :param count: Number of exchanges.
+        :type count: int
+        :param start_rank: Trust score rank of the first exchange, i.e. 251 for page 2 at 250/page.
+        :type start_rank: int
+        :rtype: list[dict]
+        """
+        return [self.exchange(f"{self._word()}_{rank}", rank) for rank in range(start_rank, start_rank + count)]
+
+    def exchange_detail(self, exch_id: str = "binance", tickers: int = 100) -> dict:
+        """
+        Payload of exchanges/{id}: exchange data plus its top 100 tickers.
+        :param exch_id: Gecko Exchange ID.
+        :type exch_id: str
+        :param tickers: Number of tickers.
+        :type tickers: int
+        :rtype: dict
+        """
+        detail = self.exchange(exch_id)
+        detail.update({
+            "centralized": not exch_id.startswith("uniswap"),
+            "coins": self.rng.randint(50, 500),
+            "pairs": self.rng.randint(100, 3000),
+            "facebook_url": "",
+            "reddit_url": "",
+            "telegram_url": "",
+            "slack_url": "",
+            "other_url_1": "",
+            "other_url_2": "",
+            "twitter_handle": exch_id,
+            "public_notice": "",
+            "alert_notice": "",
+            "tickers": self.ticker_pages(tickers, exchange=exch_id, stale_rate=0)[0]["tickers"] if tickers else [],
+        })
+        return detail
@@ -1,29 +1,915 @@
-from requests import Session
-from requests.exceptions import ConnectionError, Timeout, TooManyRedirects, HTTPError
 import json
 import sys
-import argparse
-from tabulate import tabulate
-import csv
 from datetime import datetime
-from time import sleep
-import re
+from time import sleep, monotonic, perf_counter
+import os
+import threading
 from collections import Counter
 
+# requests, tabulate, csv and concurrent.futures are imported where they're used so that start-up doesn't pay for them on paths that never touch them.
+# requests alone is most of the program's cold-start time. Its names are filled in by _import_requests() when the first API class is created.
+Session = ConnectionError = Timeout = TooManyRedirects = HTTPError = None
+# JSON libraries tried for decoding API responses, fastest first. All of them decode straight from the response bytes. json is the stdlib fallback.
+JSON_DECODERS = ("orjson", "ujson", "json")
+# Name & loads() of the decoder in use. Filled in by _import_json_decoder() when the first API class is created.
+json_decoder = json_loads = None
+
+
+def _import_requests():
+    """ Import requests and fill in the module-level Session & requests.exceptions names used by the API classes. """
+    global Session, ConnectionError, Timeout, TooManyRedirects, HTTPError
+    from requests import Session
+    from requests.exceptions import ConnectionError, Timeout, TooManyRedirects, HTTPError
+
+
+def _import_json_decoder(preferred: str | None = None) -> str:
+    """
+    Pick the JSON decoder used for API responses and fill in the module-level json_decoder & json_loads names.
+    :param preferred: Decoder to use, i.e. "json". Default = the first installed of JSON_DECODERS.
+    :type preferred: str | None
+    :rtype: str
+    :return: Name of the decoder picked.
+    """
+    global json_decoder, json_loads
+    for name in [preferred] if preferred else JSON_DECODERS:
+        try:
+            module = __import__(name)
+        except ImportError:
+            continue
+        json_decoder, json_loads = name, module.loads
+        return name
+    raise ImportError(f"JSON decoder {preferred} is not installed.")
+
+
+class RequestRefused(Exception):
+    """ Raised by Auth._get when a request is refused before it is sent to the API """
+
+
+class BudgetExceeded(RequestRefused):
+    """ Raised by Auth._get when the configured API call budget has been spent """
+
+
+class CircuitOpen(RequestRefused):
+    """ Raised by Auth._get when the endpoint's circuit breaker is open """
+
+
+class CassetteMiss(RequestRefused):
+    """ Raised by Auth._get in replay mode when the cassette has no recorded response for a request """
+
+
+# Max items per page for each paginated endpoint. Used to estimate the number of API calls a flow will make.
+ENDPOINT_PAGE_SIZE = {
+    "coins/markets": 250,
+    "exchanges": 250,
+    "coins/{id}/tickers": 100,
+    "exchanges/{id}/tickers": 100,
+}
+# Ticker endpoints don't report a total, so their loops are capped at this many pages.
+MAX_TICKER_PAGES = 99
+# Pair pulls with fewer tickers than this are built in-process even when --workers is given
+PARALLEL_BUILD_MIN_TICKERS = 5000
+# Full-universe coins/markets syncs are capped at this many pages (20,000 assets)
+MAX_MARKET_PAGES = 80
+# Max number of fetched ticker pages waiting to be built by pair_dict_build_stream()
+PIPELINE_QUEUE_SIZE = 4
+# Max length of a comma-separated ID string sent in a single request, to keep URLs well under common server limits.
+MAX_IDS_QUERY_LEN = 4000
+# Rate limited & server-side errors that are worth retrying
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class ApiBudget:
+    """ Daily & Monthly API Call Budget with a persisted ledger of calls spent """
+    LEDGER_FILE = "api_call_ledger.json"
+    # Demo keys are capped at 10,000 calls/month and 30 calls/minute. Default daily budget spreads the monthly cap evenly over a 31 day month.
+    MONTHLY_LIMIT = 10000
+    DAILY_LIMIT = MONTHLY_LIMIT // 31
+    PER_MINUTE_LIMIT = 30
+    # Calls counted in memory before they're merged into the ledger file
+    FLUSH_EVERY = 25
+
+    def __init__(self, daily_limit: int | None = None, monthly_limit: int | None = None, ledger_file: str | None = None):
+        """
+        Initialization of API Call Budget. The ledger file is not read until the budget is first used.
+        :param daily_limit: Max number of API calls per day. Default = MONTHLY_LIMIT spread over 31 days.
+        :type daily_limit: int | None
+        :param monthly_limit: Max number of API calls per calendar month. Default = 10,000 (demo key cap).
+        :type monthly_limit: int | None
+        :param ledger_file: Path of the JSON ledger of calls spent per day. Default = LEDGER_FILE in the working directory.
+        :type ledger_file: str | None
+        """
+        self.daily_limit = daily_limit or self.DAILY_LIMIT
+        self.monthly_limit = monthly_limit or self.MONTHLY_LIMIT
+        self.ledger_file = ledger_file or self.LEDGER_FILE
+        self._ledger = None
+        # Calls recorded since the last flush, per day
+        self._pending = Counter()
+        self._lock = threading.Lock()
+
+
+    def _load(self) -> dict:
+        """ Read the ledger ({"YYYY-MM-DD": calls}) from disk on first use. """
+        if self._ledger is None:
+            try:
+                with open(self.ledger_file) as file:
+                    self._ledger = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._ledger = {}
+        return self._ledger
+
+    def _save(self):
+        """ Write the ledger to disk. Days from before last month are dropped so the file stays small. """
+        today = datetime.now()
+        last_month = f"{today.year - 1}-12" if today.month == 1 else f"{today.year}-{today.month - 1:02d}"
+        self._ledger = {day: calls for day, calls in self._ledger.items() if day[:7] >= last_month}
+        # Write to a temp file first so that a crash mid-write can't corrupt the ledger
+        tmp = f"{self.ledger_file}.tmp"
+        with open(tmp, "w") as file:
+            json.dump(self._ledger, file)
+        os.replace(tmp, self.ledger_file)
+
+
+    def spent_today(self) -> int:
+        """ Number of API calls recorded in the ledger today. """
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            return self._load().get(today, 0) + self._pending[today]
+
+    def spent_this_month(self) -> int:
+        """ Number of API calls recorded in the ledger this calendar month. """
+        month = datetime.now().strftime("%Y-%m")
+        with self._lock:
+            return sum(calls for day, calls in (Counter(self._load()) + self._pending).items() if day.startswith(month))
+
+    def remaining(self) -> int:
+        """ Number of API calls left before either the daily or the monthly budget is exceeded. """
+        return max(0, min(self.daily_limit - self.spent_today(), self.monthly_limit - self.spent_this_month()))
+
+    def record(self, calls: int = 1):
+        """
+        Count calls actually sent to the API. Calls are counted in memory and merged into the ledger file every FLUSH_EVERY calls, so requests don't wait on disk I/O. Call flush() before exiting.
+        :param calls: Number of calls spent.
+        :type calls: int
+        """
+        with self._lock:
+            self._pending[datetime.now().strftime("%Y-%m-%d")] += calls
+            if sum(self._pending.values()) >= self.FLUSH_EVERY:
+                self._flush()
+
+    def flush(self):
+        """ Merge the calls counted since the last flush into the ledger file. Called by main() at exit. """
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        """ Merge the pending calls into the ledger. Called with the lock held. """
+        if not self._pending:
+            return
+        with open(f"{self.ledger_file}.lock", "a") as lock:
+            # Other runs may be recording calls at the same time, so the ledger is re-read under a file lock and the calls added to what's on disk
+            helper_flock(lock, True)
+            try:
+                self._ledger = None
+                ledger = self._load()
+                for day, calls in self._pending.items():
+                    ledger[day] = ledger.get(day, 0) + calls
+                self._save()
+                self._pending = Counter()
+            finally:
+                helper_flock(lock, False)
+
+    def trim(self, estimate: int) -> int:
+        """
+        Return the number of calls a job is allowed to make, i.e. its estimate trimmed to the remaining budget.
+        :param estimate: Estimated number of API calls the job will make.
+        :type estimate: int
+        :rtype: int
+        """
+        return min(estimate, self.remaining())
+
+
+class RateLimiter:
+    """ Spaces API calls evenly so that no more than calls_per_minute are sent across all threads """
+    def __init__(self, calls_per_minute: int = ApiBudget.PER_MINUTE_LIMIT):
+        """
+        Initialization of Rate Limiter
+        :param calls_per_minute: Max number of API calls per minute. 0 = unlimited.
+        :type calls_per_minute: int
+        """
+        self.interval = 60 / calls_per_minute if calls_per_minute else 0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Block until the next call is allowed to be sent. Slots are reserved under the lock and waited for outside of it, so waiting threads queue up in order.
+        :rtype: float
+        :return: Seconds spent waiting.
+        """
+        with self._lock:
+            now = monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            sleep(wait)
+        return wait
+
+    def next_slot(self) -> float:
+        """ Monotonic time of the next free slot. A time in the past means a call could be sent right away. """
+        with self._lock:
+            return self._next_slot
+
+
+class RequestScheduler:
+    """
+    Priority-aware gate in front of the rate limit. Only one request at a time waits on the rate limiter; the rest queue here by priority class and are let through by weighted round-robin between classes and round-robin between clients within a class.
+    An interactive request therefore waits behind at most a few rate-limit slots, however many bulk pages are queued, while bulk jobs still get their share.
+    """
+    PRIORITIES = ("interactive", "normal", "bulk")
+    # Share of the rate limit each class gets while every class has requests queued
+    WEIGHTS = {"interactive": 6, "normal": 3, "bulk": 1}
+
+    def __init__(self, weights: dict | None = None):
+        """
+        Initialization of Request Scheduler
+        :param weights: Optional parameter. Weight of each priority class. Default = WEIGHTS.
+        :type weights: dict | None
+        """
+        self.weights = weights or dict(self.WEIGHTS)
+        # Per class: client -> queued tickets, in the order clients are served
+        self._queues = {priority: {} for priority in self.PRIORITIES}
+        self._credit = {priority: 0 for priority in self.PRIORITIES}
+        self._busy = False
+        self._cond = threading.Condition()
+        self.granted = {priority: 0 for priority in self.PRIORITIES}
+        self.queued_seconds = {priority: 0.0 for priority in self.PRIORITIES}
+
+
+    def _next_ticket(self) -> list | None:
+        """ Pop the next ticket to let through: smooth weighted round-robin between non-empty classes, then the first client in line within the class. Must be called with the lock held. """
+        ready = [priority for priority in self.PRIORITIES if self._queues[priority]]
+        if not ready:
+            return None
+        for priority in ready:
+            self._credit[priority] += self.weights[priority]
+        priority = max(ready, key=self._credit.get)
+        self._credit[priority] -= sum(self.weights[p] for p in ready)
+        clients = self._queues[priority]
+        owner = next(iter(clients))
+        tickets = clients.pop(owner)
+        ticket = tickets.popleft()
+        # The client goes to the back of the line if it has more requests queued
+        if tickets:
+            clients[owner] = tickets
+        return ticket
+
+    def pending(self) -> dict:
+        """ Number of queued requests per priority class. """
+        with self._cond:
+            return {priority: sum(map(len, clients.values())) for priority, clients in self._queues.items()}
+
+    def acquire(self, take, priority: str = "normal", owner=None) -> tuple[object, float]:
+        """
+        Wait for this request's turn, then run take() (which waits on the rate limiter) before letting the next request through.
+        :param take: Function that waits for a rate-limit slot, i.e. RateLimiter.acquire.
+        :param priority: One of PRIORITIES.
+        :type priority: str
+        :param owner: Optional parameter. Client the request belongs to, for round-robin within the class. Default = one shared line.
+        :rtype: tuple(object,float)
+        :return: take()'s result, and seconds spent queued before it.
+        """
+        from collections import deque
+
+        if priority not in self.weights:
+            raise ValueError(f"Unknown priority {priority!r}. Use one of {', '.join(self.PRIORITIES)}.")
+        start = monotonic()
+        with self._cond:
+            if self._busy:
+                ticket = [False]
+                self._queues[priority].setdefault(owner, deque()).append(ticket)
+                while not ticket[0]:
+                    self._cond.wait()
+            # The turn is handed over with _busy left set, so no new arrival can cut in
+            self._busy = True
+            queued = monotonic() - start
+            self.granted[priority] += 1
+            self.queued_seconds[priority] += queued
+        try:
+            return take(), queued
+        finally:
+            with self._cond:
+                ticket = self._next_ticket()
+                if ticket:
+                    ticket[0] = True
+                    self._cond.notify_all()
+                else:
+                    self._busy = False
+
+    def report(self) -> str:
+        """
+        Tabulated requests & average queueing time per priority class for printing to the console.
+        :rtype: str
+        """
+        with self._cond:
+            rows = [{
+                "Priority": priority,
+                "Requests": self.granted[priority],
+                "Avg Queued (s)": round(self.queued_seconds[priority] / self.granted[priority], 3),
+            } for priority in self.PRIORITIES if self.granted[priority]]
+        return preview_table(rows)
+
+
+class KeyPool:
+    """ Pool of API keys, each with its own RateLimiter and usage counter. Each request is sent with the key with the most headroom, and a key that gets a 429 is benched for a while. """
+    # Seconds a key is benched after a 429 without a Retry-After header
+    BENCH_SECONDS = 60
+
+    def __init__(self, keys: list[str], calls_per_minute: int = ApiBudget.PER_MINUTE_LIMIT):
+        """
+        Initialization of Key Pool
+        :param keys: API keys. Duplicates and blanks are ignored.
+        :type keys: list[str]
+        :param calls_per_minute: Max number of API calls per minute for each key. 0 = unlimited.
+        :type calls_per_minute: int
+        """
+        self.keys = list(dict.fromkeys(key.strip() for key in keys if key.strip()))
+        if not self.keys:
+            raise ValueError("KeyPool needs at least one API key.")
+        self.limiters = {key: RateLimiter(calls_per_minute) for key in self.keys}
+        self.used = {key: 0 for key in self.keys}
+        self.throttled = {key: 0 for key in self.keys}
+        self.benched_until = {key: 0.0 for key in self.keys}
+        self._lock = threading.Lock()
+
+
+    def budget(self, ledger_file: str | None = None) -> ApiBudget:
+        """
+        Call budget for the whole pool: each key's demo quota, times the number of keys. The pool's calls are counted in one ledger.
+        :param ledger_file: Path of the ledger. Default = ApiBudget.LEDGER_FILE.
+        :type ledger_file: str | None
+        :rtype: ApiBudget
+        """
+        return ApiBudget(ApiBudget.DAILY_LIMIT * len(self.keys), ApiBudget.MONTHLY_LIMIT * len(self.keys), ledger_file)
+
+    def acquire(self) -> tuple[str, float]:
+        """
+        Pick the key with the most headroom, i.e. the earliest free rate-limit slot (fewest calls sent on a tie), and block until its slot. Benched keys are skipped; if every key is benched, the call waits for the first one to come back.
+        :rtype: tuple(str,float)
+        :return: The key to send the request with, and seconds spent waiting.
+        """
+        with self._lock:
+            now = monotonic()
+            active = [key for key in self.keys if self.benched_until[key] <= now]
+            if active:
+                key = min(active, key=lambda key: (self.limiters[key].next_slot(), self.used[key]))
+            else:
+                key = min(self.keys, key=self.benched_until.get)
+            bench_wait = max(0.0, self.benched_until[key] - now)
+            self.used[key] += 1
+        if bench_wait:
+            sleep(bench_wait)
+        return key, bench_wait + self.limiters[key].acquire()
+
+    def bench(self, key: str, seconds: float | None = None):
+        """
+        Take a key out of rotation after it was rate limited.
+        :param key: API key.
+        :type key: str
+        :param seconds: Seconds to bench the key for, i.e. the server's Retry-After. Default = BENCH_SECONDS.
+        :type seconds: float | None
+        """
+        with self._lock:
+            self.throttled[key] += 1
+            self.benched_until[key] = max(self.benched_until[key], monotonic() + (seconds if seconds is not None else self.BENCH_SECONDS))
+
+    def report(self) -> str:
+        """
+        Tabulated per-key usage for printing to the console. Keys are masked to their last 4 characters.
+        :rtype: str
+        """
+        now = monotonic()
+        with self._lock:
+            rows = [{
+                "Key": f"...{key[-4:]}",
+                "Requests": self.used[key],
+                "429s": self.throttled[key],
+                "Benched (s)": round(max(0.0, self.benched_until[key] - now), 1),
+            } for key in self.keys]
+        return preview_table(rows)
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker, keyed by path pattern (see helper_endpoint_pattern()). After failure_threshold failed attempts in a row (5xx, connection errors, timeouts) the endpoint's circuit opens and its requests are refused without being sent.
+    After cooldown seconds the circuit is half-open: one probe request is let through, and its result closes the circuit or opens it again.
+    """
+    STATES = ("closed", "half_open", "open")
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30):
+        """
+        Initialization of Circuit Breaker
+        :param failure_threshold: Failed attempts in a row that open an endpoint's circuit. 0 = never open.
+        :type failure_threshold: int
+        :param cooldown: Seconds an open circuit refuses requests before letting a probe through.
+        :type cooldown: float
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        # Path pattern: {"state", "failures", "opened" (monotonic time the circuit opened or the probe was sent)}
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+
+    def _endpoint(self, pattern: str) -> dict:
+        """ Breaker state for an endpoint's path pattern, created on first use. Must be called with the lock held. """
+        return self.endpoints.setdefault(pattern, {"state": "closed", "failures": 0, "opened": 0.0})
+
+    def state(self, endpoint: str) -> str:
+        """ State of an endpoint's circuit: one of STATES. """
+        with self._lock:
+            return self._endpoint(helper_endpoint_pattern(endpoint))["state"]
+
+    def allow(self, endpoint: str, metrics: "Metrics | None" = None):
+        """
+        Check that a request to an endpoint may be sent. Called by Auth._fetch() before each attempt.
+        :param endpoint: API endpoint path.
+        :type endpoint: str
+        :param metrics: Optional parameter. Metrics to count refused requests & state changes in.
+        :type metrics: Metrics | None
+        :raises CircuitOpen: If the circuit is open, or half-open with its probe still in flight.
+        """
+        pattern = helper_endpoint_pattern(endpoint)
+        with self._lock:
+            circuit = self._endpoint(pattern)
+            waited = monotonic() - circuit["opened"]
+            if circuit["state"] == "closed":
+                return
+            # An open circuit lets one probe through once it has cooled down. So does a half-open one whose probe never reported back.
+            if waited >= self.cooldown:
+                circuit["state"], circuit["opened"] = "half_open", monotonic()
+                if metrics:
+                    metrics.set_circuit(endpoint, "half_open")
+                return
+        if metrics:
+            metrics.incr(endpoint, "short_circuited")
+        raise CircuitOpen(f"{pattern} is failing ({circuit['failures']} failed attempts in a row). Requests to it are paused for {self.cooldown - waited:.0f}s. Request to {endpoint} was not sent.")
+
+    def record(self, endpoint: str, ok: bool, metrics: "Metrics | None" = None):
+        """
+        Record the outcome of an attempt. Called by Auth._fetch().
+        :param endpoint: API endpoint path.
+        :type endpoint: str
+        :param ok: Whether the endpoint responded normally. 4xx responses (including 429) count as ok, since the endpoint is up.
+        :type ok: bool
+        :param metrics: Optional parameter. Metrics to report state changes in.
+        :type metrics: Metrics | None
+        """
+        pattern = helper_endpoint_pattern(endpoint)
+        with self._lock:
+            circuit = self._endpoint(pattern)
+            before = circuit["state"]
+            if ok:
+                circuit["state"], circuit["failures"] = "closed", 0
+            else:
+                circuit["failures"] += 1
+                if before == "half_open" or (before == "closed" and self.failure_threshold and circuit["failures"] >= self.failure_threshold):
+                    circuit["state"], circuit["opened"] = "open", monotonic()
+            after = circuit["state"]
+        if metrics and after != before:
+            metrics.set_circuit(endpoint, after)
+            if after == "open":
+                metrics.incr(endpoint, "circuit_opens")
+
+    def reset(self):
+        """ Close every circuit. """
+        with self._lock:
+            self.endpoints = {}
+
+
+class Metrics:
+    """ Per-endpoint request metrics recorded by Auth._get """
+    # Upper bounds (seconds) of the request latency histogram buckets
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    COUNTERS = ("requests", "errors", "retries", "coalesced", "cache_hits", "cache_misses", "bytes", "rate_limited_seconds", "queued_seconds", "latency_sum", "circuit_opens", "short_circuited")
+
+    def __init__(self):
+        """ Initialization of Metrics. Endpoints are keyed by path pattern (see helper_endpoint_pattern()). """
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+
+    def _endpoint(self, endpoint: str) -> dict:
+        """ Metrics for an endpoint's path pattern, created on first use. Must be called with the lock held. """
+        pattern = helper_endpoint_pattern(endpoint)
+        if pattern not in self.endpoints:
+            self.endpoints[pattern] = {counter: 0 for counter in self.COUNTERS}
+            # One count per bucket plus +Inf
+            self.endpoints[pattern]["latency_buckets"] = [0] * (len(self.LATENCY_BUCKETS) + 1)
+            self.endpoints[pattern]["circuit"] = "closed"
+        return self.endpoints[pattern]
+
+    def incr(self, endpoint: str, counter: str, amount: float = 1):
+        """
+        Add to one of an endpoint's counters.
+        :param endpoint: API endpoint path.
+        :type endpoint: str
+        :param counter: One of COUNTERS.
+        :type counter: str
+        :param amount: Amount to add.
+        :type amount: float
+        """
+        with self._lock:
+            self._endpoint(endpoint)[counter] += amount
+
+    def set_circuit(self, endpoint: str, state: str):
+        """
+        Record the state of an endpoint's circuit breaker.
+        :param endpoint: API endpoint path.
+        :type endpoint: str
+        :param state: One of CircuitBreaker.STATES.
+        :type state: str
+        """
+        with self._lock:
+            self._endpoint(endpoint)["circuit"] = state
+
+    def observe(self, endpoint: str, latency: float, size: int = 0, error: bool = False):
+        """
+        Record a request sent to the API.
+        :param endpoint: API endpoint path.
+        :type endpoint: str
+        :param latency: Seconds from sending the request to receiving the response.
+        :type latency: float
+        :param size: Bytes received.
+        :type size: int
+        :param error: Whether the request failed (error status code, connection error, timeout, etc).
+        :type error: bool
+        """
+        bucket = next((i for i, bound in enumerate(self.LATENCY_BUCKETS) if latency <= bound), len(self.LATENCY_BUCKETS))
+        with self._lock:
+            metrics = self._endpoint(endpoint)
+            metrics["requests"] += 1
+            metrics["errors"] += error
+            metrics["bytes"] += size
+            metrics["latency_sum"] += latency
+            metrics["latency_buckets"][bucket] += 1
+
+
+    def snapshot(self) -> dict:
+        """
+        Copy of the current metrics, keyed by endpoint path pattern.
+        :rtype: dict
+        """
+        with self._lock:
+            return {pattern: {**metrics, "latency_buckets": list(metrics["latency_buckets"])} for pattern, metrics in self.endpoints.items()}
+
+    def reset(self):
+        """ Clear all metrics. """
+        with self._lock:
+            self.endpoints = {}
+
+    def report(self) -> str:
+        """
+        Tabulated summary of the metrics for printing to the console.
+        :rtype: str
+        """
+        rows = []
+        for pattern, metrics in self.snapshot().items():
+            requests = metrics["requests"]
+            # Upper bound of the bucket holding the 95th percentile request
+            cumulative = 0
+            p95 = None
+            for bound, count in zip(self.LATENCY_BUCKETS + (float("inf"),), metrics["latency_buckets"]):
+                cumulative += count
+                if requests and cumulative >= 0.95 * requests:
+                    p95 = bound
+                    break
+            rows.append({
+                "Endpoint": pattern,
+                "Requests": requests,
+                "Errors": metrics["errors"],
+                "Retries": metrics["retries"],
+                "Coalesced": metrics["coalesced"],
+                "Cache Hits": metrics["cache_hits"],
+                "Cache Misses": metrics["cache_misses"],
+                "Avg Latency (s)": round(metrics["latency_sum"] / requests, 3) if requests else "null",
+                "p95 Latency (s)": f"<= {p95}" if p95 is not None else "null",
+                "KB Received": helper_rfmt_1000(metrics["bytes"] / 1024),
+                "Rate-Limited (s)": round(metrics["rate_limited_seconds"], 2),
+                "Queued (s)": round(metrics["queued_seconds"], 2),
+                "Circuit": metrics["circuit"],
+                "Short-Circuited": metrics["short_circuited"],
+            })
+        return preview_table(rows) if rows else "No API requests were made."
+
+    def prometheus(self) -> str:
+        """
+        Metrics in Prometheus text exposition format.
+        :rtype: str
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for counter, help_text in (
+                ("requests", "API requests sent, including retries."),
+                ("errors", "API requests that failed."),
+                ("retries", "API requests retried after a failure."),
+                ("coalesced", "Requests that shared an identical in-flight request instead of being sent."),
+                ("cache_hits", "Requests answered from a cache."),
+                ("cache_misses", "Requests not found in a cache."),
+                ("bytes", "Response bytes received."),
+                ("rate_limited_seconds", "Seconds spent waiting on rate limits."),
+                ("queued_seconds", "Seconds spent queued behind higher-priority requests in the request scheduler."),
+                ("circuit_opens", "Times the endpoint's circuit breaker opened."),
+                ("short_circuited", "Requests refused without being sent because the endpoint's circuit was open.")):
+            name = f"coingecko_{counter}_total"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f'{name}{{endpoint="{pattern}"}} {metrics[counter]}' for pattern, metrics in snapshot.items()]
+
+        name = "coingecko_circuit_state"
+        lines += [f"# HELP {name} Circuit breaker state: 0 = closed, 1 = half-open, 2 = open.", f"# TYPE {name} gauge"]
+        lines += [f'{name}{{endpoint="{pattern}"}} {CircuitBreaker.STATES.index(metrics["circuit"])}' for pattern, metrics in snapshot.items()]
+
+        name = "coingecko_request_duration_seconds"
+        lines += [f"# HELP {name} API request latency.", f"# TYPE {name} histogram"]
+        for pattern, metrics in snapshot.items():
+            cumulative = 0
+            for bound, count in zip(self.LATENCY_BUCKETS + ("+Inf",), metrics["latency_buckets"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{endpoint="{pattern}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{endpoint="{pattern}"}} {metrics["latency_sum"]}')
+            lines.append(f'{name}_count{{endpoint="{pattern}"}} {metrics["requests"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """
+        Write the metrics to a Prometheus text-format file, i.e. for node_exporter's textfile collector.
+        :param path: File to write.
+        :type path: str
+        """
+        # Write to a temp file first so that a collector never reads a half-written file
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as file:
+            file.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+class Cassette:
+    """ Recorded raw API responses, for replaying real payloads through the flows with no network """
+    CASSETTE_FILE = "api_cassette.json.gz"
+
+    def __init__(self, path: str | None = None, mode: str = "replay"):
+        """
+        Initialization of Cassette. An existing cassette file is loaded in both modes, so recording adds to it.
+        :param path: Path of the gzipped JSON cassette. Default = CASSETTE_FILE in the working directory.
+        :type path: str | None
+        :param mode: "record" to save every response received from the API, or "replay" to serve recorded responses instead of calling the API.
+        :type mode: str
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path or self.CASSETTE_FILE
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.entries = {}
+        self.changed = False
+        if os.path.exists(self.path):
+            import gzip
+            with gzip.open(self.path, "rt") as file:
+                self.entries = json.load(file)
+        elif mode == "replay":
+            raise FileNotFoundError(f"Cassette {self.path} not found. Record one with --record first.")
+
+
+    @staticmethod
+    def key(endpoint: str, params: dict | None) -> str:
+        """ Cassette key of a request, i.e. "coins/bitcoin/tickers?order=volume_desc&page=2". Built from helper_request_key() so param order doesn't matter. """
+        endpoint, params = helper_request_key(endpoint, params)
+        return endpoint + ("?" + "&".join(f"{k}={v}" for k, v in params) if params else "")
+
+    def record(self, endpoint: str, params: dict | None, response):
+        """
+        Save a response received from the API. A later response to the same request replaces the earlier one.
+        :param endpoint: API endpoint path.
+        :type endpoint: str
+        :param params: Query parameters of the request.
+        :type params: dict | None
+        :param response: requests Response.
+        """
+        import base64
+
+        # The raw bytes are kept, base64-encoded, rather than the decoded text, so replay hands the JSON decoder exactly what the API sent
+        entry = {"status": response.status_code, "headers": dict(response.headers), "content": base64.b64encode(response.content).decode("ascii")}
+        with self._lock:
+            self.entries[self.key(endpoint, params)] = entry
+            self.changed = True
+
+    def play(self, endpoint: str, params: dict | None) -> dict | None:
+        """
+        Look up a recorded response.
+        :rtype: dict | None
+        :return: {"status", "headers", "content"} of the recorded response, or None if the request was never recorded.
+        """
+        return self.entries.get(self.key(endpoint, params))
+
+    @staticmethod
+    def content(entry: dict) -> bytes:
+        """
+        Raw response bytes of a recorded entry. Entries from cassettes recorded before bytes were kept only have the decoded "body" text.
+        :rtype: bytes
+        """
+        if "content" in entry:
+            import base64
+            return base64.b64decode(entry["content"])
+        return entry["body"].encode()
+
+    def save(self):
+        """ Write the cassette to disk if anything was recorded. Written to a temp file first, like the budget ledger. """
+        with self._lock:
+            if not self.changed:
+                return
+            import gzip
+            tmp = f"{self.path}.tmp"
+            with gzip.open(tmp, "wt") as file:
+                json.dump(self.entries, file, separators=(",", ":"))
+            os.replace(tmp, self.path)
+            self.changed = False
+
+
+class Spans:
+    """ Lightweight, nestable timing spans around the stages of each flow (fetch, build, render, export), emitted as JSON lines """
+    def __init__(self):
+        """ Initialization of Spans. Spans are disabled until enable() is called, and cost next to nothing while disabled. """
+        self.enabled = False
+        self.stream = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._next_id = 0
+
+
+    def enable(self, path: str | None = None):
+        """
+        Start emitting spans.
+        :param path: File to append JSON lines to. None or "-" = stderr.
+        :type path: str | None
+        """
+        self.stream = sys.stderr if path in (None, "-") else open(path, "a")
+        self.enabled = True
+
+    def span(self, name: str, parent: "_Span | None" = None, **attrs):
+        """
+        Time a stage: `with spans.span("build", builder="e_pair_dict_build") as span: ... span.set(rows=...)`.
+        Spans opened inside another span on the same thread are recorded as its children.
+        :param name: Stage name.
+        :type name: str
+        :param parent: Optional parameter. Parent of a span opened on another thread than its parent, i.e. from current() on the thread that started the work. Default = the innermost open span on this thread.
+        :type parent: _Span | None
+        :param attrs: Attributes recorded with the span, i.e. flow, endpoint. More can be added with .set().
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs, parent)
+
+    def current(self) -> "_Span | None":
+        """ Innermost open span on this thread, to pass as the parent of spans opened on a worker thread. None if there isn't one or spans are disabled. """
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if self.enabled and stack else None
+
+    def end(self, name: str):
+        """
+        End the innermost open span called name on this thread, if there is one. Flows end by chaining into the next flow, so prompts() uses this to end the "flow" span first.
+        :param name: Stage name.
+        :type name: str
+        """
+        if not self.enabled:
+            return
+        for span in reversed(getattr(self._local, "stack", [])):
+            if span.name == name:
+                span.end()
+                return
+
+    def _emit(self, record: dict):
+        """ Write a finished span as one JSON line. """
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class _Span:
+    """ A timing span. Created by Spans.span(). """
+    def __init__(self, spans: Spans, name: str, attrs: dict, parent: "_Span | None" = None):
+        self.spans = spans
+        self.name = name
+        self.attrs = attrs
+        self._parent = parent
+
+    def set(self, **attrs):
+        """ Add attributes to the span, i.e. row & byte counts once they're known. """
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        spans = self.spans
+        with spans._lock:
+            spans._next_id += 1
+            self.id = spans._next_id
+        stack = spans._local.__dict__.setdefault("stack", [])
+        parent = stack[-1] if stack else self._parent
+        self.parent = parent.id if parent else None
+        self.depth = parent.depth + 1 if parent else 0
+        stack.append(self)
+        self.ended = False
+        self.started = datetime.now()
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(exc_type)
+
+    def end(self, exc_type: type | None = None):
+        """ Emit the span. Called when its with block exits, or earlier by Spans.end(), in which case the exit does nothing. """
+        if self.ended:
+            return
+        self.ended = True
+        ms = (perf_counter() - self.start) * 1000
+        self.spans._local.stack.remove(self)
+        record = {"span": self.name, "id": self.id, "parent": self.parent, "depth": self.depth, "start": self.started.isoformat(), "ms": round(ms, 3), "thread": threading.current_thread().name}
+        record.update(self.attrs)
+        if exc_type:
+            record["error"] = exc_type.__name__
+        self.spans._emit(record)
+
+
+class _NullSpan:
+    """ Shared do-nothing span returned while spans are disabled """
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+_NULL_SPAN = _NullSpan()
+# Shared by every flow. Enabled by the --spans flag.
+spans = Spans()
+
+
+class _Flight:
+    """ An in-flight API request that identical concurrent requests wait on. Used by Auth._get. """
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
 
 class Auth:
     """Authentication and Base Endpoint GET"""
     BASE_URL = "https://api.coingecko.com/api/v3"
-
-    def __init__(self, api_key=None):
+    # Shared by every Auth instance so that calls from all flows are counted against the same budget
+    budget = ApiBudget()
+    # Shared for the same reason as the budget. CoinGecko's rate limit is per key, not per flow.
+    rate_limiter = RateLimiter()
+    # Shared so that metrics cover every request made by every flow
+    metrics = Metrics()
+    # Requests currently in flight across all Auth instances, keyed by helper_request_key()
+    _inflight = {}
+    _inflight_lock = threading.Lock()
+    # Cassette to record responses to or replay them from. Set by the --record/--replay flags. None = normal API calls.
+    cassette = None
+    # Shared so that an endpoint found failing by one flow is paused for every flow
+    breaker = CircuitBreaker()
+    # Shared so that requests from every client queue for the rate limit by priority
+    scheduler = RequestScheduler()
+    # Pool of API keys to spread requests over, each under its own rate limit instead of rate_limiter. Set by the --keys flag. None = every request uses the instance's api_key.
+    key_pool = None
+
+    # Failed requests are retried up to max_retries times, waiting retry_backoff * 2^attempt seconds (or the server's Retry-After) in between
+    max_retries = 3
+    retry_backoff = 2.0
+    # Seconds to wait for the API to respond before giving up on an attempt
+    timeout = 30
+
+    def __init__(self, api_key=None, base_url=None, priority: str = "normal"):
         """
         Initialization of API Authentication
         :param api_key: API Key for CoinGecko API access. Default is my demo key.
         :type api_key: str
+        :param base_url: Optional parameter. Base URL of the API, i.e. a local mock_gecko.py server for load testing. Default = BASE_URL.
+        :type base_url: str
+        :param priority: Optional parameter. Scheduling class of this client's requests: 'interactive' for user-facing lookups, 'normal', or 'bulk' for background crawls. Default = 'normal'.
+        :type priority: str
         """
         self._api_key = api_key or "CG-dmmndTzTq3trGas8h5b3aYCQ"
-        self.base_url = self.BASE_URL
-
+        self.base_url = base_url or self.BASE_URL
+        if priority not in RequestScheduler.PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}. Use one of {', '.join(RequestScheduler.PRIORITIES)}.")
+        self.priority = priority
+
+        if Session is None:
+            _import_requests()
+        if json_loads is None:
+            _import_json_decoder()
         self.session = Session()
         self.session.headers.update({
             "Accepts": "application/json",
@@ -33,24 +919,144 @@ class Auth:
 
     def _get(self, endpoint: str, params=None) -> dict | list[dict]:
         """
-        Base GET Request
+        Base GET Request with single-flight request coalescing.
+        If an identical request (same base URL, endpoint and params) is already in flight on another thread, wait for it and share its parsed result rather than sending a duplicate HTTP call.
         :param endpoint: API endpoint path to be appended to BASE_URL
         :type endpoint: str
         :param params: Query parameters for GET request. Optional for some endpoints
         :type params: dict
         :rtype: dict | list[dict]
         """
-        url = f"{self.base_url}/{endpoint}"
+        key = (self.base_url, helper_request_key(endpoint, params))
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            self.metrics.incr(endpoint, "coalesced")
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.result
+
         try:
-            response = self.session.get(url, params=params)
-            status_code = response.status_code
-            response.raise_for_status()
-            return response.json()
-        # [for after project] Implement automated responses to errors such as RETRY, SKIP, etc
-        except (ConnectionError, Timeout, TooManyRedirects) as e:
-            raise e(f"API request failed: {e}")
-        except HTTPError as e:
-            raise HTTPError(f"HTTP error {status_code}: {e}")
+            flight.result = self._fetch(endpoint, params)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+            flight.done.set()
+        return flight.result
+
+
+    def _fetch(self, endpoint: str, params=None) -> dict | list[dict]:
+        """
+        Send a single GET Request. Called by _get().
+        :param endpoint: API endpoint path to be appended to BASE_URL
+        :type endpoint: str
+        :param params: Query parameters for GET request. Optional for some endpoints
+        :type params: dict
+        :rtype: dict | list[dict]
+        """
+        if self.cassette and self.cassette.mode == "replay":
+            return self._replay(endpoint, params)
+        url = f"{self.base_url}/{endpoint}"
+        for attempt in range(self.max_retries + 1):
+            # Fail fast, without queueing for the rate limit, while the endpoint's circuit is open
+            self.breaker.allow(endpoint, self.metrics)
+            if self.budget.remaining() <= 0:
+                raise BudgetExceeded(f"API call budget exhausted ({self.budget.daily_limit}/day, {self.budget.monthly_limit}/month). Request to {endpoint} was not sent.")
+            (key, waited), queued = self.scheduler.acquire(self._take_slot, self.priority, id(self))
+            self.metrics.incr(endpoint, "rate_limited_seconds", waited)
+            self.metrics.incr(endpoint, "queued_seconds", queued)
+            start = perf_counter()
+            try:
+                with spans.span("http", endpoint=helper_endpoint_pattern(endpoint), attempt=attempt) as span:
+                    response = self.session.get(url, params=params, timeout=self.timeout, headers={"x-cg-demo-api-key": key} if key else None)
+                    span.set(status=response.status_code, bytes=len(response.content))
+                self.budget.record()
+                status_code = response.status_code
+                self.metrics.observe(endpoint, perf_counter() - start, len(response.content), status_code >= 400)
+                self.breaker.record(endpoint, status_code < 500, self.metrics)
+                # Rate limited or server-side error. Wait and try again unless this was the last attempt.
+                if status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    delay = helper_retry_delay(response.headers.get("Retry-After"), attempt, self.retry_backoff)
+                    self.metrics.incr(endpoint, "retries")
+                    if status_code == 429 and key:
+                        # Bench the key and retry right away on the key with the most headroom
+                        self.key_pool.bench(key, delay if response.headers.get("Retry-After") else None)
+                        continue
+                    if status_code == 429:
+                        self.metrics.incr(endpoint, "rate_limited_seconds", delay)
+                    sleep(delay)
+                    continue
+                if self.cassette:
+                    self.cassette.record(endpoint, params, response)
+                response.raise_for_status()
+                # Decoded from the raw bytes rather than response.json(), which builds a text copy first and always uses the stdlib decoder
+                return json_loads(response.content)
+            except (ConnectionError, Timeout) as e:
+                self.metrics.observe(endpoint, perf_counter() - start, error=True)
+                self.breaker.record(endpoint, False, self.metrics)
+                if attempt < self.max_retries:
+                    self.metrics.incr(endpoint, "retries")
+                    sleep(helper_retry_delay(None, attempt, self.retry_backoff))
+                    continue
+                raise type(e)(f"API request failed: {e}") from e
+            except TooManyRedirects as e:
+                raise TooManyRedirects(f"API request failed: {e}") from e
+            except HTTPError as e:
+                raise HTTPError(f"HTTP error {status_code}: {e}")
+
+
+    def with_priority(self, priority: str) -> "Auth":
+        """
+        Client for the same key & server whose requests are scheduled in another priority class, i.e. a bulk crawl started from an interactive flow. Shares this client's session.
+        :param priority: One of RequestScheduler.PRIORITIES.
+        :type priority: str
+        :rtype: Auth
+        """
+        import copy
+
+        if priority not in RequestScheduler.PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}. Use one of {', '.join(RequestScheduler.PRIORITIES)}.")
+        if priority == self.priority:
+            return self
+        client = copy.copy(self)
+        client.priority = priority
+        return client
+
+    def _take_slot(self) -> tuple[str | None, float]:
+        """
+        Wait for a rate-limit slot: on the pool key with the most headroom if there's a key pool, otherwise on the shared rate limiter. Called by _fetch() when the scheduler lets the request through.
+        :rtype: tuple(str | None,float)
+        :return: The pool key to send the request with (None = the instance's api_key), and seconds spent waiting.
+        """
+        if self.key_pool:
+            return self.key_pool.acquire()
+        return None, self.rate_limiter.acquire()
+
+    def _replay(self, endpoint: str, params=None) -> dict | list[dict]:
+        """
+        Serve a GET Request from the cassette instead of the API. Called by _fetch() in replay mode. Nothing is sent and no budget is spent.
+        :param endpoint: API endpoint path
+        :type endpoint: str
+        :param params: Query parameters for GET request
+        :type params: dict
+        :rtype: dict | list[dict]
+        """
+        entry = self.cassette.play(endpoint, params)
+        if entry is None:
+            self.metrics.incr(endpoint, "cache_misses")
+            raise CassetteMiss(f"No recorded response for {self.cassette.key(endpoint, params)} in {self.cassette.path}. Request was not sent.")
+        self.metrics.incr(endpoint, "cache_hits")
+        if entry["status"] >= 400:
+            raise HTTPError(f"HTTP error {entry['status']}: replayed from {self.cassette.path}")
+        return json_loads(self.cassette.content(entry))
 
 
     @property
@@ -66,6 +1072,96 @@ class Auth:
         self._api_key = api_key
 
 
+class TickerCrawl:
+    """ Paged crawl of a ticker endpoint with page, row and wall-clock limits. Iterating it yields pages; afterwards it reports whether the crawl was complete or why it was truncated. """
+    # Defaults for crawls started by the flows. Set by the --max-rows/--deadline flags.
+    default_max_rows = None
+    default_deadline = None
+
+    def __init__(self, fetch_page, max_pages: int = MAX_TICKER_PAGES, max_rows: int | None = None, deadline: float | None = None, min_volume_usd: float | None = None):
+        """
+        Initialization of Ticker Crawl. Nothing is fetched until the crawl is iterated.
+        :param fetch_page: Function that takes a page number and returns the API response for it, or None on failure.
+        :param max_pages: Max number of pages to fetch. Default = MAX_TICKER_PAGES.
+        :type max_pages: int
+        :param max_rows: Max number of tickers to return. The page that reaches it is cut short. Default = default_max_rows (no limit).
+        :type max_rows: int | None
+        :param deadline: Seconds after the first page is requested to stop requesting more. A page already in flight is still returned. Default = default_deadline (no limit).
+        :type deadline: float | None
+        :param min_volume_usd: Only for pages ordered by volume descending. Stale tickers and tickers under this 24h USD volume are dropped, and the crawl ends at the first page that goes under it. Default = None (keep every ticker).
+        :type min_volume_usd: float | None
+        """
+        self.fetch_page = fetch_page
+        self.max_pages = max_pages
+        self.max_rows = max_rows if max_rows is not None else self.default_max_rows
+        self.deadline = deadline if deadline is not None else self.default_deadline
+        self.min_volume_usd = min_volume_usd
+        self.pages = 0
+        self.rows = 0
+        # Tickers cut from the last page by max_rows
+        self.dropped = 0
+        # "complete", or why the crawl was truncated: "max_pages", "max_rows", "deadline" or "error". None until the crawl ends.
+        self.reason = None
+
+
+    @property
+    def complete(self) -> bool:
+        """ Whether every ticker was fetched. """
+        return self.reason == "complete"
+
+    def __iter__(self):
+        per_page = ENDPOINT_PAGE_SIZE["coins/{id}/tickers"]
+        start = monotonic()
+        for page in range(1, self.max_pages + 1):
+            if self.max_rows is not None and self.rows >= self.max_rows:
+                self.reason = "max_rows"
+                return
+            if self.deadline is not None and monotonic() - start >= self.deadline:
+                self.reason = "deadline"
+                return
+            response = self.fetch_page(page)
+            if not response:
+                self.reason = "error"
+                return
+            # Check if the response is the one they give when there's no more data to display.
+            # RegExp would work here, but simply checking if there's data in 'tickers' is much more robust and generally applicable.
+            if isinstance(response, dict) and "tickers" in response and not response["tickers"]:
+                self.reason = "complete"
+                return
+            tickers = response["tickers"]
+            # A short page is the last one, so there's no need to ask for the empty page after it
+            last = len(tickers) < per_page
+            if self.min_volume_usd is not None:
+                kept = [ticker for ticker in tickers if (ticker["converted_volume"].get("usd") or 0) >= self.min_volume_usd]
+                # Pages are ordered by volume, so every ticker after the first one under the threshold is under it too
+                last = last or len(kept) < len(tickers)
+                tickers = [ticker for ticker in kept if not ticker.get("is_stale")]
+                response = dict(response, tickers=tickers)
+            if self.max_rows is not None and self.rows + len(tickers) > self.max_rows:
+                response = dict(response, tickers=tickers[:self.max_rows - self.rows])
+                # Only the end of the data is known when the cut page was the last one, so the crawl is complete with a known number of tickers left out
+                if last:
+                    self.dropped = self.rows + len(tickers) - self.max_rows
+            self.pages += 1
+            self.rows += len(response["tickers"])
+            yield response
+            if last:
+                self.reason = "complete"
+                return
+        self.reason = "max_pages"
+
+    def summary(self) -> str:
+        """ One-line description of how the crawl ended, for printing to the user. """
+        if self.min_volume_usd is not None and self.reason in ("complete", "max_rows"):
+            return f"Fetched the top {self.rows} tickers by volume (over {helper_rfmt_usd(self.min_volume_usd)}) in {self.pages} pages."
+        if self.complete and self.dropped:
+            return f"Fetched {self.rows} of the {self.rows + self.dropped} tickers in {self.pages} pages (the {self.max_rows} row limit)."
+        if self.complete:
+            return f"Fetched all {self.rows} tickers in {self.pages} pages."
+        limits = {"max_pages": f"the {self.max_pages} page limit", "max_rows": f"the {self.max_rows} row limit", "deadline": f"the {self.deadline}s deadline", "error": "a failed request"}
+        return f"Note: Results were truncated by {limits.get(self.reason, 'the crawl being stopped')} after {self.rows} tickers in {self.pages} pages."
+
+
 class Assets(Auth):
     """ Asset GET Requests Class """
     def coin_list(self) -> list[dict]:
@@ -85,6 +1181,9 @@ class Assets(Auth):
         except (ConnectionError, Timeout, TooManyRedirects) as e:
             print (f"API request failed: {e}")
             return None
+        except RequestRefused as e:
+            print(e)
+            return None
         except HTTPError as e:
             print("No data returned. Please input a valid asset ID")
             return None
@@ -129,12 +1228,55 @@ class Assets(Auth):
         except (ConnectionError, Timeout, TooManyRedirects) as e:
             print (f"API request failed: {e}")
             return None
+        except RequestRefused as e:
+            print(e)
+            return None
         except HTTPError as e:
             print("HTTPError: No data returned. Please check your asset and/or exchange ID and try again.")
             return None
         return data
 
 
+    def coin_mkts_ids(
+            self,
+            ids: list[str],
+            workers: int = 4,
+            max_chunks: int | None = None
+            ) -> tuple[list[dict], list[str]]:
+        """
+        Get asset & market data for a list of Gecko Asset IDs.
+        IDs are split into chunks of at most 250 IDs (1 full page) whose comma-joined length stays under MAX_IDS_QUERY_LEN. Chunks are fetched concurrently under the shared rate limiter and the results are merged in order of market cap descending.
+        Called by asset_mkts() function.
+
+        :param ids: CoinGecko asset IDs. Duplicates and blanks are ignored.
+        :type ids: list[str]
+        :param workers: Max number of chunks fetched at once.
+        :type workers: int
+        :param max_chunks: Optional parameter. Max number of chunks (API calls) to fetch, i.e. when trimmed by the API call budget. Default = all chunks.
+        :type max_chunks: int | None
+        :rtype: tuple(list[dict],list[str])
+        :return: Market data for the IDs returned, and the IDs that were not returned.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        ids = list(dict.fromkeys(i for i in ids if i))
+        chunks = helper_chunk_ids(ids, ENDPOINT_PAGE_SIZE["coins/markets"])[:max_chunks]
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            responses = list(pool.map(lambda chunk: self.coin_mkts(ids=chunk, per_page=ENDPOINT_PAGE_SIZE["coins/markets"], page=1), chunks))
+        return self._merge_ids(ids, responses)
+
+    @staticmethod
+    def _merge_ids(ids: list[str], responses: list) -> tuple[list[dict], list[str]]:
+        """ Merge the coins/markets responses of coin_mkts_ids() chunks, and list the IDs that weren't returned. """
+        data = [asset for response in responses if response for asset in response]
+        # Assets without a market cap go to the bottom, same as the API's own ordering
+        data.sort(key=lambda asset: asset.get("market_cap") or 0, reverse=True)
+        returned = {asset["id"] for asset in data}
+        missing = [i for i in ids if i not in returned]
+        return data, missing
+
+
     def coin_pairs(
             self,
             id: str,
@@ -156,7 +1298,7 @@ class Assets(Auth):
         :type exchange_ids: str | None
         :param page: Optional parameter. Page number for paginated results.
         :type page: int | None
-        :param order: Static parameter, not currently moddable by user. Set the method by which results will be ordered. Default = 'trust_score_desc'. Acceptable values = (trust_score_desc, trust_score_asc, volume_desc, volume_asc)
+        :param order: Optional parameter. Set the method by which results will be ordered. Default = 'trust_score_desc'. Acceptable values = (trust_score_desc, trust_score_asc, volume_desc, volume_asc). Used by coin_pairs_topk().
         :type order: str | None
         :rtype: list[dict]
         """
@@ -164,6 +1306,7 @@ class Assets(Auth):
         params = {
             "exchange_ids": exchange_ids,
             "page": page,
+            "order": order,
         }
 
         try:
@@ -172,11 +1315,67 @@ class Assets(Auth):
         except (ConnectionError, Timeout, TooManyRedirects) as e:
             print (f"API request failed: {e}")
             return None
+        except RequestRefused as e:
+            print(e)
+            return None
         except HTTPError as e:
             print("No data returned. Please input a valid asset ID")
             return None
         return data
 
+    def coin_pairs_pages(
+            self,
+            id: str,
+            exchange_ids: str | None = None,
+            max_pages: int = MAX_TICKER_PAGES,
+            max_rows: int | None = None,
+            deadline: float | None = None
+            ) -> TickerCrawl:
+        """
+        Crawl coin_pairs() pages for an asset, one request per page as they're consumed, until the API runs out of tickers, a request fails, or a page, row or time limit is reached.
+        The crawl reports whether it was complete or why it was truncated once it's been iterated.
+        Called by asset_pairs() function.
+
+        :param id: The CoinGecko ID for the asset whose market pairs you wish to view.
+        :type id: str
+        :param exchange_ids: Optional parameter. Comma-separated CoinGecko Exchange IDs.
+        :type exchange_ids: str | None
+        :param max_pages: Max number of pages to fetch. Default = MAX_TICKER_PAGES.
+        :type max_pages: int
+        :param max_rows: Optional parameter. Max number of tickers to fetch.
+        :type max_rows: int | None
+        :param deadline: Optional parameter. Seconds after which no more pages are requested.
+        :type deadline: float | None
+        :rtype: TickerCrawl
+        """
+        return TickerCrawl(lambda page: self.coin_pairs(id=id, exchange_ids=exchange_ids, page=page), max_pages, max_rows, deadline)
+
+    def coin_pairs_topk(
+            self,
+            id: str,
+            k: int = 10,
+            min_volume_usd: float = 0,
+            exchange_ids: str | None = None,
+            max_pages: int = MAX_TICKER_PAGES
+            ) -> TickerCrawl:
+        """
+        Crawl an asset's K most liquid market pairs. Pages are requested in order of volume descending, so the crawl stops as soon as K non-stale tickers over min_volume_usd have been collected, or a page drops under min_volume_usd. Usually 1-2 calls rather than a full crawl.
+        Called by asset_pairs() function.
+
+        :param id: The CoinGecko ID for the asset whose market pairs you wish to view.
+        :type id: str
+        :param k: Number of tickers to return.
+        :type k: int
+        :param min_volume_usd: Optional parameter. Min 24h volume in USD. Default = 0.
+        :type min_volume_usd: float
+        :param exchange_ids: Optional parameter. Comma-separated CoinGecko Exchange IDs.
+        :type exchange_ids: str | None
+        :param max_pages: Max number of pages to fetch. Default = MAX_TICKER_PAGES.
+        :type max_pages: int
+        :rtype: TickerCrawl
+        """
+        return TickerCrawl(lambda page: self.coin_pairs(id=id, exchange_ids=exchange_ids, page=page, order="volume_desc"), max_pages, max_rows=k, min_volume_usd=min_volume_usd)
+
 
 class Exchanges(Auth):
     """ Exchanges GET Requests Class """
@@ -197,6 +1396,9 @@ class Exchanges(Auth):
         except (ConnectionError, Timeout, TooManyRedirects) as e:
             print (f"API request failed: {e}")
             return None
+        except RequestRefused as e:
+            print(e)
+            return None
         except HTTPError as e:
             print("HTTPError: No data returned.")
             return None
@@ -228,6 +1430,9 @@ class Exchanges(Auth):
         except (ConnectionError, Timeout, TooManyRedirects) as e:
             print (f"API request failed: {e}")
             return None
+        except RequestRefused as e:
+            print(e)
+            return None
         except HTTPError as e:
             print("HTTPError: No data returned. Please check your asset and exchange ID and try again.")
             return None
@@ -243,96 +1448,1479 @@ class Exchanges(Auth):
         Essentially a combination of exch_list and exch_data datasets with the addition of exchange social media links.
         Called by exchange_top100() function.
 
-        :param id: Required. Gecko Exchange ID. Only allowed query one exchange at a time.
-        :type id: str
-        :rtype: dict[list[dict]]
+        :param id: Required. Gecko Exchange ID. Only allowed query one exchange at a time.
+        :type id: str
+        :rtype: dict[list[dict]]
+        """
+        params = {
+            # dex fmt API default = 'contract_address'. Code default = 'symbol' .
+            "dex_pair_format": "contract_address"
+        }
+        path = f"exchanges/{id}"
+        try:
+            print("Fetching data. One moment please.")
+            data = self._get(path,params)
+        except (ConnectionError, Timeout, TooManyRedirects) as e:
+            print (f"API request failed: {e}")
+            return None
+        except RequestRefused as e:
+            print(e)
+            return None
+        except HTTPError as e:
+            print("HTTPError: No data returned. Please check your asset and exchange ID and try again.")
+            return None
+        return data
+
+
+    def exch_pairs(
+        self,
+        id: str,
+        coin_ids: str | None = None,
+        page: int | None = None
+        ) -> dict[list[dict]]:
+        """
+        Query an exchange’s market pairs based on exchange’s ID.
+        Results are ordered by each pair's base asset's market cap descending. For example, if an exchange has BTC/USD and ETH/USD pairs, BTC/USD will be listed first because Bitcoin has a higher market cap than Ethereum.
+        If viewing pairs on a DEX, the pair format will be displayed with each asset's contract address rather than their symbols. This is for ease of use - there is no uniqueness constraint on asset symbols, but contract addresses are unique. Can change 'dex_pair_format' to 'symbol' if desired, although this is not recommended.
+        Called by exchange_pairs() function.
+
+        :param id: Required. Gecko Exchange ID. Only allowed query one exchange at a time.
+        :type id: str
+        :param coin_ids: Optional parameter. Comma-separated list of coin IDs to filter results. If omitted, all pairs listed on the exchange are returned.
+        :type coin_ids: str | None
+        :param page: Optional parameter. Page number for paginated results. Not required unless number of pairs returned exceeds 100.
+        :type page: int | None
+        :rtype: dict[list[dict]]
+        """
+
+        params = {
+            "id": id,
+            "coin_ids": coin_ids,
+            "page": page,
+            # Default ordering is "trust_score_desc". Not moddable with inputs at the moment as I don't see a need to. If I do build that in post-project, another way to order is "base_target", which orders alphabetically by first the base asset symbol and then the target asset symbol. This method of ordering works the exact same way for DEXes with dex_pair_format = "contract_address", which means it's essentially useless for them with that pair format parameter applied
+            "order": "market_cap_desc",
+            "dex_pair_format": "contract_address"
+        }
+        path = f"exchanges/{id}/tickers"
+        try:
+            print("Fetching data. One moment please.")
+            data = self._get(path,params)
+        except (ConnectionError, Timeout, TooManyRedirects) as e:
+            print (f"API request failed: {e}")
+            return None
+        except RequestRefused as e:
+            print(e)
+            return None
+        except HTTPError as e:
+            print("HTTPError: No data returned. Please check your asset and exchange ID and try again.")
+            return None
+        return data
+
+    def exch_pairs_pages(
+            self,
+            id: str,
+            coin_ids: str | None = None,
+            max_pages: int = MAX_TICKER_PAGES,
+            max_rows: int | None = None,
+            deadline: float | None = None
+            ) -> TickerCrawl:
+        """
+        Crawl exch_pairs() pages for an exchange, one request per page as they're consumed, until the API runs out of tickers, a request fails, or a page, row or time limit is reached.
+        The crawl reports whether it was complete or why it was truncated once it's been iterated.
+        Called by exchange_pairs() function.
+
+        :param id: Required. Gecko Exchange ID.
+        :type id: str
+        :param coin_ids: Optional parameter. Comma-separated list of coin IDs to filter results.
+        :type coin_ids: str | None
+        :param max_pages: Max number of pages to fetch. Default = MAX_TICKER_PAGES.
+        :type max_pages: int
+        :param max_rows: Optional parameter. Max number of tickers to fetch.
+        :type max_rows: int | None
+        :param deadline: Optional parameter. Seconds after which no more pages are requested.
+        :type deadline: float | None
+        :rtype: TickerCrawl
+        """
+        return TickerCrawl(lambda page: self.exch_pairs(id=id, coin_ids=coin_ids, page=page), max_pages, max_rows, deadline)
+
+    def exch_listings(
+            self,
+            asset_ids: list[str],
+            exchange_ids: list[str],
+            workers: int = 4,
+            max_calls: int | None = None
+            ) -> tuple["ListingMatrix", list[str]]:
+        """
+        Find which of the assets trade on which of the exchanges with as few calls as possible: one exch_pairs() crawl per exchange per chunk of asset IDs (coin_ids filter), stopped as soon as every asset in the chunk has been seen.
+        Exchanges are crawled concurrently under the shared rate limiter.
+        Called by exchange_matrix() function.
+
+        :param asset_ids: CoinGecko Asset IDs.
+        :type asset_ids: list[str]
+        :param exchange_ids: CoinGecko Exchange IDs.
+        :type exchange_ids: list[str]
+        :param workers: Max number of exchanges crawled at once.
+        :type workers: int
+        :param max_calls: Optional parameter. Max number of API calls (ticker pages) across all crawls, i.e. when trimmed by the API call budget. Split evenly between the crawls; if there are more crawls than calls, the crawls past max_calls aren't started. Default = up to MAX_TICKER_PAGES per crawl.
+        :type max_calls: int | None
+        :rtype: tuple(ListingMatrix,list[str])
+        :return: The matrix, and the exchanges that could not be fully checked (failed requests, or cut by max_calls or the page cap).
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        # The crawls are background work, so they queue behind interactive requests
+        bulk = self.with_priority("bulk")
+        matrix = ListingMatrix(asset_ids, exchange_ids)
+        chunks = helper_chunk_ids(matrix.assets, len(matrix.assets) or 1)
+        jobs = [(exch, chunk) for exch in matrix.exchanges for chunk in chunks]
+        skipped = {exch for exch, _ in jobs[max_calls:]} if max_calls is not None else set()
+        jobs = jobs[:max_calls]
+        max_pages = MAX_TICKER_PAGES
+        if max_calls is not None and jobs:
+            max_pages = max(1, min(MAX_TICKER_PAGES, max_calls // len(jobs)))
+
+        def crawl(job: tuple[str, str]) -> str | None:
+            exch, chunk = job
+            wanted = set(chunk.split(","))
+            pages = bulk.exch_pairs_pages(exch, coin_ids=chunk, max_pages=max_pages)
+            for page in pages:
+                for ticker in page["tickers"]:
+                    for coin in (ticker.get("coin_id"), ticker.get("target_coin_id")):
+                        if coin in wanted:
+                            matrix.set(coin, exch)
+                            wanted.discard(coin)
+                if not wanted:
+                    return None
+            return exch if pages.reason != "complete" else None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            failed = {exch for exch in pool.map(crawl, jobs) if exch}
+        return matrix, [exch for exch in matrix.exchanges if exch in failed or exch in skipped]
+
+
+def _async_method(sync_class: type, name: str):
+    """
+    Build a coroutine method that runs a blocking API method of sync_class in an AsyncAuth's thread pool. The wrapper keeps the blocking method's name, signature and docstring.
+    :param sync_class: Blocking API class, i.e. Assets.
+    :type sync_class: type
+    :param name: Method name, i.e. "coin_list".
+    :type name: str
+    """
+    import functools
+
+    @functools.wraps(getattr(sync_class, name))
+    async def method(self, *args, **kwargs):
+        return await self._run(getattr(self.client, name), *args, **kwargs)
+    return method
+
+
+class AsyncTickerCrawl:
+    """ Async iterator over a TickerCrawl. Each page is requested in the client's thread pool, so iterating it never blocks the event loop. """
+    def __init__(self, client: "AsyncAuth", crawl: TickerCrawl):
+        """
+        Initialization of Async Ticker Crawl. Nothing is fetched until the crawl is iterated.
+        :param client: Async client whose thread pool the pages are fetched in.
+        :type client: AsyncAuth
+        :param crawl: Crawl to iterate.
+        :type crawl: TickerCrawl
+        """
+        self.client = client
+        self.crawl = crawl
+        self._pages = iter(crawl)
+        # Created on first use, inside the event loop
+        self._lock = None
+
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        import asyncio
+        # The crawl is a generator, so pages requested from several tasks at once are fetched one at a time
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            page = await self.client._run(next, self._pages, None)
+        if page is None:
+            raise StopAsyncIteration
+        return page
+
+    @property
+    def reason(self) -> str | None:
+        """ See TickerCrawl.reason. """
+        return self.crawl.reason
+
+    @property
+    def complete(self) -> bool:
+        """ See TickerCrawl.complete. """
+        return self.crawl.complete
+
+    def summary(self) -> str:
+        """ See TickerCrawl.summary(). """
+        return self.crawl.summary()
+
+
+class AsyncAuth:
+    """
+    asyncio front end to a blocking API class, for embedding in an event loop.
+    Every request runs the blocking method on a thread pool of at most `concurrency` threads, so the event loop is never blocked and any number of fetches can be awaited at once while only `concurrency` are sent at a time.
+    Requests go through the same Auth._get as the blocking classes, so they share its rate limiter, budget, retries, single-flight, cassette and metrics.
+    """
+    sync_class = Auth
+    # Max requests in flight per client
+    default_concurrency = 8
+
+    def __init__(self, api_key=None, base_url=None, concurrency: int | None = None, priority: str = "normal"):
+        """
+        Initialization of Async API client. Use it as an async context manager, or call close() when done, to shut down its thread pool.
+        :param api_key: API Key for CoinGecko API access. Default is my demo key.
+        :type api_key: str
+        :param base_url: Optional parameter. Base URL of the API, i.e. a local mock_gecko.py server for load testing. Default = BASE_URL.
+        :type base_url: str
+        :param concurrency: Optional parameter. Max requests in flight at once. Default = default_concurrency.
+        :type concurrency: int | None
+        :param priority: Optional parameter. Scheduling class of this client's requests. See Auth.
+        :type priority: str
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.client = self.sync_class(api_key, base_url, priority)
+        self.concurrency = concurrency or self.default_concurrency
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="gecko-async")
+
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Shut down the thread pool. Requests already running are finished. """
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, func, *args, **kwargs):
+        """ Await a blocking function run in the thread pool. """
+        import asyncio
+        import functools
+
+        return await asyncio.get_running_loop().run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+
+    async def _gather_pages(self, method, count: int, per_page: int, **kwargs) -> list[dict] | None:
+        """
+        Fetch the pages holding the first `count` items of a paginated endpoint concurrently, and join them in page order.
+        :param method: Coroutine method taking per_page & page, i.e. self.coin_mkts.
+        :param count: Number of items.
+        :type count: int
+        :param per_page: Items per page. See ENDPOINT_PAGE_SIZE.
+        :type per_page: int
+        :rtype: list[dict] | None
+        :return: The items, cut short at the first page that failed or came back short. None if the first page failed.
+        """
+        import asyncio
+
+        pages = await asyncio.gather(*(method(per_page=per_page, page=page, **kwargs) for page in range(1, helper_page_count(count, per_page) + 1)))
+        data = []
+        for page in pages:
+            if not page:
+                break
+            data += page
+            if len(page) < per_page:
+                break
+        return data[:count] if data else None
+
+
+class AsyncAssets(AsyncAuth):
+    """ asyncio Asset GET Requests Class. Same methods as Assets, as coroutines. """
+    sync_class = Assets
+    coin_list = _async_method(Assets, "coin_list")
+    coin_mkts = _async_method(Assets, "coin_mkts")
+    coin_pairs = _async_method(Assets, "coin_pairs")
+
+    async def coin_mkts_top(self, count: int) -> list[dict] | None:
+        """
+        Get asset & market data for the top `count` assets by market cap, with every page fetched concurrently.
+        :param count: Number of assets.
+        :type count: int
+        :rtype: list[dict] | None
+        """
+        return await self._gather_pages(self.coin_mkts, count, ENDPOINT_PAGE_SIZE["coins/markets"])
+
+    async def coin_mkts_ids(self, ids: list[str], max_chunks: int | None = None) -> tuple[list[dict], list[str]]:
+        """
+        Get asset & market data for a list of Gecko Asset IDs, with every chunk of IDs fetched concurrently. See Assets.coin_mkts_ids().
+        :param ids: CoinGecko asset IDs. Duplicates and blanks are ignored.
+        :type ids: list[str]
+        :param max_chunks: Optional parameter. Max number of chunks (API calls) to fetch. Default = all chunks.
+        :type max_chunks: int | None
+        :rtype: tuple(list[dict],list[str])
+        :return: Market data for the IDs returned, and the IDs that were not returned.
+        """
+        import asyncio
+
+        ids = list(dict.fromkeys(i for i in ids if i))
+        chunks = helper_chunk_ids(ids, ENDPOINT_PAGE_SIZE["coins/markets"])[:max_chunks]
+        responses = await asyncio.gather(*(self.coin_mkts(ids=chunk, per_page=ENDPOINT_PAGE_SIZE["coins/markets"], page=1) for chunk in chunks))
+        return Assets._merge_ids(ids, responses)
+
+    def coin_pairs_topk(self, id: str, k: int = 10, min_volume_usd: float = 0, exchange_ids: str | None = None, max_pages: int = MAX_TICKER_PAGES) -> AsyncTickerCrawl:
+        """
+        Async crawl of an asset's K most liquid market pairs. Use with `async for`. See Assets.coin_pairs_topk().
+        :param id: The CoinGecko ID for the asset whose market pairs you wish to view.
+        :type id: str
+        :param k: Number of tickers to return.
+        :type k: int
+        :param min_volume_usd: Optional parameter. Min 24h volume in USD. Default = 0.
+        :type min_volume_usd: float
+        :param exchange_ids: Optional parameter. Comma-separated CoinGecko Exchange IDs.
+        :type exchange_ids: str | None
+        :param max_pages: Max number of pages to fetch. Default = MAX_TICKER_PAGES.
+        :type max_pages: int
+        :rtype: AsyncTickerCrawl
+        """
+        return AsyncTickerCrawl(self, self.client.coin_pairs_topk(id, k, min_volume_usd, exchange_ids, max_pages))
+
+    def coin_pairs_pages(self, id: str, exchange_ids: str | None = None, max_pages: int = MAX_TICKER_PAGES, max_rows: int | None = None, deadline: float | None = None) -> AsyncTickerCrawl:
+        """
+        Async crawl of an asset's coin_pairs() pages. Use with `async for`. See Assets.coin_pairs_pages().
+        :param id: The CoinGecko ID for the asset whose market pairs you wish to view.
+        :type id: str
+        :param exchange_ids: Optional parameter. Comma-separated CoinGecko Exchange IDs.
+        :type exchange_ids: str | None
+        :param max_pages: Max number of pages to fetch. Default = MAX_TICKER_PAGES.
+        :type max_pages: int
+        :param max_rows: Optional parameter. Max number of tickers to fetch.
+        :type max_rows: int | None
+        :param deadline: Optional parameter. Seconds after which no more pages are requested.
+        :type deadline: float | None
+        :rtype: AsyncTickerCrawl
+        """
+        return AsyncTickerCrawl(self, self.client.coin_pairs_pages(id, exchange_ids, max_pages, max_rows, deadline))
+
+
+class AsyncExchanges(AsyncAuth):
+    """ asyncio Exchange GET Requests Class. Same methods as Exchanges, as coroutines. """
+    sync_class = Exchanges
+    exch_list = _async_method(Exchanges, "exch_list")
+    exch_data = _async_method(Exchanges, "exch_data")
+    exch_top100 = _async_method(Exchanges, "exch_top100")
+    exch_pairs = _async_method(Exchanges, "exch_pairs")
+
+    async def exch_data_top(self, count: int) -> list[dict] | None:
+        """
+        Get exchange data for the first `count` exchanges, with every page fetched concurrently.
+        :param count: Number of exchanges.
+        :type count: int
+        :rtype: list[dict] | None
+        """
+        return await self._gather_pages(self.exch_data, count, ENDPOINT_PAGE_SIZE["exchanges"])
+
+    def exch_pairs_pages(self, id: str, coin_ids: str | None = None, max_pages: int = MAX_TICKER_PAGES, max_rows: int | None = None, deadline: float | None = None) -> AsyncTickerCrawl:
+        """
+        Async crawl of an exchange's exch_pairs() pages. Use with `async for`. See Exchanges.exch_pairs_pages().
+        :param id: Required. Gecko Exchange ID.
+        :type id: str
+        :param coin_ids: Optional parameter. Comma-separated list of coin IDs to filter results.
+        :type coin_ids: str | None
+        :param max_pages: Max number of pages to fetch. Default = MAX_TICKER_PAGES.
+        :type max_pages: int
+        :param max_rows: Optional parameter. Max number of tickers to fetch.
+        :type max_rows: int | None
+        :param deadline: Optional parameter. Seconds after which no more pages are requested.
+        :type deadline: float | None
+        :rtype: AsyncTickerCrawl
+        """
+        return AsyncTickerCrawl(self, self.client.exch_pairs_pages(id, coin_ids, max_pages, max_rows, deadline))
+
+
+class MarketSync:
+    """ Full-universe coins/markets sync. Pages are fetched concurrently and checkpointed to disk as they complete, so an interrupted sync resumes from the pages it already has. """
+    CHECKPOINT_DIR = "coin_mkts_sync"
+    # Checkpoints older than this (seconds) are started over rather than resumed, since assets move between pages as market caps change
+    MAX_AGE = 3600
+
+    def __init__(self, assets: "Assets", checkpoint_dir: str | None = None, workers: int = 4):
+        """
+        Initialization of Market Sync. An existing checkpoint is resumed unless it's older than MAX_AGE.
+        :param assets: Assets instance used to fetch the pages. Its requests are scheduled as 'bulk'.
+        :type assets: Assets
+        :param checkpoint_dir: Directory of the checkpoint: one JSON file per completed page plus a manifest. Default = CHECKPOINT_DIR in the working directory.
+        :type checkpoint_dir: str | None
+        :param workers: Max number of pages fetched at once. All of them wait on the shared rate limiter.
+        :type workers: int
+        """
+        self.assets = assets.with_priority("bulk")
+        self.checkpoint_dir = checkpoint_dir or self.CHECKPOINT_DIR
+        self.workers = workers
+        self.per_page = ENDPOINT_PAGE_SIZE["coins/markets"]
+        self.manifest_file = os.path.join(self.checkpoint_dir, "manifest.json")
+        self.manifest = self._load()
+        # Whether the last run stopped at MAX_MARKET_PAGES full pages rather than at the end of the universe
+        self.capped = False
+
+
+    def _load(self) -> dict:
+        """ Read the manifest ({"started", "per_page", "last_page", "capped"}) of an existing checkpoint, or start a new one. """
+        try:
+            with open(self.manifest_file) as file:
+                manifest = json.load(file)
+            age = (datetime.now() - datetime.fromisoformat(manifest["started"])).total_seconds()
+            if age <= self.MAX_AGE and manifest["per_page"] == self.per_page:
+                return manifest
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, ValueError):
+            pass
+        self.clear()
+        return {"started": datetime.now().isoformat(timespec="seconds"), "per_page": self.per_page, "last_page": None}
+
+    def _write(self, path: str, data):
+        """ Write JSON to a temp file first, then move it into place, so that a crash mid-write can't leave a corrupt page behind. """
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp, path)
+
+    def _page_file(self, page: int) -> str:
+        """ Checkpoint file of a page. """
+        return os.path.join(self.checkpoint_dir, f"page_{page:04d}.json")
+
+
+    def done_pages(self) -> list[int]:
+        """ Page numbers already in the checkpoint. """
+        if not os.path.isdir(self.checkpoint_dir):
+            return []
+        return sorted(int(name[5:9]) for name in os.listdir(self.checkpoint_dir) if name.startswith("page_") and name.endswith(".json"))
+
+    def estimate(self) -> int:
+        """ Number of API calls left to finish the sync. The total is unknown until the last (short) page has been seen, so MAX_MARKET_PAGES is assumed until then. """
+        last_page = self.manifest["last_page"] or MAX_MARKET_PAGES
+        return len(set(range(1, last_page + 1)) - set(self.done_pages()))
+
+    def run(self, max_calls: int | None = None) -> tuple[list[dict], bool]:
+        """
+        Fetch the pages missing from the checkpoint, in waves of `workers` pages, until the last page has been seen. Stops early if a page fails (i.e. retries ran out during a 429 storm) or max_calls is reached, keeping the checkpoint for the next run.
+        :param max_calls: Max number of pages to fetch in this run, i.e. when trimmed by the API call budget. Default = no limit.
+        :type max_calls: int | None
+        :rtype: tuple(list[dict],bool)
+        :return: Market data for every page in the checkpoint in order of market cap descending, and whether the sync is complete. A complete sync's checkpoint is removed.
+        A sync that reaches MAX_MARKET_PAGES full pages is complete up to the cap, and sets capped.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        done = set(self.done_pages())
+        calls = 0
+        failed = False
+        lock = threading.Lock()
+        # Set once a short page has been seen, so the rest of the wave isn't sent
+        end_seen = threading.Event()
+
+        def fetch(wave: list[int], started: list, finished: list, i: int):
+            """
+            Fetch the i-th page of a wave. Once the page before it has been requested, waits for it to come back, so that pages past the end aren't sent.
+            Without a key pool, requests are a rate-limit slot apart, so the wait is capped at one slot (which it would have waited anyway). Pooled keys can be granted slots at the same moment, so with a key pool the page waits for the one before it to come back.
+            """
+            nonlocal calls
+            if i:
+                started[i - 1].wait()
+                finished[i - 1].wait(None if self.assets.key_pool else self.assets.rate_limiter.interval)
+            started[i].set()
+            try:
+                with lock:
+                    if end_seen.is_set() and wave[i] > (self.manifest["last_page"] or 0):
+                        return "skipped"
+                    calls += 1
+                response = self.assets.coin_mkts(per_page=self.per_page, page=wave[i])
+                if response is not None:
+                    self._write(self._page_file(wave[i]), response)
+                    with lock:
+                        done.add(wave[i])
+                        # A short (or empty) page is the end of the universe. So is the last page the sync is allowed to fetch.
+                        last = len(response) < self.per_page or wave[i] == MAX_MARKET_PAGES
+                        if last and wave[i] < (self.manifest["last_page"] or MAX_MARKET_PAGES + 1):
+                            self.manifest["last_page"] = wave[i]
+                            self.manifest["capped"] = len(response) == self.per_page
+                            end_seen.set()
+                return response
+            finally:
+                finished[i].set()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while not failed:
+                last_page = self.manifest["last_page"] or MAX_MARKET_PAGES
+                wave = [page for page in range(1, last_page + 1) if page not in done][:self.workers]
+                if max_calls is not None:
+                    wave = wave[:max_calls - calls]
+                if not wave:
+                    break
+                started, finished = [threading.Event() for _ in wave], [threading.Event() for _ in wave]
+                responses = list(pool.map(lambda i: fetch(wave, started, finished, i), range(len(wave))))
+                failed = any(response is None for response in responses)
+                self._write(self.manifest_file, self.manifest)
+        self.capped = bool(self.manifest.get("capped"))
+
+        last_page = self.manifest["last_page"]
+        complete = last_page is not None and all(page in done for page in range(1, last_page + 1))
+        data = []
+        seen = set()
+        for page in sorted(done):
+            if last_page and page > last_page:
+                continue
+            with open(self._page_file(page)) as file:
+                # Assets that moved between pages while the sync was interrupted would otherwise show up twice
+                for asset in json.load(file):
+                    if asset["id"] not in seen:
+                        seen.add(asset["id"])
+                        data.append(asset)
+        if complete:
+            self.clear()
+        return data, complete
+
+    def clear(self):
+        """ Delete the checkpoint. """
+        if os.path.isdir(self.checkpoint_dir):
+            for name in os.listdir(self.checkpoint_dir):
+                os.remove(os.path.join(self.checkpoint_dir, name))
+            os.rmdir(self.checkpoint_dir)
+
+
+class ListingMatrix:
+    """ Asset x Exchange availability matrix stored as bitsets: one int per asset (bit per exchange) and one int per exchange (bit per asset) """
+    def __init__(self, assets: list[str], exchanges: list[str]):
+        """
+        Initialization of Listing Matrix. Every asset starts unlisted on every exchange.
+        :param assets: CoinGecko Asset IDs (rows). Duplicates are ignored.
+        :type assets: list[str]
+        :param exchanges: CoinGecko Exchange IDs (columns). Duplicates are ignored.
+        :type exchanges: list[str]
+        """
+        self.assets = list(dict.fromkeys(assets))
+        self.exchanges = list(dict.fromkeys(exchanges))
+        self._asset_index = {asset: i for i, asset in enumerate(self.assets)}
+        self._exch_index = {exch: j for j, exch in enumerate(self.exchanges)}
+        self._rows = [0] * len(self.assets)
+        self._cols = [0] * len(self.exchanges)
+        self._lock = threading.Lock()
+
+
+    def set(self, asset: str, exchange: str):
+        """ Mark an asset as listed on an exchange. """
+        i = self._asset_index[asset]
+        j = self._exch_index[exchange]
+        with self._lock:
+            self._rows[i] |= 1 << j
+            self._cols[j] |= 1 << i
+
+    def has(self, asset: str, exchange: str) -> bool:
+        """ Whether an asset is listed on an exchange. """
+        return bool(self._rows[self._asset_index[asset]] >> self._exch_index[exchange] & 1)
+
+    def exchanges_for(self, *assets: str) -> list[str]:
+        """
+        Row query: exchanges that list every one of the assets.
+        :param assets: CoinGecko Asset IDs.
+        :type assets: str
+        :rtype: list[str]
+        """
+        mask = (1 << len(self.exchanges)) - 1
+        for asset in assets:
+            mask &= self._rows[self._asset_index[asset]]
+        return self._members(mask, self.exchanges)
+
+    def assets_on(self, *exchanges: str) -> list[str]:
+        """
+        Column query: assets listed on every one of the exchanges.
+        :param exchanges: CoinGecko Exchange IDs.
+        :type exchanges: str
+        :rtype: list[str]
+        """
+        mask = (1 << len(self.assets)) - 1
+        for exch in exchanges:
+            mask &= self._cols[self._exch_index[exch]]
+        return self._members(mask, self.assets)
+
+    @staticmethod
+    def _members(mask: int, names: list[str]) -> list[str]:
+        """ Names at the set bits of a mask. """
+        members = []
+        while mask:
+            low = mask & -mask
+            members.append(names[low.bit_length() - 1])
+            mask ^= low
+        return members
+
+    def rows(self) -> list[dict]:
+        """ The dense matrix as a dict list, one row per asset with a True/False column per exchange plus a count. Used for preview & csv_export(). """
+        return [
+            {"CoinGecko Asset ID": asset, **{exch: bool(row >> j & 1) for j, exch in enumerate(self.exchanges)}, "Exchanges": row.bit_count()}
+            for asset, row in zip(self.assets, self._rows)
+        ]
+
+    def summary(self) -> list[dict]:
+        """ Number of the assets listed on each exchange. """
+        return [{"CoinGecko Exchange ID": exch, "Assets Listed": col.bit_count()} for exch, col in zip(self.exchanges, self._cols)]
+
+
+class SnapshotStore:
+    """
+    Append-only columnar store of coins/markets snapshots, partitioned by month. Each partition is a directory of one raw binary file per column plus a manifest of committed rows.
+    Reads memory-map the column files and return NumPy arrays.
+    """
+    STORE_DIR = "coin_mkts_store"
+    # Column name: (NumPy dtype, coins/markets field). time is the fetch time in epoch seconds, coin is the asset's index in the coin registry.
+    COLUMNS = {
+        "time": ("<f8", None),
+        "coin": ("<i4", None),
+        "price": ("<f8", "current_price"),
+        "market_cap": ("<f8", "market_cap"),
+        "volume": ("<f8", "total_volume"),
+        "supply": ("<f8", "circulating_supply"),
+        "rank": ("<i4", "market_cap_rank"),
+    }
+
+    def __init__(self, root: str | None = None):
+        """
+        Initialization of Snapshot Store. Nothing is read until the store is first used.
+        :param root: Directory of the store. Default = STORE_DIR in the working directory.
+        :type root: str | None
+        """
+        self.root = root or self.STORE_DIR
+        self.registry_file = os.path.join(self.root, "coins.json")
+        self._coins = None
+        self._lock = threading.Lock()
+
+
+    def _write_json(self, path: str, data):
+        """ Write JSON to a temp file first, then move it into place, so that a crash mid-write can't corrupt it. """
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp, path)
+
+    def _manifest(self, partition: str) -> dict:
+        """ Manifest ({"rows", "start", "end"}) of a partition. A partition without one has no committed rows. """
+        try:
+            with open(os.path.join(self.root, partition, "manifest.json")) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {"rows": 0, "start": None, "end": None}
+
+    def coins(self) -> list[str]:
+        """ Coin registry: CoinGecko Asset IDs in the order they were first stored. A coin's position is its value in the coin column. """
+        if self._coins is None:
+            try:
+                with open(self.registry_file) as file:
+                    self._coins = json.load(file)
+            except FileNotFoundError:
+                self._coins = []
+        return self._coins
+
+    def partitions(self) -> list[str]:
+        """ Month partitions ("YYYY-MM") in the store, oldest first. """
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if len(name) == 7 and name[4] == "-")
+
+
+    def append(self, data: list[dict], fetched: datetime | None = None) -> int:
+        """
+        Append a coin_mkts() snapshot. Missing values are stored as NaN (-1 for rank).
+        Column files are appended first and the partition's manifest is updated last, so rows from a write that crashed part way are never read.
+        Appends hold a file lock on <root>/.lock, so runs appending at the same time (i.e. overlapping cron jobs) don't hand out the same coin index or overwrite each other's rows.
+
+        :param data: Market data returned by coin_mkts() or coin_mkts_ids().
+        :type data: list[dict]
+        :param fetched: Fetch time of the snapshot. Default = now. Must not be earlier than the partition's latest snapshot, since query() relies on rows being in time order.
+        :type fetched: datetime | None
+        :rtype: int
+        :return: Number of rows appended.
+        """
+        # Imported before anything is written, so a store without numpy stays empty
+        import numpy as np
+
+        fetched = fetched or datetime.now()
+        partition = fetched.strftime("%Y-%m")
+        path = os.path.join(self.root, partition)
+        os.makedirs(path, exist_ok=True)
+        with self._lock, open(os.path.join(self.root, ".lock"), "a") as lock:
+            helper_flock(lock, True)
+            try:
+                return self._append(data, fetched, partition, path)
+            finally:
+                helper_flock(lock, False)
+
+    def _append(self, data: list[dict], fetched: datetime, partition: str, path: str) -> int:
+        """ Write a snapshot's rows. Called by append() with the store locked. """
+        import numpy as np
+
+        manifest = self._manifest(partition)
+        if manifest["end"] is not None and fetched.timestamp() < manifest["end"]:
+            raise ValueError(f"Snapshot fetched at {fetched} is older than the latest one in partition {partition}. Snapshots must be appended in time order.")
+        # Another run may have registered coins since the registry was read
+        self._coins = None
+        coins = self.coins()
+        index = {coin: i for i, coin in enumerate(coins)}
+        new = [asset["id"] for asset in data if asset["id"] not in index]
+        if new:
+            for coin in dict.fromkeys(new):
+                index[coin] = len(coins)
+                coins.append(coin)
+            self._write_json(self.registry_file, coins)
+
+        columns = {
+            "time": np.full(len(data), fetched.timestamp()),
+            "coin": [index[asset["id"]] for asset in data],
+        }
+        for name, (dtype, field) in self.COLUMNS.items():
+            if field:
+                missing = -1 if dtype == "<i4" else np.nan
+                columns[name] = [missing if asset.get(field) is None else asset[field] for asset in data]
+        for name, (dtype, _) in self.COLUMNS.items():
+            column_file = os.path.join(path, f"{name}.bin")
+            with open(column_file, "r+b" if os.path.exists(column_file) else "wb") as file:
+                # Overwrite anything past the committed rows, left over from a write that crashed
+                file.seek(manifest["rows"] * np.dtype(dtype).itemsize)
+                file.truncate()
+                np.asarray(columns[name], dtype=dtype).tofile(file)
+        timestamp = fetched.timestamp()
+        self._write_json(os.path.join(path, "manifest.json"), {
+            "rows": manifest["rows"] + len(data),
+            "start": timestamp if manifest["start"] is None else manifest["start"],
+            "end": timestamp,
+        })
+        return len(data)
+
+    def query(self, start: datetime | None = None, end: datetime | None = None, coins: list[str] | None = None) -> dict:
+        """
+        Read the rows fetched between start and end (inclusive) for a set of coins. Only the partitions overlapping the time range are opened, and their column files are memory-mapped rather than read.
+        :param start: Optional parameter. Earliest fetch time. Default = no limit.
+        :type start: datetime | None
+        :param end: Optional parameter. Latest fetch time. Default = no limit.
+        :type end: datetime | None
+        :param coins: Optional parameter. CoinGecko Asset IDs. Default = every coin.
+        :type coins: list[str] | None
+        :rtype: dict[str, numpy.ndarray]
+        :return: One NumPy array per column in COLUMNS. coin holds registry indexes; map them back to IDs with coins().
+        """
+        import numpy as np
+
+        low = start.timestamp() if start else -np.inf
+        high = end.timestamp() if end else np.inf
+        index = {coin: i for i, coin in enumerate(self.coins())}
+        wanted = np.array([index[coin] for coin in coins if coin in index], dtype="<i4") if coins is not None else None
+
+        parts = {name: [] for name in self.COLUMNS}
+        for partition in self.partitions():
+            manifest = self._manifest(partition)
+            if not manifest["rows"] or manifest["end"] < low or manifest["start"] > high:
+                continue
+            path = os.path.join(self.root, partition)
+            mapped = {name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(manifest["rows"],)) for name, (dtype, _) in self.COLUMNS.items()}
+            # Rows are appended in time order, so the time range is a contiguous slice
+            times = mapped["time"]
+            first, last = np.searchsorted(times, low, "left"), np.searchsorted(times, high, "right")
+            rows = slice(first, last)
+            if wanted is not None:
+                rows = first + np.flatnonzero(np.isin(mapped["coin"][first:last], wanted))
+            for name, column in mapped.items():
+                parts[name].append(column[rows])
+        return {name: np.concatenate(arrays) if arrays else np.empty(0, dtype=self.COLUMNS[name][0]) for name, arrays in parts.items()}
+
+
+class MarketRollups:
+    """
+    Incrementally maintained per-coin OHLC rollups of coins/markets snapshots over 1 minute, 1 hour and 1 day buckets, with the latest 24h volume reported in each bucket, in a SQLite file.
+    Each snapshot is folded into the buckets it falls in as it is ingested, so reads never touch raw history.
+    """
+    ROLLUP_FILE = "coin_mkts_rollups.sqlite"
+    # Resolution name: bucket width in seconds
+    RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+    def __init__(self, path: str | None = None):
+        """
+        Initialization of Market Rollups. The database is created on first use.
+        :param path: SQLite file. Default = ROLLUP_FILE in the working directory.
+        :type path: str | None
+        """
+        self.path = path or self.ROLLUP_FILE
+        self._db = None
+        self._lock = threading.Lock()
+
+
+    def _connect(self):
+        """ Open the database, creating the rollup table the first time. """
+        if self._db is None:
+            import sqlite3
+
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            # volume_24h is coins/markets' rolling 24h total_volume as of the bucket's latest snapshot. It's already a 24h sum, so it isn't summed again.
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "resolution TEXT, coin TEXT, bucket INTEGER, "
+                "open REAL, high REAL, low REAL, close REAL, volume_24h REAL, samples INTEGER, first REAL, last REAL, "
+                "PRIMARY KEY (resolution, coin, bucket))"
+            )
+        return self._db
+
+    def update(self, data: list[dict], fetched: datetime | None = None) -> int:
+        """
+        Fold a coin_mkts() snapshot into the bucket of each resolution that it falls in. The work per snapshot is one upsert per coin per resolution, however much history has been rolled up.
+        Open, close & volume_24h come from the earliest & latest snapshot in the bucket, so snapshots may arrive out of order. Coins without a price are skipped.
+        :param data: Market data returned by coin_mkts() or coin_mkts_ids().
+        :type data: list[dict]
+        :param fetched: Fetch time of the snapshot. Default = now.
+        :type fetched: datetime | None
+        :rtype: int
+        :return: Number of buckets updated.
+        """
+        timestamp = (fetched or datetime.now()).timestamp()
+        rows = [
+            (resolution, asset["id"], int(timestamp // width * width), asset["current_price"], asset.get("total_volume"), timestamp)
+            for resolution, width in self.RESOLUTIONS.items()
+            for asset in data if asset.get("current_price") is not None
+        ]
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.executemany(
+                    "INSERT INTO buckets VALUES (?1, ?2, ?3, ?4, ?4, ?4, ?4, ?5, 1, ?6, ?6) "
+                    "ON CONFLICT (resolution, coin, bucket) DO UPDATE SET "
+                    "open = CASE WHEN excluded.first < first THEN excluded.open ELSE open END, "
+                    "high = max(high, excluded.high), "
+                    "low = min(low, excluded.low), "
+                    "close = CASE WHEN excluded.last >= last THEN excluded.close ELSE close END, "
+                    "volume_24h = CASE WHEN excluded.last >= last AND excluded.volume_24h IS NOT NULL THEN excluded.volume_24h ELSE volume_24h END, "
+                    "samples = samples + 1, "
+                    "first = min(first, excluded.first), "
+                    "last = max(last, excluded.last)",
+                    rows,
+                )
+        return len(rows)
+
+    def buckets(self, resolution: str, coins: list[str] | None = None, start: datetime | None = None, end: datetime | None = None) -> list[dict]:
+        """
+        Read precomputed buckets. Lookups go through the table's primary key, so their cost doesn't grow with the amount of history kept.
+        :param resolution: One of RESOLUTIONS, i.e. "1h".
+        :type resolution: str
+        :param coins: Optional parameter. CoinGecko Asset IDs. Default = every coin.
+        :type coins: list[str] | None
+        :param start: Optional parameter. Buckets starting at or after this time. Default = no limit.
+        :type start: datetime | None
+        :param end: Optional parameter. Buckets starting at or before this time. Default = no limit.
+        :type end: datetime | None
+        :rtype: list[dict]
+        :return: One dict per coin per bucket (coin, bucket start in epoch seconds, open, high, low, close, volume_24h, samples), by coin then time.
+        """
+        if resolution not in self.RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}. Use one of {', '.join(self.RESOLUTIONS)}.")
+        query = "SELECT coin, bucket, open, high, low, close, volume_24h, samples FROM buckets WHERE resolution = ?"
+        params = [resolution]
+        if coins is not None:
+            query += f" AND coin IN ({', '.join('?' * len(coins))})"
+            params += coins
+        if start:
+            query += " AND bucket >= ?"
+            params.append(start.timestamp())
+        if end:
+            query += " AND bucket <= ?"
+            params.append(end.timestamp())
+        with self._lock:
+            cursor = self._connect().execute(query + " ORDER BY coin, bucket", params)
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor]
+
+    def close(self):
+        """ Close the database. """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class RefreshCache:
+    """
+    TTL cache of built datasets, shared by every client of the data service. An entry is only reloaded once it has expired, and concurrent misses on the same key share a single load.
+    If a reload fails, the expired entry keeps being served (marked stale) rather than failing the client, and the key isn't reloaded again until retry_after has passed.
+    Once max_entries are cached, expired entries and then the oldest entries are evicted to make room.
+    """
+    # Seconds an entry is served before it's reloaded. Set by the --ttl flag.
+    default_ttl = 300
+    # Seconds a key isn't reloaded for after a failed load, so a failing upstream isn't called on every request
+    retry_after = 30
+    max_entries = 256
+
+    def __init__(self, ttl: float | None = None):
+        """
+        Initialization of Refresh Cache.
+        :param ttl: Seconds an entry is served before it's reloaded. Default = default_ttl.
+        :type ttl: float | None
+        """
+        self.ttl = ttl if ttl is not None else self.default_ttl
+        # Key: (loaded monotonic time, loaded datetime, value)
+        self._entries = {}
+        self._loading = {}
+        # Key: monotonic time of the last failed load
+        self._failed = {}
+        self._lock = threading.Lock()
+
+
+    def get(self, key: tuple, load, metrics_name: str = "service") -> tuple[object, datetime | None, str]:
+        """
+        Get a cached value, loading it on a miss or once it has expired. Hits & misses are counted in Auth.metrics.
+        :param key: Cache key. Build it from normalized request parameters so equivalent requests share an entry.
+        :type key: tuple
+        :param load: Function that returns the value, or None if it couldn't be loaded. An exception counts as a failed load, and is re-raised.
+        :param metrics_name: Name the hits & misses are counted under in Auth.metrics.
+        :type metrics_name: str
+        :rtype: tuple(object,datetime | None,str)
+        :return: The value (None if it couldn't be loaded and nothing is cached), when it was loaded, and "hit", "miss" or "stale".
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and monotonic() - entry[0] < self.ttl:
+                Auth.metrics.incr(metrics_name, "cache_hits")
+                return entry[2], entry[1], "hit"
+            # A recent failed load isn't retried yet
+            failed = self._failed.get(key)
+            if failed is not None and monotonic() - failed < self.retry_after:
+                if entry is None:
+                    return None, None, "miss"
+                Auth.metrics.incr(metrics_name, "cache_hits")
+                return entry[2], entry[1], "stale"
+            flight = self._loading.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._loading[key] = _Flight()
+        Auth.metrics.incr(metrics_name, "cache_misses")
+
+        if leader:
+            value = None
+            try:
+                value = load()
+            finally:
+                with self._lock:
+                    if value is not None:
+                        self._store(key, value)
+                    else:
+                        self._fail(key)
+                    del self._loading[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None, None, "miss"
+        # A failed reload leaves the expired entry in place
+        return entry[2], entry[1], "stale" if monotonic() - entry[0] >= self.ttl else "miss"
+
+    def _store(self, key: tuple, value):
+        """ Cache a loaded value, evicting entries if the cache is full. Called with the lock held. """
+        self._failed.pop(key, None)
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            now = monotonic()
+            for old in [old for old, entry in self._entries.items() if now - entry[0] >= self.ttl]:
+                del self._entries[old]
+            if len(self._entries) >= self.max_entries:
+                del self._entries[min(self._entries, key=lambda old: self._entries[old][0])]
+        self._entries[key] = (monotonic(), datetime.now(), value)
+
+    def _fail(self, key: tuple):
+        """ Remember a failed load, forgetting failures old enough to be retried. Called with the lock held. """
+        now = monotonic()
+        self._failed = {old: failed for old, failed in self._failed.items() if now - failed < self.retry_after}
+        self._failed[key] = now
+
+    def clear(self):
+        """ Drop every entry. """
+        with self._lock:
+            self._entries = {}
+            self._failed = {}
+
+
+class DataService:
+    """
+    Long-running local HTTP/JSON service that serves the datasets built by the *_dict_build() functions from a shared RefreshCache.
+    Local tools query the service instead of running their own copy of the puller, so they share one upstream rate limiter, budget and cache.
+    """
+    DEFAULT_PORT = 8765
+    # Dataset path: (loader method, required query parameters, names of the tables the builder returns)
+    DATASETS = {
+        "assets": ("_assets", (), ("chainpop", "chain_sep_assets")),
+        "markets": ("_markets", (), ("main", "full")),
+        "pairs": ("_pairs", ("id",), ("exch_summary", "main", "full")),
+        "exchanges": ("_exchanges", (), ("main",)),
+        "exchanges/top100": ("_exch_top100", ("ids",), ("main", "full", "data")),
+        "exchanges/pairs": ("_exch_pairs", ("id",), ("main", "full_fresh", "full_stale", "asset_counts")),
+    }
+
+    def __init__(self, cache: RefreshCache | None = None, base_url: str | None = None):
+        """
+        Initialization of Data Service.
+        :param cache: Optional parameter. Cache to serve from. Default = a new RefreshCache.
+        :type cache: RefreshCache | None
+        :param base_url: Optional parameter. Base URL of the API, i.e. a local mock_gecko.py server. Default = Auth.BASE_URL.
+        :type base_url: str | None
+        """
+        self.cache = cache or RefreshCache()
+        # Lookups are scheduled as interactive, since a client is waiting on them. The multi-page pair crawls are scheduled as bulk.
+        self.assets = Assets(base_url=base_url, priority="interactive")
+        self.exchanges = Exchanges(base_url=base_url, priority="interactive")
+
+
+    def _assets(self, query: dict) -> tuple | None:
+        """ a_list_dict_build() of every asset. """
+        data = self.assets.coin_list()
+        return a_list_dict_build(data) if data else None
+
+    def _markets(self, query: dict) -> tuple | None:
+        """ a_mkt_dict_build() of the assets in ids=, or of the top= assets by market cap (max 250, default 100). """
+        if query.get("ids"):
+            data, _ = self.assets.coin_mkts_ids(query["ids"])
+        else:
+            data = self.assets.coin_mkts(per_page=min(int(query.get("top") or 100), 250))
+        return a_mkt_dict_build(data) if data else None
+
+    def _pairs(self, query: dict) -> tuple | None:
+        """ a_pair_dict_build() of an asset's pairs, optionally on the exchanges in exchanges=. """
+        pages = self.assets.with_priority("bulk").coin_pairs_pages(query["id"], ",".join(query.get("exchanges") or []) or None)
+        data, tables = pair_dict_build_stream(a_pair_dict_build, pages)
+        return tables if data else None
+
+    def _exchanges(self, query: dict) -> tuple | None:
+        """ e_list_basic_dict_build() of every exchange. """
+        data = self.exchanges.exch_list()
+        return (e_list_basic_dict_build(data),) if data else None
+
+    def _exch_top100(self, query: dict) -> tuple | None:
+        """ e_top100_dict_build() of the exchanges in ids=. """
+        data = [response for response in map(self.exchanges.exch_top100, query["ids"]) if response]
+        return e_top100_dict_build(data) if data else None
+
+    def _exch_pairs(self, query: dict) -> tuple | None:
+        """ e_pair_dict_build() of an exchange's pairs, optionally only for the assets in coins=. """
+        pages = self.exchanges.with_priority("bulk").exch_pairs_pages(query["id"], ",".join(query.get("coins") or []) or None)
+        data, tables = pair_dict_build_stream(e_pair_dict_build, pages)
+        return tables if data else None
+
+
+    def dataset(self, name: str, query: dict) -> tuple[int, dict]:
+        """
+        Serve a dataset from the cache, loading it from the API on a miss or once it has expired.
+        ID list parameters (ids, exchanges, coins) are comma-separated, and are lowercased, de-duplicated and sorted so that equivalent requests share a cache entry.
+        :param name: Dataset path, one of DATASETS.
+        :type name: str
+        :param query: Query parameters, one value per name.
+        :type query: dict
+        :rtype: tuple(int,dict)
+        :return: HTTP status and JSON body.
+        """
+        if name not in self.DATASETS:
+            return 404, {"error": f"Unknown dataset {name!r}. Datasets: {', '.join(self.DATASETS)}."}
+        loader, required, tables = self.DATASETS[name]
+        query = {key: value.strip().lower() for key, value in query.items() if value.strip()}
+        for key in ("ids", "exchanges", "coins"):
+            if key in query:
+                query[key] = sorted({i.strip() for i in query[key].split(",") if i.strip()})
+        missing = [key for key in required if key not in query]
+        if missing:
+            return 400, {"error": f"Missing query parameter(s): {', '.join(missing)}."}
+        if "top" in query and not query["top"].isdigit():
+            return 400, {"error": "top must be a whole number."}
+
+        key = (name,) + tuple(sorted((param, tuple(value) if isinstance(value, list) else value) for param, value in query.items()))
+        try:
+            value, loaded, status = self.cache.get(key, lambda: getattr(self, loader)(query), f"service/{name}")
+        except Exception as e:
+            print(f"Error building the {name} dataset: {e!r}")
+            return 500, {"error": f"The {name} dataset could not be built. See the service log."}
+        if value is None:
+            return 502, {"error": "Upstream API request failed or was refused. See the service log."}
+        return 200, {
+            "dataset": name,
+            "query": query,
+            "cache": status,
+            "loaded": loaded.isoformat(timespec="seconds"),
+            "tables": dict(zip(tables, value)),
+        }
+
+    def handler(self) -> type:
+        """ Request handler class bound to this service, for http.server. """
+        from http.server import BaseHTTPRequestHandler
+        from urllib.parse import parse_qs, urlparse
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """ GET handler for the data service """
+            def do_GET(self):
+                url = urlparse(self.path)
+                path = url.path.strip("/")
+                content_type = "application/json"
+                if path == "":
+                    status, body = 200, {"datasets": {name: list(required) for name, (_, required, _) in service.DATASETS.items()}}
+                elif path == "metrics":
+                    status, body, content_type = 200, Auth.metrics.prometheus(), "text/plain; version=0.0.4"
+                else:
+                    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                    status, body = service.dataset(path, query)
+                payload = (body if isinstance(body, str) else json.dumps(body, default=str)).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                print(f"{self.address_string()} - {format % args}")
+
+        return Handler
+
+    def start(self, host: str = "127.0.0.1", port: int | None = None):
+        """
+        Create the HTTP server. Requests are handled on one thread each, so a slow upstream load doesn't block cache hits.
+        :param host: Interface to listen on. Default = localhost only.
+        :type host: str
+        :param port: Port to listen on. 0 = any free port. Default = DEFAULT_PORT.
+        :type port: int | None
+        :rtype: ThreadingHTTPServer
+        :return: The server. Call .serve_forever() to run it, and .shutdown() to stop it.
+        """
+        from http.server import ThreadingHTTPServer
+
+        server = ThreadingHTTPServer((host, self.DEFAULT_PORT if port is None else port), self.handler())
+        server.daemon_threads = True
+        return server
+
+
+class FlowProfiler:
+    """ Runs each flow under cProfile and writes a pstats file per flow """
+    TOP_FUNCTIONS = 15
+
+    def __init__(self):
+        """
+        Initialization of Flow Profiler.
+        Flows chain into each other (i.e. a flow ends by calling prompts(), which starts the next flow), so the profile of the flow that is running is paused while a flow it started runs. Each flow's file only includes its own time.
+        cProfile only profiles the thread it runs on, so time spent in worker threads (i.e. concurrent chunk fetches) shows up as time waiting on them.
+        """
+        self._stack = []
+        self.files = []
+
+
+    def run(self, command: str, flow):
+        """
+        Run a flow under cProfile and write its stats to profile_<command>_<timestamp>.pstats.
+        :param command: Flow command, used in the filename.
+        :type command: str
+        :param flow: Flow function.
+        """
+        import cProfile
+
+        profile = cProfile.Profile()
+        if self._stack:
+            self._stack[-1].disable()
+        self._stack.append(profile)
+        profile.enable()
+        try:
+            return flow()
+        # Flows exit with sys.exit(), so stats are written on the way out
+        finally:
+            profile.disable()
+            self._stack.pop()
+            filename = f"profile_{command}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pstats"
+            profile.dump_stats(filename)
+            self.files.append(filename)
+            if self._stack:
+                self._stack[-1].enable()
+
+    def print_summary(self):
+        """ Print each flow's hottest functions by time spent in the function itself. """
+        import pstats
+
+        for filename in self.files:
+            print(f"\nProfile written to {filename}. Top {self.TOP_FUNCTIONS} functions by own time:")
+            pstats.Stats(filename, stream=sys.stdout).strip_dirs().sort_stats("tottime").print_stats(self.TOP_FUNCTIONS)
+
+
+class Pager:
+    """ Interactive, paged terminal viewer over in-memory rows """
+    PAGE_SIZE = 20
+
+    def __init__(self, rows: list[dict], columns: list[str] | None = None, page_size: int | None = None):
+        """
+        Initialization of Pager. Only the rows in the visible window are ever rendered, so rendering cost doesn't depend on the number of rows.
+        :param rows: Rows to page through. Usually a dict list returned by one of the *_dict_build() functions.
+        :type rows: list[dict]
+        :param columns: Optional parameter. Columns to display initially. Default = all columns.
+        :type columns: list[str] | None
+        :param page_size: Optional parameter. Number of rows displayed at once. Default = 20.
+        :type page_size: int | None
+        """
+        self.rows = rows
+        self.all_columns = list(rows[0].keys()) if rows else []
+        self.columns = [c for c in columns if c in self.all_columns] if columns else list(self.all_columns)
+        self.page_size = page_size or self.PAGE_SIZE
+        # Row indices in display order. None = original order, so no copy is made until the user sorts.
+        self.order = None
+        self.offset = 0
+
+
+    def window(self) -> list[dict]:
         """
-        params = {
-            # dex fmt API default = 'contract_address'. Code default = 'symbol' .
-            "dex_pair_format": "contract_address"
-        }
-        path = f"exchanges/{id}"
-        try:
-            print("Fetching data. One moment please.")
-            data = self._get(path,params)
-        except (ConnectionError, Timeout, TooManyRedirects) as e:
-            print (f"API request failed: {e}")
-            return None
-        except HTTPError as e:
-            print("HTTPError: No data returned. Please check your asset and exchange ID and try again.")
-            return None
-        return data
+        Build the rows currently visible, limited to the selected columns.
+        :rtype: list[dict]
+        """
+        end = min(self.offset + self.page_size, len(self.rows))
+        indices = range(self.offset, end) if self.order is None else self.order[self.offset:end]
+        return [{c: self.rows[i].get(c) for c in self.columns} for i in indices]
 
+    def render(self) -> str:
+        """
+        Tabulate the visible window with 1-based row numbers and a status line.
+        :rtype: str
+        """
+        rows = self.window()
+        table = preview_table(rows, showindex=range(self.offset + 1, self.offset + len(rows) + 1)) if rows else "No rows to display."
+        return f"{table}\nRows {self.offset + 1}-{self.offset + len(rows)} of {len(self.rows)}"
 
-    def exch_pairs(
-        self,
-        id: str,
-        coin_ids: str | None = None,
-        page: int | None = None
-        ) -> dict[list[dict]]:
+    def scroll(self, pages: int):
         """
-        Query an exchange’s market pairs based on exchange’s ID.
-        Results are ordered by each pair's base asset's market cap descending. For example, if an exchange has BTC/USD and ETH/USD pairs, BTC/USD will be listed first because Bitcoin has a higher market cap than Ethereum.
-        If viewing pairs on a DEX, the pair format will be displayed with each asset's contract address rather than their symbols. This is for ease of use - there is no uniqueness constraint on asset symbols, but contract addresses are unique. Can change 'dex_pair_format' to 'symbol' if desired, although this is not recommended.
-        Called by exchange_pairs() function.
+        Move the window forward (+) or back (-) a number of pages. Stops at the first and last page.
+        :param pages: Number of pages to move.
+        :type pages: int
+        """
+        self.goto(self.offset + pages * self.page_size + 1)
 
-        :param id: Required. Gecko Exchange ID. Only allowed query one exchange at a time.
-        :type id: str
-        :param coin_ids: Optional parameter. Comma-separated list of coin IDs to filter results. If omitted, all pairs listed on the exchange are returned.
-        :type coin_ids: str | None
-        :param page: Optional parameter. Page number for paginated results. Not required unless number of pairs returned exceeds 100.
-        :type page: int | None
-        :rtype: dict[list[dict]]
+    def goto(self, row: int):
         """
+        Move the window so that it starts at a row number (1-based).
+        :param row: Row number.
+        :type row: int
+        """
+        last_page = max(0, (len(self.rows) - 1) // self.page_size * self.page_size)
+        self.offset = min(max(0, row - 1), last_page)
 
-        params = {
-            "id": id,
-            "coin_ids": coin_ids,
-            "page": page,
-            # Default ordering is "trust_score_desc". Not moddable with inputs at the moment as I don't see a need to. If I do build that in post-project, another way to order is "base_target", which orders alphabetically by first the base asset symbol and then the target asset symbol. This method of ordering works the exact same way for DEXes with dex_pair_format = "contract_address", which means it's essentially useless for them with that pair format parameter applied
-            "order": "market_cap_desc",
-            "dex_pair_format": "contract_address"
-        }
-        path = f"exchanges/{id}/tickers"
-        try:
-            print("Fetching data. One moment please.")
-            data = self._get(path,params)
-        except (ConnectionError, Timeout, TooManyRedirects) as e:
-            print (f"API request failed: {e}")
-            return None
-        except HTTPError as e:
-            print("HTTPError: No data returned. Please check your asset and exchange ID and try again.")
-            return None
-        return data
 
+    def _column(self, spec: str) -> str:
+        """
+        Resolve a column given by name (case-insensitive) or by its number in the full column list.
+        :param spec: Column name or number.
+        :type spec: str
+        :rtype: str
+        """
+        spec = spec.strip()
+        if spec.isdigit() and 1 <= int(spec) <= len(self.all_columns):
+            return self.all_columns[int(spec) - 1]
+        for column in self.all_columns:
+            if column.strip().lower() == spec.lower():
+                return column
+        raise KeyError(f"No column named '{spec}'. Type 'cols' to list columns.")
+
+    def select(self, specs: list[str]):
+        """
+        Display only the given columns, in the order given.
+        :param specs: Column names or numbers.
+        :type specs: list[str]
+        """
+        self.columns = [self._column(spec) for spec in specs]
+
+    def sort(self, spec: str, descending: bool = False):
+        """
+        Sort rows by a column without re-fetching. Formatted values ("$1,000.52", "5.10274%", etc) are sorted by their numeric value and "null" values always go last.
+        :param spec: Column name or number.
+        :type spec: str
+        :param descending: Sort in descending order.
+        :type descending: bool
+        """
+        column = self._column(spec)
+        keyed = [(helper_sort_key(row.get(column)), i) for i, row in enumerate(self.rows)]
+        present = [(key, i) for key, i in keyed if key is not None]
+        present.sort(key=lambda item: item[0], reverse=descending)
+        self.order = [i for _, i in present] + [i for key, i in keyed if key is None]
+        self.offset = 0
+
+
+    def run(self):
+        """ Page through the rows interactively until the user quits. """
+        print(self.render())
+        while True:
+            command = input(
+                "\n[enter/n] next page  [p] previous page  [g <row>] go to row  [t] top  [e] end\n"
+                "[cols] list columns  [cols <1,3,Name,...>] choose columns  [cols all] all columns\n"
+                "[sort <column> (desc)] sort by column  [q] quit viewer\n"
+                ).strip()
+            parts = command.split(maxsplit=1)
+            action = parts[0].lower() if parts else "n"
+            arg = parts[1] if len(parts) > 1 else ""
+            try:
+                if action == "q":
+                    return
+                elif action == "n":
+                    self.scroll(1)
+                elif action == "p":
+                    self.scroll(-1)
+                elif action == "t":
+                    self.goto(1)
+                elif action == "e":
+                    self.goto(len(self.rows))
+                elif action == "g":
+                    self.goto(int(arg))
+                elif action == "cols" and not arg:
+                    for number, column in enumerate(self.all_columns, 1):
+                        print(f"{number}: {column}{' *' if column in self.columns else ''}")
+                    continue
+                elif action == "cols" and arg.lower() == "all":
+                    self.columns = list(self.all_columns)
+                elif action == "cols":
+                    self.select(arg.split(","))
+                elif action == "sort":
+                    words = arg.rsplit(maxsplit=1)
+                    descending = len(words) == 2 and words[1].lower() == "desc"
+                    column = words[0] if len(words) == 2 and words[1].lower() in ("asc", "desc") else arg
+                    self.sort(column, descending)
+                else:
+                    print("Please input a valid viewer command.")
+                    continue
+            except (KeyError, ValueError) as e:
+                print(e)
+                continue
+            print(self.render())
 
 
 def main():
     """
     Starts program & handles interpretation of command-line arguments.
     If no arguments are provided, or invalid arguments are provided, the user is prompted for input.
+    Option flags: --stats prints API request metrics at exit. --prom <file> writes them to a Prometheus text-format file at exit. --profile runs each flow under cProfile. --spans <file> writes stage timing spans as JSON lines ("-" = stderr).
+    --json-decoder <name> picks the JSON library used to decode API responses (default = fastest installed).
+    --workers <n|auto> builds the rows of large pair pulls in n processes (auto = one per core).
+    --max-rows <n> and --deadline <seconds> bound the ticker crawls of the pair flows.
+    --record <file> saves every API response to a cassette file. --replay <file> serves responses from a cassette file instead of calling the API.
+    --port <n> and --ttl <seconds> set the port and cache lifetime of the 'serve' command.
+    --keys <key1,key2,...> (or the COINGECKO_API_KEYS environment variable) spreads requests over a pool of API keys.
     """
+    global profiler, build_workers
+    stats = helper_pop_flag("--stats")
+    prom_file = helper_pop_flag("--prom", takes_value=True)
+    spans_file = helper_pop_flag("--spans", takes_value=True)
+    if spans_file:
+        spans.enable(spans_file)
+    decoder = helper_pop_flag("--json-decoder", takes_value=True)
+    if decoder:
+        try:
+            _import_json_decoder(decoder)
+        except ImportError as e:
+            sys.exit(str(e))
+    workers = helper_pop_flag("--workers", takes_value=True)
+    if workers:
+        if workers != "auto" and not workers.isdigit():
+            sys.exit(f"--workers must be a number of processes or 'auto', not {workers!r}.")
+        build_workers = os.cpu_count() if workers == "auto" else max(1, int(workers))
+    max_rows = helper_pop_flag("--max-rows", takes_value=True)
+    if max_rows:
+        if not max_rows.isdigit():
+            sys.exit(f"--max-rows must be a whole number, not {max_rows!r}.")
+        TickerCrawl.default_max_rows = int(max_rows)
+    deadline = helper_pop_flag("--deadline", takes_value=True)
+    if deadline:
+        try:
+            seconds = float(deadline)
+        except ValueError:
+            seconds = -1
+        if not seconds >= 0:
+            sys.exit(f"--deadline must be a number of seconds, not {deadline!r}.")
+        TickerCrawl.default_deadline = seconds
+    record_file = helper_pop_flag("--record", takes_value=True)
+    replay_file = helper_pop_flag("--replay", takes_value=True)
+    if record_file or replay_file:
+        try:
+            Auth.cassette = Cassette(record_file or replay_file, "record" if record_file else "replay")
+        except FileNotFoundError as e:
+            sys.exit(str(e))
+    if helper_pop_flag("--profile"):
+        profiler = FlowProfiler()
+    keys = helper_pop_flag("--keys", takes_value=True) or os.environ.get("COINGECKO_API_KEYS")
+    if keys:
+        try:
+            Auth.key_pool = KeyPool(keys.split(","))
+        except ValueError as e:
+            sys.exit(f"{e} Check --keys or COINGECKO_API_KEYS.")
+        Auth.budget = Auth.key_pool.budget()
+    port = helper_pop_flag("--port", takes_value=True)
+    if port:
+        if not port.isdigit() or int(port) > 65535:
+            sys.exit(f"--port must be a port number from 0 to 65535, not {port!r}.")
+        DataService.DEFAULT_PORT = int(port)
+    ttl = helper_pop_flag("--ttl", takes_value=True)
+    if ttl:
+        try:
+            seconds = float(ttl)
+        except ValueError:
+            seconds = -1
+        if not seconds >= 0:
+            sys.exit(f"--ttl must be a number of seconds, not {ttl!r}.")
+        RefreshCache.default_ttl = seconds
+    try:
+        run_command()
+    finally:
+        if stats:
+            print(Auth.metrics.report())
+            if sum(1 for count in Auth.scheduler.granted.values() if count) > 1:
+                print(Auth.scheduler.report())
+            if Auth.key_pool:
+                print(Auth.key_pool.report())
+        if prom_file:
+            Auth.metrics.write_prometheus(prom_file)
+        if profiler:
+            profiler.print_summary()
+        if Auth.cassette:
+            Auth.cassette.save()
+        Auth.budget.flush()
+
+
+def run_command():
+    """ Run the flow named by the command-line argument. """
     if len(sys.argv) == 1:
         prompts()
-    elif len(sys.argv) == 2 and sys.argv[1] == 'assetlist':
-        asset_list()
-    elif len(sys.argv) == 2 and sys.argv[1] == 'assetmkts':
-        asset_mkts()
-    elif len(sys.argv) == 2 and sys.argv[1] == 'assetpairs':
-        asset_pairs()
-    elif len(sys.argv) == 2 and sys.argv[1] == 'exchlist':
-        exchange_list()
-    elif len(sys.argv) == 2 and sys.argv[1] == 'exch100':
-        exchange_top100()
-    elif len(sys.argv) == 2 and sys.argv[1] == 'exchpairs':
-        exchange_pairs()
+    elif len(sys.argv) == 2 and sys.argv[1] in FLOWS:
+        run_flow(sys.argv[1])
+    elif len(sys.argv) == 2 and sys.argv[1] == "serve":
+        serve()
     else:
         print("No valid command-line arguments entered.")
         prompts()
 
 
+def run_flow(command: str):
+    """
+    Run a flow by its command name (see FLOWS). If the --profile flag was given, the flow is run under the profiler.
+
+    :param command: Flow command, i.e. 'assetlist'.
+    :type command: str
+    """
+    with spans.span("flow", flow=command):
+        if profiler:
+            profiler.run(command, FLOWS[command])
+        else:
+            FLOWS[command]()
+
+
+def serve():
+    """ Run the DataService until interrupted. Started by the 'serve' command-line argument. """
+    service = DataService()
+    server = service.start()
+    print(f"Serving datasets at http://127.0.0.1:{server.server_address[1]}/ with a {service.cache.ttl:g}s cache. Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping.")
+    finally:
+        server.server_close()
+
+
 def prompts():
     """ Prompt user for input on the dataset that they would like to explore. """
+    # The flow that chained into this one is done, so its span doesn't cover the next flows
+    spans.end("flow")
     while True:
         baseprompt = input("\nWhat would you like to do?\n"
                     "For a basic list of asset names, symbols, blockchains, contract addresses, and their respective IDs on CoinGecko, type 'assetlist' and press enter.\n"
@@ -341,25 +2929,29 @@ def prompts():
                     "For basic data on many exchanges, type 'exchlist' and press enter.\n"
                     "For expanded data on exchanges you want to examine, such as descriptions, social media links, and the top 100 assets on that exchange, type 'exch100' and press enter.\n"
                     "For data on the assets and pairs that an exchange has listed for trading, type 'exchpairs' and press enter.\n"
+                    "To see which of a list of assets trade on which of a list of exchanges, type 'matrix' and press enter.\n"
                     "To exit, type 'exit' and press enter. "
                     ).lower().strip()
         if baseprompt == "assetlist":
-            asset_list()
+            run_flow("assetlist")
             break
         elif baseprompt == "assetmkts":
-            asset_mkts()
+            run_flow("assetmkts")
             break
         elif baseprompt == "assetpairs":
-            asset_pairs()
+            run_flow("assetpairs")
             break
         elif baseprompt == "exchlist":
-            exchange_list()
+            run_flow("exchlist")
             break
         elif baseprompt == "exch100":
-            exchange_top100()
+            run_flow("exch100")
             break
         elif baseprompt == "exchpairs":
-            exchange_pairs()
+            run_flow("exchpairs")
+            break
+        elif baseprompt == "matrix":
+            run_flow("matrix")
             break
         elif baseprompt == "exit":
             sys.exit("Have a good day cowpoke!")
@@ -373,25 +2965,30 @@ def asset_list():
     No user input required for data acquisition.
     Print tabulated Asset data (Name, Ticker, Gecko ID, Blockchain(s), Contract Address(es)) and allow user to export data from the a_list_dict_build() list dicts to CSV, explore other datasets, or exit.
     """
-    assets = Assets()
-    data = assets.coin_list()
+    assets = Assets(priority="interactive")
+    with spans.span("fetch", flow="assetlist") as span:
+        data = assets.coin_list() if budget_plan(estimate_calls("assetlist")) else None
+        span.set(rows=len(data or []))
     if not data:
         print("API Error. Returning to home.")
         prompts()
         return
 
-    dict_asset_chainpop,dict_asset_chain_sep_assets = a_list_dict_build(data)
+    with spans.span("build", flow="assetlist", builder="a_list_dict_build") as span:
+        dict_asset_chainpop,dict_asset_chain_sep_assets = a_list_dict_build(data)
+        span.set(rows=len(dict_asset_chain_sep_assets))
 
     first_twenty = dict_asset_chain_sep_assets[:20]
 
     # Return the first 20 assets in tabulated form. If they want to see the whole list, they can export to a csv.
-    print(tabulate(first_twenty, headers="keys",showindex=False,tablefmt="simple_grid",maxcolwidths=20))
+    print(preview_table(first_twenty, showindex=False))
     while True:
         exportprompt = str(input(
             f"\nThere are a total of {len(dict_asset_chainpop)} assets and {len(dict_asset_chain_sep_assets)} associated blockchains listed.\n"
             "To view them all, please export to a csv with one of the following commands.\n"
             "To export a list of assets with all chains/addresses in one cell, type 'assets' and press enter.\n"
             "To export the list of assets separated into one row per asset chain/address, type 'chains' and press enter.\n"
+            "To page through the list in your terminal, type 'view' and press enter.\n"
             "To export data and then explore another dataset, type 'moredata' and press enter.\n"
             "To exit, type 'exit' and press enter. "
             )).lower().strip()
@@ -406,8 +3003,11 @@ def asset_list():
         elif exportprompt == 'chains':
             print(csv_export(dict_asset_chain_sep_assets, "asset_list_chains"))
             continue
+        elif exportprompt == 'view':
+            Pager(dict_asset_chain_sep_assets).run()
+            continue
         else:
-            print("Please input one of the following commands: 'assets', 'chains', 'moredata', or 'exit'. \n")
+            print("Please input one of the following commands: 'assets', 'chains', 'view', 'moredata', or 'exit'. \n")
             continue
     prompts()
 
@@ -424,13 +3024,14 @@ def a_list_dict_build(data: list[dict]) -> tuple[list[dict],list[dict]]:
 
     dict_asset_chainpop = [
     {
-        '#': data.index(asset)+1,
+        '#': number,
         'Gecko ID': asset["id"],
         'Name': asset["name"],
         'Code': asset["symbol"],
         'Blockchain&ContAdd': {"null": "null"} if len(asset["platforms"])==0 else asset["platforms"],
     }
-        for asset in data
+        # enumerate rather than data.index(asset), which searched the list from the start for every asset
+        for number, asset in enumerate(data, 1)
     ]
 
     """ Separates the assets out to one dictionary item per asset's Blockchain&ContAdd dictionary item OR one item if the asset's Blockchain/Contract Address values are 'null'. """
@@ -457,13 +3058,14 @@ def asset_mkts():
     User provides either a comma-separated string of Gecko Asset IDs or the number of top assets they would like to view.
     Print tabulated Asset Market data (Name, Ticker, Slug, Market Cap, Diluted Market Cap, 24h Price % Change, 7d Price % Change) and allow user to export data from the a_mkt_dict_build() list dicts to CSV, explore other datasets, or exit.
     """
-    assets = Assets()
+    assets = Assets(priority="interactive")
     data = []
 
     while True:
         modeprompt = (
             input("\nTo view specific assets, type 'ids' and press enter.\n"
         "To view a number of the top assets, type 'assets' and press enter.\n"
+        "To sync every asset on CoinGecko, type 'all' and press enter. An interrupted sync picks up where it left off.\n"
         "To explore another data set, type 'moredata' and press enter.\n"
         "To exit, type 'exit' and press enter. \n"
         "NOTE: All results will be displayed in order of market cap descending. "
@@ -478,50 +3080,59 @@ def asset_mkts():
             slugs = str(input("Please input a comma-separated string of asset IDs. Spaces are not necessary but will not impact results. ").lower().strip())
             # Could create a helper function for stripping spaces to modularize code further + improve scalability. Not necessary for project, do later
             idlist = slugs.split(",")
-            idstrip = [i.strip() for i in idlist]
-            stripped = ",".join(idstrip)
-            idlength = len(idstrip)
-
-            pages = (idlength // 250) + (1 if idlength % 250 else 0)
-            for i in range(1,pages+1):
-                response = assets.coin_mkts(ids=stripped,per_page=250,page=i)
-                if response:
-                    data.extend(response)
-                    sleep(2)
-                else:
-                    continue
+            # Duplicates and blanks are dropped first, so they aren't counted against the budget
+            idstrip = list(dict.fromkeys(i.strip() for i in idlist if i.strip()))
+
+            # One call per chunk of IDs rather than per page of results
+            chunks = budget_plan(len(helper_chunk_ids(idstrip, ENDPOINT_PAGE_SIZE["coins/markets"])))
+            with spans.span("fetch", flow="assetmkts", chunks=chunks) as span:
+                data, missing = assets.coin_mkts_ids(idstrip, max_chunks=chunks)
+                span.set(rows=len(data), missing=len(missing))
             print("Data pulled successfully.\n")
 
-            data = data[:idlength]
-            assetsreturned = len(data)
-            # Check if number of assets returned by API is equal to number of assets inserted. If not, let the user know and then continue the workflow.
-            if assetsreturned == idlength:
-                break
-            else:
-                print("\nNote: Fewer assets were returned than the number of IDs inputted. Perhaps you missed a comma?\n")
-                break
+            # Check if every asset inserted was returned by the API. If not, let the user know which ones are missing and then continue the workflow.
+            if missing:
+                print(f"\nNote: No data was returned for {len(missing)} of the IDs inputted: {', '.join(missing)}. Perhaps you missed a comma?\n")
+            break
         elif modeprompt == 'assets':
             while True:
                 try:
                     print("\n",end="")
                     numprompt = int(input("How many assets would you like to view? ").strip())
 
-                    pages = (numprompt // 250) + (1 if numprompt % 250 else 0)
-                    for i in range(1,pages+1):
-                        response = assets.coin_mkts(per_page=250,page=i)
-                        if response:
-                            data.extend(response)
-                            sleep(2)
-                        else:
-                            continue
+                    pages = budget_plan(estimate_calls("assetmkts", numprompt))
+                    with spans.span("fetch", flow="assetmkts") as span:
+                        for i in range(1,pages+1):
+                            response = assets.coin_mkts(per_page=250,page=i)
+                            if response:
+                                data.extend(response)
+                                sleep(2)
+                            else:
+                                continue
+                        span.set(rows=len(data))
                     print("Data pulled successfully.\n")
                     # Slice list to the number of items requested. This is necessary due to 250 assets/page limit, otherwise asset list would always contain assets in increments of 250.
                     data = data[:numprompt]
                     break
                 except ValueError:
                     print("ValueError: Please enter an integer.")
+        elif modeprompt == 'all':
+            sync = MarketSync(assets)
+            done = len(sync.done_pages())
+            if done:
+                print(f"Resuming sync from checkpoint: {done} pages already fetched.")
+            with spans.span("fetch", flow="assetmkts", mode="all", resumed_pages=done) as span:
+                data, complete = sync.run(max_calls=budget_plan(sync.estimate(), cap=sync.manifest["last_page"] is None))
+                span.set(rows=len(data), complete=complete)
+            if complete:
+                print("Data pulled successfully.\n")
+                if sync.capped:
+                    print(f"Note: The sync stopped at the {MAX_MARKET_PAGES} page cap ({len(data)} assets). Assets ranked below that were not fetched.\n")
+            elif data:
+                print(f"Sync incomplete: {len(data)} assets fetched so far. Type 'all' again later to resume from the last good page.\n")
+            break
         else:
-            print("Please input one of the following commands: 'ids', 'assets', 'moredata', or 'exit'.\n",end="")
+            print("Please input one of the following commands: 'ids', 'assets', 'all', 'moredata', or 'exit'.\n",end="")
             continue
         break
 
@@ -529,7 +3140,31 @@ def asset_mkts():
         print("API Error. Returning to home.")
         prompts()
         return
-    dict_asset_main,dict_asset_full = a_mkt_dict_build(data)
+    import sqlite3
+
+    # Keep every pull so that price moves across pulls can be queried later. Replayed responses aren't stored, since they would be stamped as new pulls.
+    live = not (Auth.cassette and Auth.cassette.mode == "replay")
+    store = SnapshotStore()
+    try:
+        if live:
+            store.append(data)
+    # numpy isn't installed. The history export says so.
+    except ImportError:
+        pass
+    # i.e. a read-only working directory, a full disk, or a clock set back since the last pull
+    except (OSError, ValueError) as e:
+        print(f"Note: Your pull could not be added to the snapshot store ({e}).")
+    rollups = MarketRollups()
+    try:
+        if live:
+            rollups.update(data)
+    # i.e. a locked or read-only database
+    except (OSError, sqlite3.Error) as e:
+        print(f"Note: Your pull could not be added to the OHLC rollups ({e}).")
+        rollups = None
+    with spans.span("build", flow="assetmkts", builder="a_mkt_dict_build") as span:
+        dict_asset_main,dict_asset_full = a_mkt_dict_build(data)
+        span.set(rows=len(dict_asset_full))
 
     dictlen = len(dict_asset_main)
     one_index = range(1, len(dict_asset_main)+1)
@@ -537,10 +3172,10 @@ def asset_mkts():
         toptwenty = dict_asset_main[:20]
         one_index = one_index[:20]
         print("These are the top 20 assets in your list.")
-        print(tabulate(toptwenty, headers="keys",showindex=one_index,tablefmt="simple_grid",maxcolwidths=20))
+        print(preview_table(toptwenty, showindex=one_index))
     elif dictlen <= 20:
         print(f"These are the {dictlen} assets in your list.")
-        print(tabulate(dict_asset_main, headers="keys",showindex=one_index,tablefmt="simple_grid",maxcolwidths=20))
+        print(preview_table(dict_asset_main, showindex=one_index))
 
 
     while True:
@@ -548,6 +3183,9 @@ def asset_mkts():
             f"There are {dictlen} assets in your list.\n"
             "To export the displayed fields for all of your assets to a csv, type 'main' and press enter.\n"
             "To export all market data fields displayed fields for all of your assets to a csv, type 'all' and press enter.\n"
+            "To page through all of your assets in your terminal, type 'view' and press enter.\n"
+            "To export the stored history of your assets across all of your pulls to a csv, type 'history' and press enter.\n"
+            "To export your assets' OHLC & volume rollups to a csv, type 'ohlc 1m', 'ohlc 1h' or 'ohlc 1d' and press enter.\n"
             "To skip exporting data and explore another dataset, please type 'moredata' and press enter.\n"
             "To exit, type 'exit' and press enter.\n"
             )).lower().strip()
@@ -562,11 +3200,83 @@ def asset_mkts():
         elif exportprompt == 'all':
             print(csv_export(dict_asset_full, "asset_mkt_allfields"))
             continue
+        elif exportprompt == 'view':
+            Pager(dict_asset_full, columns=list(dict_asset_main[0].keys())).run()
+            continue
+        elif exportprompt == 'history':
+            try:
+                print(csv_export(snapshot_history_rows(store, [asset["id"] for asset in data]), "asset_mkt_history"))
+            except ImportError:
+                print("History requires numpy. Run 'pip install numpy' to store your pulls.")
+            continue
+        elif exportprompt in [f"ohlc {resolution}" for resolution in MarketRollups.RESOLUTIONS]:
+            if rollups is None:
+                print("The OHLC rollups are unavailable. See the note above.")
+                continue
+            resolution = exportprompt.split()[1]
+            print(csv_export(rollup_rows(rollups, resolution, [asset["id"] for asset in data]), f"asset_mkt_ohlc_{resolution}"))
+            continue
         else:
-            print("Please input one of the following commands: 'main', 'all', 'moredata', or 'exit'. \n")
+            print("Please input one of the following commands: 'main', 'all', 'view', 'history', 'ohlc 1m', 'ohlc 1h', 'ohlc 1d', 'moredata', or 'exit'. \n")
             continue
     prompts()
 
+def snapshot_history_rows(store: SnapshotStore, coins: list[str], start: datetime | None = None, end: datetime | None = None) -> list[dict]:
+    """
+    Constructs a dict list of the stored snapshots of a set of coins, one row per coin per pull, for CSV export.
+
+    :param store: Snapshot store to read.
+    :type store: SnapshotStore
+    :param coins: CoinGecko Asset IDs.
+    :type coins: list[str]
+    :param start: Optional parameter. Earliest fetch time.
+    :type start: datetime | None
+    :param end: Optional parameter. Latest fetch time.
+    :type end: datetime | None
+    :rtype: list[dict]
+    """
+    history = store.query(start, end, coins)
+    ids = store.coins()
+    return [
+        {
+            "Fetched At": datetime.fromtimestamp(float(fetched)).isoformat(timespec="seconds"),
+            "CoinGecko Asset ID": ids[coin],
+            "Price (USD)": None if price != price else float(price),
+            "Market Cap (USD)": None if cap != cap else float(cap),
+            "Total Volume": None if volume != volume else float(volume),
+            "Circulating Supply": None if supply != supply else float(supply),
+            "Mkt Cap Rank": None if rank < 0 else int(rank),
+        }
+        # NaN != NaN, which marks a value that was missing from the API output
+        for fetched, coin, price, cap, volume, supply, rank in zip(*(history[name].tolist() for name in SnapshotStore.COLUMNS))
+    ]
+
+def rollup_rows(rollups: MarketRollups, resolution: str, coins: list[str]) -> list[dict]:
+    """
+    Constructs a dict list of the OHLC rollups (and latest 24h volume) of a set of coins at one resolution, for CSV export.
+
+    :param rollups: Rollups to read.
+    :type rollups: MarketRollups
+    :param resolution: One of MarketRollups.RESOLUTIONS, i.e. "1h".
+    :type resolution: str
+    :param coins: CoinGecko Asset IDs.
+    :type coins: list[str]
+    :rtype: list[dict]
+    """
+    return [
+        {
+            "CoinGecko Asset ID": bucket["coin"],
+            "Bucket Start": datetime.fromtimestamp(bucket["bucket"]).isoformat(timespec="seconds"),
+            "Open (USD)": bucket["open"],
+            "High (USD)": bucket["high"],
+            "Low (USD)": bucket["low"],
+            "Close (USD)": bucket["close"],
+            "24h Volume (Latest)": bucket["volume_24h"],
+            "Pulls": bucket["samples"],
+        }
+        for bucket in rollups.buckets(resolution, coins)
+    ]
+
 def a_mkt_dict_build(data: list[dict]) -> tuple[list[dict],list[dict]]:
     """
     Constructs and returns 2 dict lists from coin_mkts data.
@@ -630,14 +3340,14 @@ def asset_pairs():
     User provides either a Gecko Asset ID to view all market pairs on all exchanges, or a comma-separated list of Gecko Exchange IDs and a Gecko Asset ID to view market pairs on specific exchanges.
     Print tabulated Asset Pair data (Exchange ID, Pair Code, Base Asset, Counter Asset, Last Price (USD), Volume, etc) and allow user to export data from the a_pair_dict_build() list dicts to CSV, explore other datasets, or exit.
     """
-    assets = Assets()
-    data = []
+    assets = Assets(priority="interactive")
     coin = []
 
     while True:
         modeprompt = (
             input("\nTo view the market pairs for an asset on all exchanges, type 'id' and press enter.\n"
         "To select a specific exchange or exchanges, type 'exch' and press enter.\n"
+        "To view only an asset's most liquid market pairs, type 'top' and press enter.\n"
         "To explore another data set, type 'moredata' and press enter.\n"
         "To exit, type 'exit' and press enter. \n"
         "NOTE: All results will be displayed in order of market cap descending. "
@@ -651,53 +3361,51 @@ def asset_pairs():
             sys.exit("Exited successfully.")
         elif modeprompt == 'id':
             asset = str(input("\nPlease input an asset ID. This may take a while if your asset has many pairs. ").lower().strip())
-            for i in range(1,100):
-                response = assets.coin_pairs(id=asset,page=i)
-                # Check if the response is the one they give when there's no more data to display. If it is, break out of FOR loop.
-                # RegExp would work here, but simply checking if there's data in 'tickers' is much more robust and generally applicable.
-                if isinstance(response, dict) and "tickers" in response and not response["tickers"]:
-                    break
-                elif not response:
-                    break
-                else:
-                    # This endpoint returns a DICT rather than a LIST of DICTs. Used APPEND rather than EXTEND here so that I can keep the code as generalized as possible rather than having to reference the ["tickers"] list within the response.
-                    data.append(response)
-                    sleep(2)
+            # Pages are only fetched once the build below starts consuming them
+            pages = assets.coin_pairs_pages(asset, max_pages=budget_plan(estimate_calls("assetpairs"), cap=True))
             coin = asset
-            print("Data pulled successfully.\n",end="")
             break
         elif modeprompt == 'exch':
             exchange = str(input("\nPlease input comma-separated Exchange ID(s). ").lower().strip())
             asset = str(input("Please input an asset ID. This may take a while if your asset has many pairs. ").lower().strip())
-            for i in range(1,100):
-                response = assets.coin_pairs(id=asset,page=i,exchange_ids=exchange)
-                if isinstance(response, dict) and "tickers" in response and not response["tickers"]:
-                    break
-                elif not response:
-                    break
-                else:
-                    data.append(response)
-                    sleep(2)
+            pages = assets.coin_pairs_pages(asset, exchange_ids=exchange, max_pages=budget_plan(estimate_calls("assetpairs"), cap=True))
+            coin = asset
+            break
+        elif modeprompt == 'top':
+            asset = str(input("\nPlease input an asset ID. ").lower().strip())
+            try:
+                k = int(input("How many of its top market pairs by volume would you like to see? ").strip())
+                min_volume = float(input("Minimum 24h volume in USD (press enter for none): ").strip().replace(",", "").replace("$", "") or 0)
+            except ValueError:
+                print("ValueError: Please enter a number.")
+                continue
+            # One page more than K needs, in case some tickers are stale
+            pages = assets.coin_pairs_topk(asset, k, min_volume, max_pages=budget_plan(estimate_calls("assetpairs", helper_page_count(k, ENDPOINT_PAGE_SIZE["coins/{id}/tickers"]) + 1), cap=True))
             coin = asset
-            print("Data pulled successfully.\n",end="")
             break
         else:
-            print("Please input one of the following commands: 'id', 'exch', 'moredata', or 'exit'.\n",end="")
+            print("Please input one of the following commands: 'id', 'exch', 'top', 'moredata', or 'exit'.\n",end="")
             continue
 
+    # Each page is built into rows while the next one is fetched
+    with spans.span("pipeline", flow="assetpairs", builder="a_pair_dict_build") as span:
+        data, (dict_asset_exch_summary,dict_asset_pair_main,dict_asset_pair_full) = pair_dict_build_stream(a_pair_dict_build, pages)
+        span.set(pages=len(data), rows=len(dict_asset_pair_full), crawl=pages.reason)
     if not data:
         print("API Error. Returning to home.")
         prompts()
         return
-    dict_asset_exch_summary,dict_asset_pair_main,dict_asset_pair_full = a_pair_dict_build(data)
+    print("Data pulled successfully.\n",end="")
+    if not pages.complete or pages.dropped:
+        print(pages.summary())
 
     dictlen = len(dict_asset_pair_main)
     if dictlen > 20:
         toptwenty = dict_asset_pair_main[:20]
-        print(tabulate(toptwenty, headers="keys",showindex=False,tablefmt="simple_grid",maxcolwidths=20))
+        print(preview_table(toptwenty, showindex=False))
         print("These are the first 20 Markets in your list for {coin}.")
     elif dictlen <= 20:
-        print(tabulate(dict_asset_pair_main, headers="keys",showindex=False,tablefmt="simple_grid",maxcolwidths=20))
+        print(preview_table(dict_asset_pair_main, showindex=False))
 
 
     while True:
@@ -707,6 +3415,7 @@ def asset_pairs():
             "To export the displayed fields for all of your assets to a csv, type 'main' and press enter.\n"
             "To export all market data fields displayed fields for all of your assets to a csv, type 'all' and press enter.\n"
             "To export a summary CSV containing the unique exchanges and a count of their markets that include your asset, type 'summary' and press enter.\n"
+            "To page through all of your pairs in your terminal, type 'view' and press enter.\n"
             "To explore another dataset, type 'moredata' and press enter.\n"
             "To exit, type 'exit' and press enter.\n"
             )).lower().strip()
@@ -724,8 +3433,11 @@ def asset_pairs():
         elif exportprompt == 'summary':
             print(csv_export(dict_asset_exch_summary, f"exch_pair_summary_{coin}"))
             continue
+        elif exportprompt == 'view':
+            Pager(dict_asset_pair_full, columns=list(dict_asset_pair_main[0].keys()) if dict_asset_pair_main else None).run()
+            continue
         else:
-            print("Please input one of the following commands: 'main', 'all', 'summary', 'moredata', or 'exit'. \n",end="")
+            print("Please input one of the following commands: 'main', 'all', 'summary', 'view', 'moredata', or 'exit'. \n",end="")
             continue
     prompts()
 
@@ -808,10 +3520,12 @@ def exchange_list():
     User provides input on whether they would like to see a basic list of exchange names and Gecko IDs, expanded data on a number of top exchanges, or expanded data on all exchanges.
     Print tabulated Exchange information (Gecko Exch ID, Exch Name, Year Established, Country, Description, URL, etc) and allow user to export data from the e_list_basic_dict_build() or e_list_dict_build() list dicts to CSV, explore other datasets, or exit.
     """
-    exchanges = Exchanges()
+    exchanges = Exchanges(priority="interactive")
     data = []
 
-    exch_list_base = exchanges.exch_list()
+    with spans.span("fetch", flow="exchlist", endpoint="exchanges/list") as span:
+        exch_list_base = exchanges.exch_list() if budget_plan(estimate_calls("exchlist")) else None
+        span.set(rows=len(exch_list_base or []))
     if not exch_list_base:
         print("API Error pulling base exchange list. Returning to home.")
         prompts()
@@ -840,15 +3554,17 @@ def exchange_list():
             while True:
                 try:
                     numprompt = int(input("How many exchanges would you like to see? ").strip())
-                    # Could move pages calc into a helper function that references a dict containing max items per page for each endpoint. Not necessary for project but useful for scaling
-                    pages = (numprompt // 250) + (1 if numprompt % 250 else 0)
-                    for i in range(1,pages+1):
-                        response = exchanges.exch_data(page = i, per_page = 250)
-                        if response:
-                            data.extend(response)
-                            sleep(2)
-                        else:
-                            continue
+                    # exch_list() call has already been made, so only the exch_data() pages are checked against the budget
+                    pages = budget_plan(estimate_calls("exchlist", numprompt) - 1)
+                    with spans.span("fetch", flow="exchlist") as span:
+                        for i in range(1,pages+1):
+                            response = exchanges.exch_data(page = i, per_page = 250)
+                            if response:
+                                data.extend(response)
+                                sleep(2)
+                            else:
+                                continue
+                        span.set(rows=len(data))
                     data = data[:numprompt]
                     print("Data pulled successfully.\n")
                     break
@@ -858,14 +3574,16 @@ def exchange_list():
             break
         elif modeprompt == 'all':
             print("This may take a minute. Hang in there, pal.")
-            pages = (exch_count // 250) + (1 if exch_count % 250 else 0)
-            for i in range(1,pages+1):
-                response = exchanges.exch_data(page = i, per_page = 250)
-                if response:
-                    data.extend(response)
-                    sleep(2)
-                else:
-                    continue
+            pages = budget_plan(estimate_calls("exchlist", exch_count) - 1)
+            with spans.span("fetch", flow="exchlist") as span:
+                for i in range(1,pages+1):
+                    response = exchanges.exch_data(page = i, per_page = 250)
+                    if response:
+                        data.extend(response)
+                        sleep(2)
+                    else:
+                        continue
+                span.set(rows=len(data))
             print("Exchange Data pulled successfully.\n")
             break
         else:
@@ -876,22 +3594,27 @@ def exchange_list():
     if not data:
         print("Only basic Exchange List is available.")
         # If data is empty (i.e the user just wants to see basic list), compile first_twenty list from the dict_exch_list_simple. Otherwise, compile from dict_exch_list_data.
-        dict_exch_list_simple = e_list_basic_dict_build(exch_list_base)
+        with spans.span("build", flow="exchlist", builder="e_list_basic_dict_build") as span:
+            dict_exch_list_simple = e_list_basic_dict_build(exch_list_base)
+            span.set(rows=len(dict_exch_list_simple))
         first_twenty = dict_exch_list_simple[:20]
     else:
-        dict_exch_list_simple = e_list_basic_dict_build(exch_list_base)
-        dict_exch_list_data,dict_exch_list_data_print = e_list_dict_build(data)
+        with spans.span("build", flow="exchlist", builder="e_list_dict_build") as span:
+            dict_exch_list_simple = e_list_basic_dict_build(exch_list_base)
+            dict_exch_list_data,dict_exch_list_data_print = e_list_dict_build(data)
+            span.set(rows=len(dict_exch_list_data))
         first_twenty = dict_exch_list_data_print[:20]
         exch_count = len(dict_exch_list_data_print)
 
     # Return the first 20 exchanges in tabulated form. If they want to see the whole list, they can export to a csv.
-    print(tabulate(first_twenty, headers="keys",showindex=False,tablefmt="simple_grid",maxcolwidths=20))
+    print(preview_table(first_twenty, showindex=False))
     while True:
         exportprompt = str(input(
             f"\nThere are a total of {exch_count} exchanges in your list.\n"
             "To view them all and then select another exchange dataset or exit the program, please export to a csv by typing 'listcsv' and press enter.\n"
             "To view further data on an exchange, such as information about the exchange, its social media links, and its top 100 trading pairs, type 'exch' and press enter.\n"
             "To view all of the trading pairs on an exchange, type 'pairs' and press enter.\n"
+            "To page through all of the exchanges in your list in your terminal, type 'view' and press enter.\n"
             "To skip exporting data and explore another dataset, type 'moredata'.\n"
             "To exit, type 'exit' and press enter. "
             )).lower().strip()
@@ -911,14 +3634,17 @@ def exchange_list():
             continue
         elif exportprompt == 'exch':
             print("\n")
-            exchange_top100()
+            run_flow("exch100")
             break
         elif exportprompt == 'pairs':
             print("\n")
-            exchange_pairs()
+            run_flow("exchpairs")
             break
+        elif exportprompt == 'view':
+            Pager(dict_exch_list_data_print if data else dict_exch_list_simple).run()
+            continue
         else:
-            print("Please input one of the following commands: 'listcsv', 'exch', 'pairs', 'moredata', or 'exit'. \n")
+            print("Please input one of the following commands: 'listcsv', 'exch', 'pairs', 'view', 'moredata', or 'exit'. \n")
             continue
 
 def e_list_basic_dict_build(exch_list_base: list[dict]) -> list[dict]:
@@ -991,7 +3717,7 @@ def exchange_top100():
     User provides Gecko Exchange IDs either one at a time or as a comma-separated list.
     Print tabulated information on an exchange's Top 100 Market Pairs (Exch Name, Trading Pair, Base Asset, Quote Asset, Last Price (USD), etc) and allow user to export data from the e_top100_dict_build() list dicts to CSV, explore other datasets, or exit.
     """
-    exchanges = Exchanges()
+    exchanges = Exchanges(priority="interactive")
     data = []
 
     while True:
@@ -1010,7 +3736,11 @@ def exchange_top100():
         elif modeprompt == 'single':
             while True:
                 exchid = str(input("Please input a CoinGecko Exchange ID. ")).lower().strip()
-                response = exchanges.exch_top100(id = exchid)
+                if not budget_plan(estimate_calls("exch100", 1)):
+                    break
+                with spans.span("fetch", flow="exch100") as span:
+                    response = exchanges.exch_top100(id = exchid)
+                    span.set(rows=1 if response else 0)
                 if response:
                     data.append(response)
                     print("Data acquired successfully.")
@@ -1032,14 +3762,17 @@ def exchange_top100():
             exids = str(input("Please input a comma-separated list of CoinGecko Exchange IDs. Spaces are not necessary but will not impact results. ").lower())
             exidsplit = exids.split(",")
             exidstrip = [i.strip() for i in exidsplit]
+            exidstrip = exidstrip[:budget_plan(estimate_calls("exch100", len(exidstrip)))]
             while True:
-                for exch in exidstrip:
-                    response = exchanges.exch_top100(id = exch)
-                    if response:
-                        data.append(response)
-                        sleep(2)
-                    else:
-                        continue
+                with spans.span("fetch", flow="exch100") as span:
+                    for exch in exidstrip:
+                        response = exchanges.exch_top100(id = exch)
+                        if response:
+                            data.append(response)
+                            sleep(2)
+                        else:
+                            continue
+                    span.set(rows=len(data))
                 break
             break
         else:
@@ -1050,10 +3783,12 @@ def exchange_top100():
         print("API Error. Returning to home.")
         prompts()
         return
-    dict_exch_top100_main,dict_exch_top100_full,dict_exch_top100_data = e_top100_dict_build(data)
+    with spans.span("build", flow="exch100", builder="e_top100_dict_build") as span:
+        dict_exch_top100_main,dict_exch_top100_full,dict_exch_top100_data = e_top100_dict_build(data)
+        span.set(rows=len(dict_exch_top100_full))
 
     first_twenty = dict_exch_top100_main[:20]
-    print(tabulate(first_twenty, headers="keys",showindex=False,tablefmt="simple_grid",maxcolwidths=20))
+    print(preview_table(first_twenty, showindex=False))
 
 
     while True:
@@ -1063,6 +3798,7 @@ def exchange_top100():
             "To export exchange-level data, such as Exchange Name, Description, number of assets available for trading, and associated URLS, type 'exch' and hit enter.\n"
             "To export the pair-related datapoints seen in the above table, type 'basic' and hit enter.\n"
             "To export all pair-related datapoints, type 'all' and hit enter.\n"
+            "To page through all of the pairs in your terminal, type 'view' and hit enter.\n"
             "To explore another dataset, type 'moredata' and hit enter.\n"
             "To exit, type 'exit' and hit enter. "
             )).lower().strip()
@@ -1078,8 +3814,69 @@ def exchange_top100():
             print(csv_export(dict_exch_top100_main, "top100_mainfields"))
         elif exportprompt == 'all':
             print(csv_export(dict_exch_top100_full, "top100_allfields"))
+        elif exportprompt == 'view':
+            Pager(dict_exch_top100_main).run()
+        else:
+            print("Please input one of the following commands: 'exch', 'basic', 'all', 'view', 'moredata', or 'exit'. \n",end="")
+    prompts()
+
+def exchange_matrix():
+    """
+    User provides a comma-separated list of Gecko Asset IDs and a comma-separated list of Gecko Exchange IDs.
+    Print a tabulated Asset x Exchange listing matrix (which assets trade on which exchanges) and allow user to export it to CSV, explore other datasets, or exit.
+    """
+    exchanges = Exchanges(priority="interactive")
+    asset_ids = [i.strip() for i in input("\nPlease input a comma-separated list of CoinGecko Asset IDs. ").lower().split(",") if i.strip()]
+    exchange_ids = [i.strip() for i in input("Please input a comma-separated list of CoinGecko Exchange IDs. ").lower().split(",") if i.strip()]
+    if not asset_ids or not exchange_ids:
+        print("At least one asset and one exchange are required. Returning to home.")
+        prompts()
+        return
+
+    with spans.span("fetch", flow="matrix", assets=len(asset_ids), exchanges=len(exchange_ids)) as span:
+        calls = budget_plan(estimate_calls("matrix", len(exchange_ids) * len(helper_chunk_ids(asset_ids, len(asset_ids)))), cap=True)
+        matrix, unchecked = exchanges.exch_listings(asset_ids, exchange_ids, max_calls=calls)
+        span.set(unchecked=len(unchecked))
+    if unchecked:
+        print(f"\nNote: Listings could not be fully checked on {len(unchecked)} exchange(s): {', '.join(unchecked)}. Check the IDs, or try again later.")
+
+    rows = matrix.rows()
+    print(preview_table(matrix.summary(), showindex=False))
+    if len(matrix.exchanges) <= 8:
+        print(preview_table(rows[:20], showindex=False))
+
+    while True:
+        exportprompt = str(input(
+            f"\n{len(matrix.assets)} assets x {len(matrix.exchanges)} exchanges. {sum(row['Exchanges'] > 0 for row in rows)} of the assets are listed on at least one of the exchanges.\n"
+            "To export the full matrix to a csv, type 'matrix' and press enter.\n"
+            "To export the per-exchange summary to a csv, type 'summary' and press enter.\n"
+            "To see the exchanges that list all of some assets, type 'row' and press enter.\n"
+            "To see the assets listed on all of some exchanges, type 'col' and press enter.\n"
+            "To page through the matrix in your terminal, type 'view' and press enter.\n"
+            "To explore another dataset, type 'moredata' and press enter.\n"
+            "To exit, type 'exit' and press enter.\n"
+            )).lower().strip()
+
+        if exportprompt == 'moredata':
+            break
+        elif exportprompt == 'exit':
+            sys.exit("Exited successfully.")
+        elif exportprompt == 'matrix':
+            print(csv_export(rows, "listing_matrix"))
+        elif exportprompt == 'summary':
+            print(csv_export(matrix.summary(), "listing_matrix_summary"))
+        elif exportprompt in ('row', 'col'):
+            names = [i.strip() for i in input("Please input comma-separated IDs from your lists. ").lower().split(",") if i.strip()]
+            try:
+                found = matrix.exchanges_for(*names) if exportprompt == 'row' else matrix.assets_on(*names)
+            except KeyError as e:
+                print(f"{e} is not in your list.")
+                continue
+            print(", ".join(found) if found else "None.")
+        elif exportprompt == 'view':
+            Pager(rows).run()
         else:
-            print("Please input one of the following commands: 'exch', 'basic', 'all', 'moredata', or 'exit'. \n",end="")
+            print("Please input one of the following commands: 'matrix', 'summary', 'row', 'col', 'view', 'moredata', or 'exit'. \n",end="")
     prompts()
 
 def e_top100_dict_build(data: dict[list[dict]]) -> tuple[list[dict],list[dict],list[dict]]:
@@ -1180,8 +3977,7 @@ def exchange_pairs():
     User provides a comma-separated string of Gecko Asset IDs and a Gecko Exchange ID, or just a Gecko Exchange ID.
     Print tabulated information on an exchange's Market Pairs (Exch Name, Trading Pair, Base Asset, Quote Asset, Last Price (USD), etc) and allow user to export data from the e_pair_dict_build() list dicts to CSV, explore other datasets, or exit.
     """
-    exchanges = Exchanges()
-    data = []
+    exchanges = Exchanges(priority="interactive")
     exch_name = []
 
     while True:
@@ -1201,49 +3997,37 @@ def exchange_pairs():
         elif modeprompt == 'id':
             assets = str(input("\nPlease input a comma-separated list of CoinGecko Asset IDs. ").lower().strip())
             exch = str(input("Please input a CoinGecko Exchange ID. ").lower().strip())
-            for i in range(1,100):
-                response = exchanges.exch_pairs(id=exch,coin_ids=assets,page=i)
-                if isinstance(response, dict) and "tickers" in response and not response["tickers"]:
-                    break
-                elif not response:
-                    break
-                else:
-                    data.append(response)
-                    sleep(2)
+            pages = exchanges.exch_pairs_pages(exch, coin_ids=assets, max_pages=budget_plan(estimate_calls("exchpairs"), cap=True))
             exch_name = exch
-            print("Data pulled successfully. ")
         elif modeprompt == 'exch':
             exch = str(input("\nPlease input a CoinGecko Exchange ID. ").lower().strip())
-            for i in range(1,100):
-                response = exchanges.exch_pairs(id=exch,page=i)
-                if isinstance(response, dict) and "tickers" in response and not response["tickers"]:
-                    break
-                elif not response:
-                    break
-                else:
-                    data.append(response)
-                    sleep(2)
+            pages = exchanges.exch_pairs_pages(exch, max_pages=budget_plan(estimate_calls("exchpairs"), cap=True))
             exch_name = exch
-            print("Data pulled successfully. ")
         else:
             print("Please input one of the following commands: 'id', 'exch', 'moredata', or 'exit'.\n")
             continue
         break
 
 
+    # Each page is built into rows while the next one is fetched
+    with spans.span("pipeline", flow="exchpairs", builder="e_pair_dict_build") as span:
+        data, (dict_exch_pair_main,dict_exch_pair_full_fresh,dict_exch_pair_full_stale,asset_count_list) = pair_dict_build_stream(e_pair_dict_build, pages)
+        span.set(pages=len(data), rows=len(dict_exch_pair_full_stale), crawl=pages.reason)
     if not data:
         print("API Error. Returning to home.")
         prompts()
         return
-    dict_exch_pair_main,dict_exch_pair_full_fresh,dict_exch_pair_full_stale,asset_count_list = e_pair_dict_build(data)
+    print("Data pulled successfully. ")
+    if not pages.complete or pages.dropped:
+        print(pages.summary())
 
     dictlen = len(dict_exch_pair_main)
     if dictlen > 20:
         toptwenty = dict_exch_pair_main[:20]
-        print(tabulate(toptwenty, headers="keys",showindex=False,tablefmt="simple_grid",maxcolwidths=20))
+        print(preview_table(toptwenty, showindex=False))
         print("These are the first 20 markets in your list for {exch_name}.")
     elif dictlen <= 20:
-        print(tabulate(dict_exch_pair_main, headers="keys",showindex=False,tablefmt="simple_grid",maxcolwidths=20))
+        print(preview_table(dict_exch_pair_main, showindex=False))
 
 
     while True:
@@ -1254,6 +4038,7 @@ def exchange_pairs():
             "To export all market data fields displayed fields for all of the non-stale markets returned to a csv, type 'fresh' and press enter.\n"
             "To export all market data fields displayed fields for all of the markets returned, including stale ones, to a csv, type 'stale' and press enter.\n"
             "To export a list of the assets returned, their CoinGecko IDs, and a count of how many pairs they are in, type 'assets' and press enter.\n"
+            "To page through all of the non-stale markets in your terminal, type 'view' and press enter.\n"
             "To explore another dataset, type 'moredata' and press enter.\n"
             "To exit, type 'exit' and press enter.\n"
             )).lower().strip()
@@ -1274,8 +4059,11 @@ def exchange_pairs():
         elif exportprompt == 'assets':
             print(csv_export(asset_count_list, f"{exch_name}_asset_counts"))
             continue
+        elif exportprompt == 'view':
+            Pager(dict_exch_pair_full_fresh, columns=list(dict_exch_pair_main[0].keys()) if dict_exch_pair_main else None).run()
+            continue
         else:
-            print("Please input one of the following commands: 'main', 'fresh', 'stale', 'moredata', or 'exit'. \n",end="")
+            print("Please input one of the following commands: 'main', 'fresh', 'stale', 'assets', 'view', 'moredata', or 'exit'. \n",end="")
             continue
     prompts()
 
@@ -1381,9 +4169,222 @@ def e_pair_dict_build(data: dict[list[dict]]) -> tuple[list[dict],list[dict],lis
             for pair in page["tickers"]
     ]
 
-    # Get a count of each unique asset across all pairs in list
+    asset_count_list = helper_asset_counts(dict_exch_pair_full_fresh)
+
+    return dict_exch_pair_main,dict_exch_pair_full_fresh,dict_exch_pair_full_stale,asset_count_list
+
+
+def a_pair_dict_merge(parts: list[tuple]) -> tuple[list[dict],list[dict],list[dict]]:
+    """
+    Merges a_pair_dict_build() results built from consecutive pages into the result of building all of the pages at once.
+
+    :param parts: a_pair_dict_build() results, in page order.
+    :type parts: list[tuple]
+    :rtype: tuple(list[dict],list[dict],list[dict])
+    """
+    exch_counts = Counter()
+    for summary, _, _ in parts:
+        for exch in summary:
+            exch_counts[exch["Exchange"]] += exch["Markets"]
+    dict_asset_exch_summary = [{"Exchange": name, "Markets": count} for name, count in exch_counts.items()]
+    dict_asset_pair_main = [row for part in parts for row in part[1]]
+    dict_asset_pair_full = [row for part in parts for row in part[2]]
+    return dict_asset_exch_summary,dict_asset_pair_main,dict_asset_pair_full
+
+
+def e_pair_dict_merge(parts: list[tuple]) -> tuple[list[dict],list[dict],list[dict],list[dict]]:
+    """
+    Merges e_pair_dict_build() results built from consecutive pages into the result of building all of the pages at once.
+
+    :param parts: e_pair_dict_build() results, in page order.
+    :type parts: list[tuple]
+    :rtype: tuple(list[dict],list[dict],list[dict],list[dict])
+    """
+    dict_exch_pair_main = [row for part in parts for row in part[0]]
+    dict_exch_pair_full_fresh = [row for part in parts for row in part[1]]
+    dict_exch_pair_full_stale = [row for part in parts for row in part[2]]
+    # Counting is cheap next to building the rows, so the counts are taken again rather than merged
+    asset_count_list = helper_asset_counts(dict_exch_pair_full_fresh)
+    return dict_exch_pair_main,dict_exch_pair_full_fresh,dict_exch_pair_full_stale,asset_count_list
+
+
+def pair_dict_build_pages(builder, data: list[dict], workers: int | None = None) -> tuple:
+    """
+    Runs a_pair_dict_build() or e_pair_dict_build() with its pages spread across a process pool, then merges the results. Rows come out in the same order as building on one core.
+    Small pulls are built in-process, since starting the pool and copying rows between processes costs more than it saves.
+
+    :param builder: a_pair_dict_build or e_pair_dict_build.
+    :param data: Ticker pages returned by coin_pairs() or exch_pairs().
+    :type data: list[dict]
+    :param workers: Number of processes. Default = build_workers, set by the --workers flag. 1 = build in-process.
+    :type workers: int | None
+    :rtype: tuple
+    """
+    workers = build_workers if workers is None else workers
+    if workers <= 1 or len(data) < 2 or sum(len(page["tickers"]) for page in data) < PARALLEL_BUILD_MIN_TICKERS:
+        return builder(data)
+    from concurrent.futures import ProcessPoolExecutor
+
+    # One page per task, sent to the workers in batches to cut down on round trips
+    chunksize = max(1, len(data) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(builder, [[page] for page in data], chunksize=chunksize))
+    merge = a_pair_dict_merge if builder is a_pair_dict_build else e_pair_dict_merge
+    return merge(parts)
+
+
+def pair_dict_build_stream(builder, pages, queue_size: int = PIPELINE_QUEUE_SIZE) -> tuple[list[dict], tuple]:
+    """
+    Runs a_pair_dict_build() or e_pair_dict_build() on ticker pages as they arrive. Pages are fetched on a background thread into a bounded queue, so that building page N overlaps with fetching page N+1, and the per-page results are merged in page order at the end.
+    If the --workers flag was given, the pages are all fetched first and built in the process pool by pair_dict_build_pages() instead.
+
+    :param builder: a_pair_dict_build or e_pair_dict_build.
+    :param pages: Ticker pages, i.e. from coin_pairs_pages() or exch_pairs_pages(). Consumed on the background thread.
+    :param queue_size: Max number of fetched pages waiting to be built. Fetching pauses while the queue is full.
+    :type queue_size: int
+    :rtype: tuple(list[dict],tuple)
+    :return: The pages fetched, and the builder's result for all of them.
+    """
+    if build_workers > 1:
+        with spans.span("fetch") as span:
+            data = list(pages)
+            span.set(pages=len(data))
+        return data, pair_dict_build_pages(builder, data)
+    import queue
+
+    pipe = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+    # Spans are tracked per thread, so the fetch span is parented to the caller's span by hand
+    parent = spans.current()
+
+    def produce():
+        try:
+            with spans.span("fetch", parent=parent) as span:
+                fetched = 0
+                pages_iter = iter(pages)
+                # Checked before each fetch, so that a failed build doesn't cost another API call
+                while not stop.is_set():
+                    page = next(pages_iter, done)
+                    if page is done:
+                        break
+                    fetched += 1
+                    pipe.put(page)
+                span.set(pages=fetched)
+        except Exception as e:
+            pipe.put(e)
+        pipe.put(done)
+
+    producer = threading.Thread(target=produce, name="page-fetch", daemon=True)
+    producer.start()
+    data = []
+    parts = []
+    try:
+        while True:
+            page = pipe.get()
+            if page is done:
+                break
+            if isinstance(page, Exception):
+                raise page
+            data.append(page)
+            with spans.span("build", builder=builder.__name__, page=len(data)):
+                parts.append(builder([page]))
+    finally:
+        stop.set()
+        # If building failed, keep emptying the queue so the fetch thread isn't left blocked on a full queue
+        while producer.is_alive():
+            try:
+                pipe.get_nowait()
+            except queue.Empty:
+                producer.join(0.05)
+
+    merge = a_pair_dict_merge if builder is a_pair_dict_build else e_pair_dict_merge
+    return data, merge(parts)
+
+
+def estimate_calls(flow: str, count: int = 0) -> int:
+    """
+    Estimate the number of API calls a flow will make before it runs.
+    Pair flows don't know their page count up front, so the MAX_TICKER_PAGES cap is assumed unless a page count is provided or implied by the --max-rows limit.
+
+    :param flow: Command-line name of the flow (assetlist, assetmkts, assetpairs, exchlist, exch100, exchpairs, matrix).
+    :type flow: str
+    :param count: assetmkts = # of assets/IDs requested. exchlist = # of exchanges to pull expanded data for. exch100 = # of Exchange IDs. matrix = # of exchange x asset chunk crawls. assetpairs/exchpairs = # of pages, if known. Not used by assetlist.
+    :type count: int
+    :rtype: int
+    """
+    if flow == "assetlist":
+        return 1
+    elif flow == "assetmkts":
+        return helper_page_count(count, ENDPOINT_PAGE_SIZE["coins/markets"])
+    elif flow in ("assetpairs", "exchpairs"):
+        # A row limit (--max-rows) also caps the pages
+        count = count or helper_page_count(TickerCrawl.default_max_rows or 0, ENDPOINT_PAGE_SIZE["coins/{id}/tickers"])
+        return min(count, MAX_TICKER_PAGES) if count else MAX_TICKER_PAGES
+    elif flow == "exchlist":
+        # 1 exch_list() call + exch_data() pages
+        return 1 + helper_page_count(count, ENDPOINT_PAGE_SIZE["exchanges"])
+    elif flow == "exch100":
+        return count
+    elif flow == "matrix":
+        # exch_pairs() crawls, each of up to as many pages as an exchpairs crawl
+        return count * estimate_calls("exchpairs")
+    raise ValueError(f"Unknown flow: {flow}")
+
+def budget_plan(estimate: int, cap: bool = False) -> int:
+    """
+    Check a job's estimated API calls against the remaining daily budget and return the number of calls it is allowed to make.
+    Prints a note to the user if the job will be trimmed (0 = job refused).
+
+    :param estimate: Estimated number of API calls, usually from estimate_calls().
+    :type estimate: int
+    :param cap: Whether the estimate is only an upper bound (i.e. a ticker crawl of unknown length), in which case the job may well finish within fewer calls. Default = False (exact estimate).
+    :type cap: bool
+    :rtype: int
+    """
+    allowed = Auth.budget.trim(estimate)
+    if allowed == 0 and estimate > 0:
+        print(f"API call budget exhausted: {Auth.budget.spent_today()} calls made today (limit {Auth.budget.daily_limit}/day, {Auth.budget.monthly_limit}/month). Request not sent.")
+    elif allowed < estimate and cap:
+        print(f"Note: Only {allowed} API calls remain in today's budget, so this request will make at most {allowed}. If it needs more, results will be truncated.")
+    elif allowed < estimate:
+        print(f"Note: This request needs {estimate} API calls but only {allowed} remain in today's budget. Results will be trimmed.")
+    elif estimate > ApiBudget.PER_MINUTE_LIMIT and not cap:
+        print(f"This request may make up to {estimate} API calls (about {helper_page_count(estimate, ApiBudget.PER_MINUTE_LIMIT)} min at {ApiBudget.PER_MINUTE_LIMIT} calls/min).")
+    return allowed
+
+
+def helper_pop_flag(flag: str, takes_value: bool = False) -> bool | str | None:
+    """
+    Remove an option flag (and its value) from sys.argv so that the remaining arguments can be read as the command.
+
+    :param flag: Flag, i.e. "--stats".
+    :type flag: str
+    :param takes_value: Whether the flag is followed by a value.
+    :type takes_value: bool
+    :rtype: bool | str | None
+    :return: Whether the flag was given, or its value (None if it wasn't given) if it takes one.
+    """
+    if flag not in sys.argv:
+        return None if takes_value else False
+    i = sys.argv.index(flag)
+    if takes_value:
+        value = sys.argv[i + 1] if i + 1 < len(sys.argv) else None
+        del sys.argv[i:i + 2]
+        return value
+    del sys.argv[i]
+    return True
+
+def helper_asset_counts(pairs: list[dict]) -> list[dict]:
+    """
+    Count the pairs each unique asset (base or quote) trades in, most pairs first. Used for e_pair_dict_build()'s asset_count_list.
+
+    :param pairs: Pair rows with "Base Asset", "Quote Asset" and their CoinGecko IDs.
+    :type pairs: list[dict]
+    :rtype: list[dict]
+    """
     asset_counts = Counter()
-    for pair in dict_exch_pair_full_fresh:
+    for pair in pairs:
         base_code = pair["Base Asset"]
         base_id = pair["CoinGecko Base Asset ID"]
         asset_counts[(base_code,base_id)] += 1
@@ -1392,9 +4393,121 @@ def e_pair_dict_build(data: dict[list[dict]]) -> tuple[list[dict],list[dict],lis
         asset_counts[(quote_code,quote_id)] += 1
     asset_count_list = [{"Asset": asset_symbol, "CoinGecko Asset ID": asset_id, "Count": count} for (asset_symbol,asset_id), count in asset_counts.items()]
     asset_count_list.sort(key=lambda x: x["Count"], reverse=True)
+    return asset_count_list
 
-    return dict_exch_pair_main,dict_exch_pair_full_fresh,dict_exch_pair_full_stale,asset_count_list
+def helper_endpoint_pattern(endpoint: str) -> str:
+    """
+    Path pattern of an API endpoint, with IDs replaced by {id} (i.e. "coins/bitcoin/tickers" = "coins/{id}/tickers"). Used to group metrics by endpoint.
+
+    :param endpoint: API endpoint path.
+    :type endpoint: str
+    :rtype: str
+    """
+    parts = endpoint.strip("/").split("/")
+    if len(parts) >= 2 and parts[0] in ("coins", "exchanges") and parts[1] not in ("list", "markets"):
+        parts[1] = "{id}"
+    return "/".join(parts)
+
+def helper_retry_delay(retry_after: str | None, attempt: int, backoff: float) -> float:
+    """
+    Seconds to wait before retrying a failed request. Uses the server's Retry-After header if it sent one, otherwise exponential backoff.
+
+    :param retry_after: Value of the response's Retry-After header, if any.
+    :type retry_after: str | None
+    :param attempt: Number of the attempt that failed, starting at 0.
+    :type attempt: int
+    :param backoff: Wait after the first failed attempt, in seconds. Doubles with each attempt.
+    :type backoff: float
+    :rtype: float
+    """
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return backoff * 2 ** attempt
+
+def helper_flock(file, locked: bool):
+    """
+    Take or release an exclusive lock on an open file, to serialize writers across processes. fcntl is Unix-only, so elsewhere this does nothing and only the caller's thread lock applies.
+
+    :param file: Open file, i.e. a <name>.lock file next to the file being written.
+    :param locked: True to take the lock (blocking until it's free), False to release it.
+    :type locked: bool
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return
+    fcntl.flock(file, fcntl.LOCK_EX if locked else fcntl.LOCK_UN)
+
+def helper_chunk_ids(ids: list[str], max_ids: int, max_len: int = MAX_IDS_QUERY_LEN) -> list[str]:
+    """
+    Split a list of IDs into comma-separated strings of at most max_ids IDs and max_len characters each.
+
+    :param ids: CoinGecko IDs.
+    :type ids: list[str]
+    :param max_ids: Max number of IDs per chunk.
+    :type max_ids: int
+    :param max_len: Max length of each comma-separated chunk.
+    :type max_len: int
+    :rtype: list[str]
+    """
+    chunks = []
+    chunk = []
+    length = 0
+    for i in ids:
+        # +1 for the comma
+        if chunk and (len(chunk) == max_ids or length + len(i) + 1 > max_len):
+            chunks.append(",".join(chunk))
+            chunk = []
+            length = 0
+        chunk.append(i)
+        length += len(i) + 1
+    if chunk:
+        chunks.append(",".join(chunk))
+    return chunks
+
+def helper_page_count(count: int, per_page: int) -> int:
+    """
+    Number of pages needed to return a number of items from a paginated endpoint (i.e. 501 items at 250/page = 3 pages).
+
+    :param count: Number of items.
+    :type count: int
+    :param per_page: Max items per page. See ENDPOINT_PAGE_SIZE.
+    :type per_page: int
+    :rtype: int
+    """
+    return (count // per_page) + (1 if count % per_page else 0)
 
+def helper_request_key(endpoint: str, params: dict | None) -> tuple:
+    """
+    Build a hashable key identifying a GET request. Params with a value of None are dropped because requests does not send them.
+
+    :param endpoint: API endpoint path.
+    :type endpoint: str
+    :param params: Query parameters for the GET request.
+    :type params: dict | None
+    :rtype: tuple
+    """
+    return (endpoint, tuple(sorted((k, str(v)) for k, v in (params or {}).items() if v is not None)))
+
+def helper_sort_key(value) -> tuple | None:
+    """
+    Sort key for a formatted output value. Numbers and numeric strings ("$1,000.52", "1,000.52 USDT", "5.10274%") sort by their numeric value ahead of other strings. None and "null" return None.
+
+    :param value: A value from a dict list.
+    :rtype: tuple | None
+    """
+    if value is None or value == "null":
+        return None
+    if isinstance(value, bool):
+        return (1, str(value).lower())
+    if isinstance(value, (int, float)):
+        return (0, value)
+    text = str(value)
+    try:
+        # Drop quote asset code from "Last Price (Quote)" values
+        return (0, float(text.split(" ")[0].replace("$", "").replace(",", "").rstrip("%")))
+    except ValueError:
+        return (1, text.lower())
 
 def helper_rfmt_usd(num: float) -> str:
     """
@@ -1430,6 +4543,25 @@ def helper_rfmt_pct(num: float) -> str:
     return pct
 
 
+def preview_table(rows: list[dict], showindex=False) -> str:
+    """
+    Tabulate rows for printing to the console.
+
+    :param rows: Rows to tabulate. Callers pass the slice they want displayed (usually the first 20 rows).
+    :type rows: list[dict]
+    :param showindex: Passed through to tabulate. False, or an iterable of row labels.
+    :rtype: str
+    """
+    from tabulate import tabulate
+
+    with spans.span("render", rows=len(rows)) as span:
+        table = tabulate(rows, headers="keys",showindex=showindex,tablefmt="simple_grid",maxcolwidths=20)
+        # Encoded, since the table holds non-ASCII box-drawing characters
+        if spans.enabled:
+            span.set(bytes=len(table.encode()))
+    return table
+
+
 def csv_export(output: list[dict], prefix: str) -> str | None:
     """
     Export data to a CSV. If no data is available, return to prompts().
@@ -1444,19 +4576,38 @@ def csv_export(output: list[dict], prefix: str) -> str | None:
         prompts()
         return
 
+    import csv
+
     timestamp: datetime = datetime.now().strftime("%Y%m%d%H%M%S")
     filename: str = f"{prefix}_{timestamp}.csv"
 
     fileheaders = output[0].keys()
 
-    with open(filename, "w" ,newline="") as file:
-        writer = csv.DictWriter(file, fieldnames = fileheaders)
-        writer.writeheader()
-        writer.writerows(output)
+    with spans.span("export", file=filename, rows=len(output)) as span:
+        with open(filename, "w" ,newline="") as file:
+            writer = csv.DictWriter(file, fieldnames = fileheaders)
+            writer.writeheader()
+            writer.writerows(output)
+        span.set(bytes=os.path.getsize(filename))
 
     return f"CSV exported successfully! Filename: {filename}\n"
 
 
+# Flow functions by command name. Used by the command-line arguments & prompts().
+FLOWS = {
+    "assetlist": asset_list,
+    "assetmkts": asset_mkts,
+    "assetpairs": asset_pairs,
+    "exchlist": exchange_list,
+    "exch100": exchange_top100,
+    "exchpairs": exchange_pairs,
+    "matrix": exchange_matrix,
+}
+# Set by main() if the --profile flag is given
+profiler = None
+# Processes used to build pair rows. Set by the --workers flag.
+build_workers = 1
+
 
 if __name__ == "__main__":
     main()
@@ -4,6 +4,32 @@ from requests.exceptions import ConnectionError, Timeout, TooManyRedirects, HTTP
 import requests
 from unittest.mock import patch
 import re
+import json
+import os
+
+
+@pytest.fixture
+def mock_api():
+    """
+    Start mock_gecko servers for a test: `base_url = mock_api(coins=300, tickers=150)`, with any MockGecko settings. The servers started are in mock_api.servers.
+    For the whole test, requests go through a rate limiter that doesn't wait, a 1000-call budget whose calls aren't written to the ledger, and fresh metrics. The servers are shut down afterwards.
+    """
+    import mock_gecko
+    servers = []
+
+    def start(**settings) -> str:
+        server, base_url = mock_gecko.start(**settings)
+        servers.append(server)
+        return base_url
+
+    start.servers = servers
+    with patch.object(project.Auth, "rate_limiter", project.RateLimiter(0)), patch.object(project.Auth, "metrics", project.Metrics()), \
+            patch.object(project.Auth, "budget", project.ApiBudget(daily_limit=1000)), patch.object(project.ApiBudget, "record"):
+        try:
+            yield start
+        finally:
+            for server in servers:
+                server.shutdown()
 
 
 def test_coin_list():
@@ -517,3 +543,727 @@ def test_e_pair_dict_build():
     assert asset_count_list[3]["Asset"] == "BTC"
     assert asset_count_list[3]["Count"] == 2
 
+
+
+def test_api_budget(tmp_path, capsys):
+    budget = project.ApiBudget(daily_limit=5, monthly_limit=100, ledger_file=tmp_path / "ledger.json")
+
+    # Test estimates from page counts and ID counts
+    assert project.estimate_calls("assetmkts", 501) == 3
+    assert project.estimate_calls("exchlist", 250) == 2
+    assert project.estimate_calls("assetpairs") == project.MAX_TICKER_PAGES
+
+    # Test calls are counted in memory, and only written to the ledger once flushed
+    budget.record(3)
+    assert budget.spent_today() == 3 and project.ApiBudget(ledger_file=tmp_path / "ledger.json").spent_today() == 0
+    budget.flush()
+    assert project.ApiBudget(ledger_file=tmp_path / "ledger.json").spent_today() == 3
+    # Test job trimmed to remaining daily budget
+    assert budget.trim(10) == 2
+
+    # Test request refused once budget is spent
+    budget.record(2)
+    assets = project.Assets()
+    with patch.object(project.Auth, "budget", budget), patch.object(assets.session, "get") as get:
+        assert assets.coin_list() is None
+    get.assert_not_called()
+
+    # Test a crawl's page cap is reported as a cap, not as a trim or a long run
+    with patch.object(project.Auth, "budget", project.ApiBudget(daily_limit=50, ledger_file=tmp_path / "plan.json")):
+        assert project.budget_plan(project.estimate_calls("assetpairs"), cap=True) == 50
+        assert "at most 50" in capsys.readouterr().out
+        project.Auth.budget.daily_limit = 1000
+        project.budget_plan(project.estimate_calls("assetpairs"), cap=True)
+        assert capsys.readouterr().out == ""
+        project.budget_plan(99)
+        assert "up to 99 API calls" in capsys.readouterr().out
+
+    # Test two runs sharing a ledger add to each other's calls rather than overwriting them
+    first, second = (project.ApiBudget(ledger_file=tmp_path / "shared.json") for _ in range(2))
+    first.spent_today(), second.spent_today()
+    first.record(2)
+    second.record(3)
+    first.flush(), second.flush()
+    assert project.ApiBudget(ledger_file=tmp_path / "shared.json").spent_today() == 5
+    # Test a batch is written without an explicit flush once FLUSH_EVERY calls are counted
+    first.record(project.ApiBudget.FLUSH_EVERY)
+    assert project.ApiBudget(ledger_file=tmp_path / "shared.json").spent_today() == 5 + project.ApiBudget.FLUSH_EVERY
+
+
+def test_single_flight():
+    import threading
+    import time
+    exchanges = project.Exchanges()
+    calls = []
+
+    def slow_fetch(endpoint, params=None):
+        calls.append(endpoint)
+        time.sleep(0.2)
+        return {"name": "Binance", "tickers": []}
+
+    results = []
+    with patch.object(exchanges, "_fetch", side_effect=slow_fetch):
+        threads = [threading.Thread(target=lambda: results.append(exchanges.exch_pairs("binance", page=1))) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # Test identical concurrent requests share one HTTP call and its parsed result
+    assert len(calls) == 1
+    assert len(results) == 5
+    assert all(result is results[0] for result in results)
+
+
+def test_coin_mkts_ids():
+    assets = project.Assets()
+    ids = [f"coin-{i}" for i in range(600)]
+
+    # Test chunks respect both the ID count and URL length limits
+    chunks = project.helper_chunk_ids(ids, 250)
+    assert [len(chunk.split(",")) for chunk in chunks] == [250, 250, 100]
+    assert all(len(chunk) <= 500 for chunk in project.helper_chunk_ids(ids, 250, max_len=500))
+
+    # Stand-in for coins/markets: returns every requested ID except coin-7, with market cap = ID number
+    def fake_get(endpoint, params=None):
+        return [{"id": i, "market_cap": int(i.split("-")[1])} for i in params["ids"].split(",") if i != "coin-7"]
+
+    with patch.object(assets, "_get", side_effect=fake_get):
+        data, missing = assets.coin_mkts_ids(ids + ["coin-1"])
+
+    # Test merged results are sorted by market cap descending with no duplicates
+    assert len(data) == 599
+    assert data[0]["id"] == "coin-599"
+    assert data[-1]["id"] == "coin-0"
+    # Test missing IDs are reported
+    assert missing == ["coin-7"]
+
+    # Test the assetmkts flow budgets for the IDs left after duplicates and blanks are dropped: 200 unique IDs = 1 chunk, not 2
+    typed = ",".join(ids[:200] * 2) + ", ,"
+    with patch("builtins.input", side_effect=["ids", typed]), patch.object(project, "budget_plan", side_effect=KeyboardInterrupt) as plan:
+        with pytest.raises(KeyboardInterrupt):
+            project.asset_mkts()
+    plan.assert_called_once_with(1)
+
+
+def test_pager():
+    rows = [{"Name": f"Coin {i}", "Price (USD)": project.helper_rfmt_usd(i * 1.5) if i % 10 else "null", "Rank": i} for i in range(1, 50001)]
+    pager = project.Pager(rows, columns=["Name", "Price (USD)"])
+
+    # Test only the visible window is built, limited to the selected columns
+    assert pager.window() == [{"Name": f"Coin {i}", "Price (USD)": rows[i - 1]["Price (USD)"]} for i in range(1, 21)]
+    pager.scroll(1)
+    assert pager.window()[0]["Name"] == "Coin 21"
+    # Test scrolling stops at the last page
+    pager.scroll(5000)
+    assert pager.window()[-1]["Name"] == "Coin 50000"
+
+    # Test sort on formatted USD values, with nulls last
+    pager.sort("price (usd)", descending=True)
+    assert pager.window()[0]["Name"] == "Coin 49999"
+    pager.goto(len(rows))
+    assert pager.window()[-1]["Price (USD)"] == "null"
+
+    # Test column selection by number
+    pager.select(["3", "Name"])
+    assert list(pager.window()[0].keys()) == ["Rank", "Name"]
+
+
+def test_a_list_dict_build():
+    from mock_payloads import PayloadGenerator
+    data = PayloadGenerator(seed=1).coins_list(500)
+
+    dict_asset_chainpop,dict_asset_chain_sep_assets = project.a_list_dict_build(data)
+
+    # Test row numbers follow list order
+    assert [asset["#"] for asset in dict_asset_chainpop] == list(range(1, 501))
+    # Test one row per chain, or one "null" row for assets without platforms
+    assert len(dict_asset_chain_sep_assets) == sum(len(asset["platforms"]) or 1 for asset in data)
+    nulls = [asset for asset in dict_asset_chain_sep_assets if asset["Blockchain"] == "null"]
+    assert len(nulls) == sum(1 for asset in data if not asset["platforms"])
+
+
+def test_mock_server_retries(mock_api):
+    # A third of requests fail with a 5xx
+    exchanges = project.Exchanges(base_url=mock_api(coins=300, exchanges=20, tickers=250, error_rate=0.3))
+    # The breaker is turned off, since runs of injected errors would otherwise open the circuit
+    with patch.object(project.Auth, "breaker", project.CircuitBreaker(failure_threshold=0)), patch.object(project.Auth, "retry_backoff", 0), \
+            patch.object(project.Auth, "max_retries", 10):
+        pages = [exchanges.exch_pairs("binance", page=i) for i in range(1, 5)]
+        missing = exchanges.exch_top100("not-an-exchange")
+
+    # Test pagination: 250 tickers = 2 full pages, a partial page, then an empty page. Every request eventually succeeds despite injected errors.
+    assert [len(page["tickers"]) for page in pages] == [100, 100, 50, 0]
+    # Test unknown IDs 404 like the real API
+    assert missing is None
+
+
+def test_metrics(tmp_path, mock_api):
+    assets = project.Assets(base_url=mock_api(coins=300, exchanges=20, tickers=150))
+    assets.coin_list()
+    assets.coin_pairs("bitcoin", page=1)
+    assets.coin_pairs("ethereum", page=2)
+
+    metrics = project.Auth.metrics
+    snapshot = metrics.snapshot()
+    # Test requests are grouped by endpoint path pattern
+    assert snapshot["coins/list"]["requests"] == 1
+    assert snapshot["coins/{id}/tickers"]["requests"] == 2
+    assert snapshot["coins/{id}/tickers"]["bytes"] > 0
+    assert sum(snapshot["coins/{id}/tickers"]["latency_buckets"]) == 2
+
+    # Test Prometheus text output
+    metrics.write_prometheus(tmp_path / "metrics.prom")
+    prom = (tmp_path / "metrics.prom").read_text()
+    assert 'coingecko_requests_total{endpoint="coins/{id}/tickers"} 2' in prom
+    assert 'coingecko_request_duration_seconds_count{endpoint="coins/list"} 1' in prom
+
+
+def test_flow_profiler(tmp_path, monkeypatch):
+    import pstats
+    monkeypatch.chdir(tmp_path)
+    profiler = project.FlowProfiler()
+
+    def inner_flow():
+        sum(i * i for i in range(10000))
+
+    def outer_flow():
+        # Flows chain into each other through prompts()/run_flow()
+        profiler.run("exchpairs", inner_flow)
+        sorted(range(10000), key=str)
+
+    profiler.run("exchlist", outer_flow)
+
+    # Test one pstats file per flow, named by flow
+    assert [name.split("_")[1] for name in profiler.files] == ["exchpairs", "exchlist"]
+    # Test the outer flow's profile is paused while the flow it started runs
+    outer = pstats.Stats(profiler.files[1]).stats
+    assert not any(func[2] == "inner_flow" for func in outer)
+    assert any(func[2] == "outer_flow" for func in outer)
+
+
+def test_spans(tmp_path):
+    spans = project.Spans()
+    # Test spans are free no-ops while disabled
+    assert spans.span("fetch") is project._NULL_SPAN
+
+    path = tmp_path / "spans.jsonl"
+    spans.enable(str(path))
+    with spans.span("flow", flow="exchpairs"):
+        with spans.span("build", builder="e_pair_dict_build") as span:
+            span.set(rows=3)
+        with pytest.raises(ValueError):
+            with spans.span("export"):
+                raise ValueError
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+
+    # Test spans are written as they finish, children before their parent
+    assert [r["span"] for r in records] == ["build", "export", "flow"]
+    flow = records[2]
+    assert flow["parent"] is None and flow["flow"] == "exchpairs"
+    # Test nested spans record their parent, depth and attributes
+    assert records[0]["parent"] == flow["id"] and records[0]["depth"] == 1 and records[0]["rows"] == 3
+    assert records[1]["error"] == "ValueError"
+
+    # Test a flow's span ends when it chains into the next flow, rather than covering it
+    path.write_text("")
+    flows = {"assetmkts": project.prompts, "assetlist": lambda: None}
+    with patch.object(project, "spans", spans), patch.dict(project.FLOWS, flows), patch("builtins.input", return_value="assetlist"):
+        project.run_flow("assetmkts")
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(r["flow"], r["parent"]) for r in records] == [("assetmkts", None), ("assetlist", None)]
+
+    # Test the pair pipeline's fetch span, and the requests on its fetch thread, nest under the caller's span
+    path.write_text("")
+    def pages():
+        for _ in range(2):
+            with project.spans.span("http"):
+                pass
+            yield {"tickers": []}
+    with patch.object(project, "spans", spans), patch.object(project, "build_workers", 1):
+        with spans.span("pipeline"):
+            project.pair_dict_build_stream(lambda page: ([], [], []), pages())
+    records = {r["span"]: r for r in map(json.loads, path.read_text().splitlines())}
+    pipeline, fetch = records["pipeline"]["id"], records["fetch"]["id"]
+    assert (records["fetch"]["parent"], records["http"]["parent"], records["build"]["parent"]) == (pipeline, fetch, pipeline)
+    assert records["http"]["depth"] == 2
+    spans.stream.close()
+
+
+def test_cassette(tmp_path, mock_api):
+    path = str(tmp_path / "cassette.json.gz")
+    exchanges = project.Exchanges(base_url=mock_api(coins=300, exchanges=20, tickers=150))
+    with patch.object(project.Auth, "cassette", project.Cassette(path, "record")):
+        recorded = exchanges.exch_pairs("binance", page=2)
+        exchanges.exch_top100("not-an-exchange")
+        project.Auth.cassette.save()
+    mock_api.servers[0].shutdown()
+
+    metrics = project.Metrics()
+    with patch.object(project.Auth, "cassette", project.Cassette(path, "replay")), patch.object(project.Auth, "metrics", metrics), \
+            patch.object(project.ApiBudget, "remaining", return_value=0):
+        # Test replay serves recorded responses with the server gone and no budget left
+        assert exchanges.exch_pairs("binance", page=2) == recorded
+        # Test recorded errors replay as errors
+        assert exchanges.exch_top100("not-an-exchange") is None
+        # Test requests that were never recorded are refused
+        assert exchanges.exch_pairs("binance", page=3) is None
+    assert metrics.snapshot()["exchanges/{id}/tickers"]["cache_hits"] == 1
+    assert metrics.snapshot()["exchanges/{id}/tickers"]["cache_misses"] == 1
+
+    # A text/* response with no charset, which requests would decode as ISO-8859-1
+    response = requests.Response()
+    response.status_code, response._content = 200, '{"name": "Café ₿"}'.encode()
+    response.headers["Content-Type"] = "text/plain"
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    cassette = project.Cassette(str(tmp_path / "bytes.json.gz"), "record")
+    cassette.record("coins/list", None, response)
+    cassette.save()
+    replayed = project.Cassette(str(tmp_path / "bytes.json.gz"), "replay")
+    # Test replay gives back the exact bytes received, not a re-encoding of the decoded text
+    assert response.text != '{"name": "Café ₿"}'
+    assert replayed.content(replayed.play("coins/list", None)) == response.content
+    # Test entries from cassettes that stored the decoded text still replay
+    assert project.Cassette.content({"status": 200, "headers": {}, "body": '{"id": "bitcoin"}'}) == b'{"id": "bitcoin"}'
+
+
+def test_pair_dict_build_pages():
+    from mock_payloads import PayloadGenerator
+    gen = PayloadGenerator(7)
+    asset_pages = gen.ticker_pages(450)
+    exch_pages = gen.ticker_pages(450, exchange="binance")
+    with patch.object(project, "PARALLEL_BUILD_MIN_TICKERS", 0):
+        # Test building pages in a process pool gives the same rows, in the same order, as building on one core
+        assert project.pair_dict_build_pages(project.a_pair_dict_build, asset_pages, workers=2) == project.a_pair_dict_build(asset_pages)
+        assert project.pair_dict_build_pages(project.e_pair_dict_build, exch_pages, workers=2) == project.e_pair_dict_build(exch_pages)
+
+
+def test_json_decoder():
+    # Picking a decoder sets module globals, so they're restored when the test ends
+    with patch.object(project, "json_loads"), patch.object(project, "json_decoder"):
+        # Test the stdlib decoder can always be picked, and decodes straight from bytes
+        assert project._import_json_decoder("json") == "json"
+        assert project.json_loads(b'{"tickers": [{"last": 1.5}]}') == {"tickers": [{"last": 1.5}]}
+        with pytest.raises(ImportError):
+            project._import_json_decoder("not_a_json_library")
+        # Test the default pick is the first installed decoder
+        assert project._import_json_decoder() in project.JSON_DECODERS
+
+
+def test_pair_dict_build_stream(mock_api):
+    import time
+    exchanges = project.Exchanges(base_url=mock_api(coins=300, exchanges=20, tickers=250))
+    data, built = project.pair_dict_build_stream(project.e_pair_dict_build, exchanges.exch_pairs_pages("binance"), queue_size=1)
+    capped, _ = project.pair_dict_build_stream(project.e_pair_dict_build, exchanges.exch_pairs_pages("binance", max_pages=2))
+
+    # Test paging stops at the short last page: 250 tickers = 3 pages
+    assert [len(page["tickers"]) for page in data] == [100, 100, 50]
+    assert len(capped) == 2
+    # Test pipelined per-page building gives the same rows as building all pages at once
+    assert built == project.e_pair_dict_build(data)
+    # Test a failed build doesn't leave the fetch thread hanging
+    with pytest.raises(KeyError):
+        project.pair_dict_build_stream(project.e_pair_dict_build, iter([{"tickers": [{}]}] * 10), queue_size=1)
+    # Test no page is fetched once a build has failed: the build of page 1 fails while page 2 is being fetched
+    fetched = []
+
+    def slow_pages():
+        for i in range(10):
+            time.sleep(0.05)
+            fetched.append(i)
+            yield {"tickers": [{}]}
+    with pytest.raises(KeyError):
+        project.pair_dict_build_stream(project.e_pair_dict_build, slow_pages(), queue_size=1)
+    assert len(fetched) == 2
+
+
+def test_market_sync(tmp_path, mock_api):
+    checkpoint = str(tmp_path / "sync")
+    assets = project.Assets(base_url=mock_api(coins=600, exchanges=20, tickers=100))
+    # Interrupted after 2 of 3 pages, i.e. by the budget
+    partial, complete = project.MarketSync(assets, checkpoint).run(max_calls=2)
+    sync = project.MarketSync(assets, checkpoint)
+    resumed = sync.done_pages()
+    data, resumed_complete = sync.run()
+
+    assert (len(partial), complete) == (500, False)
+    # Test a new sync resumes from the checkpointed pages
+    assert resumed == [1, 2]
+    # Test the resumed sync finds the short last page and returns every asset once, in market cap order
+    assert resumed_complete and len(data) == 600 and len({asset["id"] for asset in data}) == 600
+    assert [asset["market_cap_rank"] for asset in data] == list(range(1, 601))
+    # Test the checkpoint is removed once the sync is complete
+    assert not os.path.exists(checkpoint)
+
+
+def test_market_sync_end(tmp_path, mock_api):
+    assets = project.Assets(base_url=mock_api(coins=600, exchanges=20, tickers=100))
+    with patch.object(project.Auth, "rate_limiter", project.RateLimiter(600)):
+        data, complete = project.MarketSync(assets, str(tmp_path / "sync"), workers=4).run()
+        sent = project.Auth.metrics.snapshot()["coins/markets"]["requests"]
+        with patch.object(project, "MAX_MARKET_PAGES", 2):
+            capped = project.MarketSync(assets, str(tmp_path / "capped"))
+            capped_data, capped_complete = capped.run()
+    # Two pooled keys are granted slots at the same moment, so a one-slot wait wouldn't keep the page past the end from being sent
+    with patch.object(project.Auth, "key_pool", project.KeyPool(["key-a", "key-b"], 600)):
+        project.Auth.metrics.reset()
+        project.MarketSync(assets, str(tmp_path / "pooled"), workers=4).run()
+        pooled = project.Auth.metrics.snapshot()["coins/markets"]["requests"]
+
+    # Test the page after the short last page isn't sent, with or without a key pool
+    assert complete and len(data) == 600 and sent == pooled == 3
+    # Test a sync that reaches the page cap with full pages ends there and clears its checkpoint
+    assert (len(capped_data), capped_complete, capped.capped) == (500, True, True)
+    assert not os.path.exists(tmp_path / "capped")
+
+
+def test_ticker_crawl():
+    def fetch_page(page):
+        # 250 tickers: 2 full pages and a short last page
+        return {"tickers": [{}] * min(100, max(0, 250 - (page - 1) * 100))}
+
+    crawl = project.TickerCrawl(fetch_page)
+    # Test a short page ends the crawl without asking for the empty page after it
+    assert [len(page["tickers"]) for page in crawl] == [100, 100, 50]
+    assert crawl.complete and crawl.rows == 250
+
+    crawl = project.TickerCrawl(fetch_page, max_rows=150)
+    # Test the row limit cuts the last page short and is reported as a truncation
+    assert [len(page["tickers"]) for page in crawl] == [100, 50]
+    assert (crawl.complete, crawl.reason) == (False, "max_rows")
+    crawl = project.TickerCrawl(fetch_page, max_rows=220)
+    # Test a row limit that cuts the short last page still reports the crawl as reaching the end, with the tickers left out
+    assert [len(page["tickers"]) for page in crawl] == [100, 100, 20]
+    assert (crawl.reason, crawl.dropped) == ("complete", 30) and "220 of the 250" in crawl.summary()
+
+    crawl = project.TickerCrawl(fetch_page, max_pages=1)
+    assert len(list(crawl)) == 1 and crawl.reason == "max_pages"
+    crawl = project.TickerCrawl(fetch_page, deadline=0)
+    assert list(crawl) == [] and crawl.reason == "deadline"
+    crawl = project.TickerCrawl(lambda page: None)
+    assert list(crawl) == [] and crawl.reason == "error"
+
+
+def test_coin_pairs_topk(mock_api):
+    assets = project.Assets(base_url=mock_api(coins=300, exchanges=20, tickers=450))
+    top = list(assets.coin_pairs_topk("bitcoin", k=10))
+    everything = [t for page in assets.coin_pairs_pages("bitcoin") for t in page["tickers"]]
+    threshold = sorted(t["converted_volume"]["usd"] for t in everything)[-150]
+    over = assets.coin_pairs_topk("bitcoin", k=1000, min_volume_usd=threshold)
+    above = [t for page in over for t in page["tickers"]]
+
+    fresh = sorted((t for t in everything if not t["is_stale"]), key=lambda t: t["converted_volume"]["usd"], reverse=True)
+    # Test top-K returns the K highest-volume fresh tickers
+    assert [t["converted_volume"]["usd"] for page in top for t in page["tickers"]] == [t["converted_volume"]["usd"] for t in fresh[:10]]
+    # Test the crawl stops at the first page under the volume threshold: 150 tickers over it = 2 pages
+    assert over.pages == 2 and over.reason == "complete"
+    assert all(t["converted_volume"]["usd"] >= threshold and not t["is_stale"] for t in above)
+    # 1 call for top 10, 5 for the full crawl, 2 for the threshold crawl
+    assert project.Auth.metrics.snapshot()["coins/{id}/tickers"]["requests"] == 8
+
+
+def test_listing_matrix():
+    matrix = project.ListingMatrix(["bitcoin", "ethereum", "solana"], ["binance", "kraken"])
+    matrix.set("bitcoin", "binance")
+    matrix.set("bitcoin", "kraken")
+    matrix.set("ethereum", "binance")
+    # Test row & column queries, including intersections
+    assert matrix.exchanges_for("bitcoin") == ["binance", "kraken"]
+    assert matrix.exchanges_for("bitcoin", "ethereum") == ["binance"]
+    assert matrix.assets_on("kraken") == ["bitcoin"]
+    assert matrix.assets_on() == ["bitcoin", "ethereum", "solana"]
+    assert not matrix.has("solana", "binance")
+    # Test the dense export has a column per exchange
+    assert matrix.rows()[1] == {"CoinGecko Asset ID": "ethereum", "binance": True, "kraken": False, "Exchanges": 1}
+
+
+def test_exch_listings(mock_api):
+    base_url = mock_api(coins=50, exchanges=5, tickers=300)
+    exchanges = project.Exchanges(base_url=base_url)
+    exch_ids = [exch["id"] for exch in exchanges.exch_list()]
+    coin_ids = [coin["id"] for coin in project.Assets(base_url=base_url).coin_list()][:10]
+    truth = {}
+    for exch in exch_ids:
+        for page in exchanges.exch_pairs_pages(exch):
+            for t in page["tickers"]:
+                truth.setdefault(exch, set()).update({t["coin_id"], t["target_coin_id"]})
+    matrix, unchecked = exchanges.exch_listings(coin_ids, exch_ids + ["not-an-exchange"])
+
+    # Test the matrix matches full crawls of every exchange
+    for exch in exch_ids:
+        assert matrix.assets_on(exch) == [coin for coin in coin_ids if coin in truth[exch]]
+    # Test exchanges that couldn't be checked are reported
+    assert unchecked == ["not-an-exchange"]
+
+
+def test_exch_listings_budget(mock_api):
+    base_url = mock_api(coins=50, exchanges=5, tickers=3000)
+    exchanges = project.Exchanges(base_url=base_url)
+    exch_ids = [exch["id"] for exch in exchanges.exch_list()]
+    coin_ids = [coin["id"] for coin in project.Assets(base_url=base_url).coin_list()]
+    _, unchecked = exchanges.exch_listings(coin_ids, exch_ids, max_calls=7)
+    sent = project.Auth.metrics.snapshot()["exchanges/{id}/tickers"]["requests"]
+    project.Auth.metrics.reset()
+    _, unstarted = exchanges.exch_listings(coin_ids, exch_ids, max_calls=3)
+    started = project.Auth.metrics.snapshot()["exchanges/{id}/tickers"]["requests"]
+
+    # Test the estimate counts every page a crawl may fetch
+    assert project.estimate_calls("matrix", 3) == 3 * project.MAX_TICKER_PAGES
+    # Test max_calls caps the pages sent, not just the crawls started: 7 calls over 5 crawls = 1 page each
+    assert sent == 5
+    # Test every crawl cut short by the cap is reported: 50 coins don't all show up in the first 100 of 3000 tickers
+    assert unchecked == exch_ids
+    # Test crawls past max_calls aren't started, and are reported along with the cut ones
+    assert started == 3 and unstarted == exch_ids
+
+
+def test_snapshot_store(tmp_path):
+    pytest.importorskip("numpy")
+    from datetime import datetime
+    from mock_payloads import PayloadGenerator
+    store = project.SnapshotStore(str(tmp_path / "store"))
+    snapshot = PayloadGenerator(3).coins_markets(50)
+    for day in (30, 1, 2):
+        month = 9 if day == 30 else 10
+        store.append(snapshot, datetime(2026, month, day, 12))
+
+    # Test time-range queries only return the pulls in range, across month partitions
+    assert store.partitions() == ["2026-09", "2026-10"]
+    result = store.query(datetime(2026, 9, 30), datetime(2026, 10, 1, 23))
+    assert len(result["time"]) == 100
+    # Test coin-set queries and missing values
+    coins = [snapshot[0]["id"], snapshot[7]["id"]]
+    result = project.SnapshotStore(str(tmp_path / "store")).query(coins=coins)
+    assert [store.coins()[i] for i in result["coin"][:2]] == coins and len(result["coin"]) == 6
+    assert result["price"][0] == snapshot[0]["current_price"]
+    rows = project.snapshot_history_rows(store, [snapshot[0]["id"]])
+    assert [row["Fetched At"] for row in rows] == ["2026-09-30T12:00:00", "2026-10-01T12:00:00", "2026-10-02T12:00:00"]
+    # Test an out-of-order backfill is refused rather than breaking the time-range search
+    with pytest.raises(ValueError):
+        store.append(snapshot, datetime(2026, 10, 1, 18))
+    # Test a second store on the same directory (i.e. another run) doesn't reuse coin indexes registered since it read the registry
+    other = project.SnapshotStore(str(tmp_path / "store"))
+    other.coins()
+    store.append([{"id": "new-a"}], datetime(2026, 10, 3))
+    other.append([{"id": "new-b"}], datetime(2026, 10, 4))
+    assert project.SnapshotStore(str(tmp_path / "store")).coins()[-2:] == ["new-a", "new-b"]
+
+
+def test_market_rollups(tmp_path):
+    from datetime import datetime
+    rollups = project.MarketRollups(str(tmp_path / "rollups.sqlite"))
+    pulls = [(datetime(2026, 10, 1, 12, 0, 10), 100, 5), (datetime(2026, 10, 1, 12, 0, 50), 90, 7), (datetime(2026, 10, 1, 12, 0, 30), 120, 6), (datetime(2026, 10, 1, 13, 5), 95, 1)]
+    for fetched, price, volume in pulls:
+        rollups.update([{"id": "bitcoin", "current_price": price, "total_volume": volume}, {"id": "nulled", "current_price": None}], fetched)
+
+    # Test buckets are folded incrementally, with open/close by fetch time even when pulls arrive out of order
+    minute = rollups.buckets("1m", ["bitcoin"])[0]
+    assert (minute["open"], minute["high"], minute["low"], minute["close"], minute["samples"]) == (100, 120, 90, 90, 3)
+    # Test the 24h volume is the latest reported in the bucket, not a sum that grows with the number of pulls
+    assert minute["volume_24h"] == 7
+    # Test coarser resolutions and skipped coins without a price
+    assert [bucket["close"] for bucket in rollups.buckets("1h")] == [90, 95]
+    assert rollups.buckets("1d")[0]["samples"] == 4 and rollups.buckets("1d", ["nulled"]) == []
+    assert project.rollup_rows(rollups, "1h", ["bitcoin"])[1]["Bucket Start"] == "2026-10-01T13:00:00"
+    with pytest.raises(ValueError):
+        rollups.buckets("5m")
+    rollups.close()
+
+
+def test_data_service(mock_api):
+    import threading
+    from urllib.error import HTTPError as URLHTTPError
+    from urllib.request import urlopen
+    service = project.DataService(project.RefreshCache(ttl=60), base_url=mock_api(coins=300, exchanges=5, tickers=150))
+    server = service.start(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        first = json.load(urlopen(f"{url}/markets?top=5"))
+        second = json.load(urlopen(f"{url}/markets?top=5"))
+        a, b = (row["Gecko ID"] for row in first["tables"]["main"][:2])
+        by_ids = [json.load(urlopen(f"{url}/markets?ids={ids}"))["cache"] for ids in (f"{a},{b}", f"{b.upper()},%20{a},{a}")]
+        with pytest.raises(URLHTTPError) as missing:
+            urlopen(f"{url}/pairs")
+        metrics = project.Auth.metrics.snapshot()
+    finally:
+        server.shutdown()
+
+    # Test the first request loads from upstream and the repeat is served from the cache
+    assert (first["cache"], second["cache"], len(second["tables"]["main"])) == ("miss", "hit", 5)
+    assert metrics["coins/markets"]["requests"] == 2
+    # Test equivalent ID lists share a cache entry
+    assert by_ids == ["miss", "hit"]
+    # Test hits & misses are counted, and missing parameters are rejected
+    assert (metrics["service/markets"]["cache_hits"], metrics["service/markets"]["cache_misses"]) == (2, 2)
+    assert missing.value.code == 400
+    # Test an expired entry keeps being served when its reload fails
+    cache = project.RefreshCache(ttl=0)
+    cache.get(("key",), lambda: [1])
+    assert cache.get(("key",), lambda: None)[::2] == ([1], "stale")
+    # Test a failed key isn't reloaded until retry_after has passed
+    loads = []
+    assert cache.get(("key",), lambda: loads.append(1))[::2] == ([1], "stale") and loads == []
+    cache.retry_after = 0
+    assert cache.get(("key",), lambda: [2])[0] == [2]
+    # Test a full cache evicts its oldest entry
+    cache = project.RefreshCache(ttl=60)
+    cache.max_entries = 2
+    for key in "abc":
+        cache.get((key,), lambda: [key])
+    assert sorted(cache._entries) == [("b",), ("c",)]
+    # Test a loader that raises is answered with a 500 rather than dropping the connection
+    with patch.object(project.DataService, "_exchanges", side_effect=KeyError("id")), patch.object(project.Auth, "metrics", project.Metrics()):
+        status, body = service.dataset("exchanges", {})
+    assert status == 500 and "exchanges" in body["error"]
+
+
+def test_main_flags():
+    # Test bad option values exit with a message rather than a traceback
+    for flag, value in (("--port", "http"), ("--port", "70000"), ("--ttl", "soon"), ("--ttl", "-1"), ("--workers", "many"), ("--max-rows", "abc"), ("--deadline", "soon"), ("--keys", ",")):
+        with patch.object(project.sys, "argv", ["project.py", flag, value, "serve"]), pytest.raises(SystemExit) as exit:
+            project.main()
+        assert flag in str(exit.value.code)
+
+
+def test_async_clients(mock_api):
+    import asyncio
+    base_url = mock_api(coins=300, exchanges=5, tickers=250, latency_ms=50)
+
+    async def collect():
+        async with project.AsyncAssets(base_url=base_url, concurrency=10) as assets, project.AsyncExchanges(base_url=base_url) as exchanges:
+            ids = [coin["id"] for coin in await assets.coin_list()][:20]
+            pairs = await asyncio.gather(*(assets.coin_pairs(id) for id in ids))
+            peak = mock_api.servers[0].mock.peak_in_flight
+            crawl = exchanges.exch_pairs_pages((await exchanges.exch_list())[0]["id"])
+            pages = [page async for page in crawl]
+            # Several tasks pulling pages from one crawl at once
+            shared = exchanges.exch_pairs_pages((await exchanges.exch_list())[1]["id"])
+            sizes = await asyncio.gather(*(shared.__anext__() for _ in range(3)))
+            topk = [page async for page in assets.coin_pairs_topk(ids[0], k=150)]
+            by_ids = await assets.coin_mkts_ids(ids[:5] + [ids[0], "not-a-coin"])
+            return pairs, peak, await assets.coin_mkts_top(260), pages, crawl, sizes, topk, by_ids
+
+    pairs, peak, markets, pages, crawl, shared, topk, (by_ids, missing) = asyncio.run(collect())
+
+    # Test the fetches are sent concurrently. The mock counts a request until its handler returns, so the peak can briefly pass the client's concurrency of 10.
+    assert all(len(response["tickers"]) == 100 for response in pairs) and peak >= 5
+    # Test a crawl iterated from several tasks at once hands out each page once
+    assert [len(page["tickers"]) for page in shared] == [100, 100, 50]
+    # Test the pagination helpers
+    assert len(markets) == 260 and [len(page["tickers"]) for page in pages] == [100, 100, 50] and crawl.complete
+    # Test top-K pairs come back as an async crawl, and ID lookups are merged like the blocking method's
+    assert sum(len(page["tickers"]) for page in topk) == 150
+    assert len(by_ids) == 5 and missing == ["not-a-coin"]
+    # Test the async methods keep the blocking methods' signatures
+    assert project.AsyncAssets.coin_mkts.__doc__ == project.Assets.coin_mkts.__doc__
+
+
+def test_key_pool(mock_api):
+    base_url = mock_api(coins=50, exchanges=5, tickers=100, rate_limit=2)
+    pool = project.KeyPool(["key-a", "key-b", "key-b", " "], calls_per_minute=0)
+    # Use up key-a's per-minute limit outside of the pool
+    spent = project.Assets(api_key="key-a", base_url=base_url)
+    spent.coin_list(), spent.coin_list()
+    with patch.object(project.Auth, "key_pool", pool):
+        assets = project.Assets(base_url=base_url)
+        results = [assets.coin_list(), assets.coin_list()]
+        metrics = project.Auth.metrics.snapshot()["coins/list"]
+
+    # Test requests are spread over the keys and a 429 benches its key instead of waiting
+    assert pool.keys == ["key-a", "key-b"] and all(results)
+    assert (pool.used, pool.throttled, metrics["retries"]) == ({"key-a": 1, "key-b": 2}, {"key-a": 1, "key-b": 0}, 1)
+    assert pool.benched_until["key-a"] > project.monotonic() + 30 and "...ey-a" in pool.report()
+    # Test the key with the most headroom is picked, and benched keys are skipped
+    assert [pool.acquire()[0] for _ in range(2)] == ["key-b", "key-b"]
+
+
+def test_key_pool_budget(tmp_path):
+    # Test a pool's budget holds every key's quota, so two keys can spend more than one key's daily limit
+    budget = project.KeyPool(["key-a", "key-b"]).budget(ledger_file=tmp_path / "ledger.json")
+    budget.record(project.ApiBudget.DAILY_LIMIT + 100)
+    assert budget.remaining() == project.ApiBudget.DAILY_LIMIT - 100
+    # Test --keys gives the pool its budget
+    with patch.object(project.sys, "argv", ["project.py", "--keys", "key-a,key-b,key-c"]), patch.object(project, "run_command"), \
+            patch.object(project.Auth, "key_pool"), patch.object(project.Auth, "budget"):
+        project.main()
+        assert project.Auth.budget.daily_limit == 3 * project.ApiBudget.DAILY_LIMIT
+
+
+def test_request_scheduler(tmp_path):
+    import threading
+    scheduler = project.RequestScheduler()
+    order = []
+    holding, release = threading.Event(), threading.Event()
+
+    def blocker():
+        holding.set()
+        release.wait()
+        return "blocker"
+
+    def request(priority, owner):
+        scheduler.acquire(lambda: order.append((priority, owner)), priority, owner)
+
+    # Hold the turn so that every request below queues up behind it
+    first = threading.Thread(target=scheduler.acquire, args=(blocker,))
+    first.start()
+    holding.wait()
+    threads = [threading.Thread(target=request, args=("bulk", owner)) for owner in ("a", "a", "a", "b", "b", "b") * 5]
+    threads += [threading.Thread(target=request, args=(priority, None)) for priority in ["normal"] * 10 + ["interactive"] * 10]
+    for thread in threads:
+        thread.start()
+    while sum(scheduler.pending().values()) < len(threads):
+        project.sleep(0.001)
+    release.set()
+    for thread in [first] + threads:
+        thread.join()
+
+    # Test classes share the rate limit by weight while all of them are queued
+    first_ten = [priority for priority, _ in order[:10]]
+    assert (first_ten.count("interactive"), first_ten.count("normal"), first_ten.count("bulk")) == (6, 3, 1)
+    # Test interactive requests are let through ahead of the bulk backlog
+    assert max(i for i, (priority, _) in enumerate(order) if priority == "interactive") < 20
+    # Test clients in the same class take turns
+    bulk = [owner for priority, owner in order if priority == "bulk"]
+    assert bulk[:6] == ["a", "b"] * 3 and len(order) == 50
+    with pytest.raises(ValueError):
+        project.Assets(priority="urgent")
+    # Test background jobs run as bulk, on a copy of the client that shares its session
+    assets = project.Assets(priority="interactive")
+    sync = project.MarketSync(assets, str(tmp_path / "sync"))
+    assert (sync.assets.priority, assets.priority, sync.assets.session) == ("bulk", "interactive", assets.session)
+    # Test time queued in the scheduler is its own metric, not rate-limited time
+    assert "queued_seconds" in project.Metrics.COUNTERS
+
+
+def test_circuit_breaker(mock_api):
+    # Every request fails with a 5xx
+    exchanges = project.Exchanges(base_url=mock_api(coins=50, exchanges=5, tickers=100, error_rate=1))
+    with patch.object(project.Auth, "breaker", project.CircuitBreaker(5, cooldown=60)), patch.object(project.Auth, "retry_backoff", 0):
+        pages = [exchanges.exch_pairs("binance", page=i) for i in range(1, 5)]
+        with pytest.raises(project.CircuitOpen):
+            exchanges._get("exchanges/kraken/tickers")
+        metrics = project.Auth.metrics.snapshot()["exchanges/{id}/tickers"]
+        prometheus = project.Auth.metrics.prometheus()
+        other = project.Auth.breaker.state("exchanges/list")
+
+    # Test the circuit opens after 5 failed attempts and later requests to the endpoint fail fast without being sent
+    assert pages == [None] * 4 and metrics["requests"] == 5
+    assert (metrics["circuit"], metrics["circuit_opens"], metrics["short_circuited"]) == ("open", 1, 4)
+    assert 'coingecko_circuit_state{endpoint="exchanges/{id}/tickers"} 2' in prometheus and other == "closed"
+
+    # Test half-open probing: one probe after the cooldown, which closes the circuit or opens it again
+    breaker = project.CircuitBreaker(2, cooldown=0.05)
+    breaker.record("coins/list", False), breaker.record("coins/list", False)
+    with pytest.raises(project.CircuitOpen):
+        breaker.allow("coins/list")
+    project.sleep(0.06)
+    breaker.allow("coins/list")
+    with pytest.raises(project.CircuitOpen):
+        breaker.allow("coins/list")
+    breaker.record("coins/list", False)
+    assert breaker.state("coins/list") == "open"
+    project.sleep(0.06)
+    breaker.allow("coins/list")
+    breaker.record("coins/list", True)
+    assert breaker.state("coins/list") == "closed"